@@ -4,12 +4,13 @@ import logging
 from contextlib import contextmanager
 from datetime import datetime
 from typing import Any, Dict, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from sqlmodel import Session
 
 from app.db import get_session
 from app.models import AnalyticsEvent
+from .writer import get_event_writer
 
 logger = logging.getLogger("teski.analytics")
 
@@ -41,6 +42,14 @@ def log_event(kind: str, payload: Dict[str, Any] | None = None, user_id: Optiona
             user_id = UUID(str(user_id))
         except ValueError:
             user_id = None
+    writer = get_event_writer() if session is None else None
+    if writer is not None:
+        # No caller transaction to join: hand the row to the batched writer.
+        if not writer.submit(
+            {"id": uuid4(), "user_id": user_id, "kind": kind, "payload": payload, "ts": datetime.utcnow()}
+        ):
+            logger.debug("analytics event %s dropped; writer queue is full", kind)
+        return
     with _session_scope(session) as sess:
         event = AnalyticsEvent(
             id=None,
@@ -3,6 +3,7 @@ from __future__ import annotations
 from fastapi import APIRouter
 
 from .jobs import nightly_analytics_job
+from .writer import event_writer_stats
 
 router = APIRouter(prefix="/analytics/admin", tags=["analytics-admin"])
 
@@ -10,3 +11,8 @@ router = APIRouter(prefix="/analytics/admin", tags=["analytics-admin"])
 @router.post("/run-now")
 def run_now() -> dict:
     return nightly_analytics_job()
+
+
+@router.get("/event-writer")
+def event_writer() -> dict:
+    return event_writer_stats()
@@ -1,48 +1,131 @@
 from __future__ import annotations
 
+import gzip
+import json
+import logging
+import os
 from datetime import datetime, timedelta
-from typing import Set
+from pathlib import Path
+from typing import Callable
 
 from sqlalchemy import delete
 from sqlmodel import Session, select
 
 from ..db import get_engine
 from app.models import AnalyticsEvent
-from .utils import rollup_events_to_daily
+from .kpis import invalidate_kpi_cache
+from .utils import rollup_events_incremental
 
 RETENTION_DAYS_RAW = 180
-ROLLUP_LOOKBACK_DAYS = 2
+PURGE_BATCH_SIZE = int(os.getenv("ANALYTICS_PURGE_BATCH_SIZE", "5000"))
+PURGE_ARCHIVE_DIR = os.getenv("ANALYTICS_ARCHIVE_DIR") or None
+PURGE_VACUUM = os.getenv("ANALYTICS_PURGE_VACUUM", "off").strip().lower()  # off | incremental | full
 
-
-def _distinct_user_ids_with_events(session: Session, since: datetime | None = None) -> Set[str]:
-    query = select(AnalyticsEvent.user_id).distinct().where(AnalyticsEvent.user_id.is_not(None))
-    if since:
-        query = query.where(AnalyticsEvent.ts >= since)
-    rows = session.exec(query).all()
-    return {str(row) for row in rows if row}
+logger = logging.getLogger("teski.analytics.jobs")
 
 
 def rollup_previous_day_for_all() -> dict:
     engine = get_engine()
-    start = datetime.utcnow() - timedelta(days=ROLLUP_LOOKBACK_DAYS)
     with Session(engine) as session:
-        user_ids = _distinct_user_ids_with_events(session, since=start - timedelta(days=1))
-        rollups = 0
-        for uid in user_ids:
-            rollup_events_to_daily(session, uid)
-            rollups += 1
-    return {"users_considered": len(user_ids), "rollups_triggered": rollups}
+        result = rollup_events_incremental(session)
+    invalidate_kpi_cache()
+    return result
+
+
+def _archive_events(archive_dir: Path, cutoff: datetime, events: list[AnalyticsEvent]) -> None:
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    target = archive_dir / f"analytics_events_before_{cutoff.date().isoformat()}.jsonl.gz"
+    # Appending a new gzip member per batch keeps each write small and the
+    # resulting file still decompresses as one stream.
+    with gzip.open(target, "at", encoding="utf-8") as fh:
+        for ev in events:
+            record = {
+                "id": str(ev.id),
+                "user_id": str(ev.user_id) if ev.user_id else None,
+                "kind": ev.kind,
+                "payload": ev.payload or {},
+                "ts": ev.ts.isoformat(),
+            }
+            fh.write(json.dumps(record, default=str) + "\n")
+
 
+def _reclaim_space(engine, mode: str) -> str:
+    if mode not in {"incremental", "full"} or engine.dialect.name != "sqlite":
+        return "skipped"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if mode == "full":
+            conn.exec_driver_sql("VACUUM")
+            return "vacuum"
+        auto_vacuum = conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+        if auto_vacuum != 2:
+            # incremental_vacuum is a no-op unless the file was created (or
+            # fully vacuumed) with auto_vacuum=INCREMENTAL.
+            return "incremental_unavailable"
+        conn.exec_driver_sql("PRAGMA incremental_vacuum").fetchall()
+        return "incremental_vacuum"
 
-def purge_old_raw_events() -> dict:
+
+def purge_old_raw_events(
+    *,
+    batch_size: int = PURGE_BATCH_SIZE,
+    archive_dir: str | Path | None = PURGE_ARCHIVE_DIR,
+    vacuum: str = PURGE_VACUUM,
+    progress: Callable[[int], None] | None = None,
+) -> dict:
+    """
+    Delete raw events older than the retention window in bounded batches.
+
+    Each batch selects the oldest ``batch_size`` ids through the ts index,
+    optionally appends them to a gzip JSONL archive, and deletes them in its
+    own short transaction so writers are never blocked for long.
+    """
     engine = get_engine()
     cutoff = datetime.utcnow() - timedelta(days=RETENTION_DAYS_RAW)
-    with Session(engine) as session:
-        stmt = delete(AnalyticsEvent).where(AnalyticsEvent.ts < cutoff)
-        result = session.exec(stmt)
-        deleted = result.rowcount or 0
-        session.commit()
-    return {"deleted_events": int(deleted), "cutoff_utc": cutoff.isoformat()}
+    archive_path = Path(archive_dir) if archive_dir else None
+    deleted = 0
+    batches = 0
+    while True:
+        with Session(engine) as session:
+            if archive_path is not None:
+                events = list(
+                    session.exec(
+                        select(AnalyticsEvent)
+                        .where(AnalyticsEvent.ts < cutoff)
+                        .order_by(AnalyticsEvent.ts)
+                        .limit(batch_size)
+                    ).all()
+                )
+                ids = [ev.id for ev in events]
+                if events:
+                    _archive_events(archive_path, cutoff, events)
+            else:
+                ids = list(
+                    session.exec(
+                        select(AnalyticsEvent.id)
+                        .where(AnalyticsEvent.ts < cutoff)
+                        .order_by(AnalyticsEvent.ts)
+                        .limit(batch_size)
+                    ).all()
+                )
+            if not ids:
+                break
+            result = session.exec(delete(AnalyticsEvent).where(AnalyticsEvent.id.in_(ids)))
+            session.commit()
+        deleted += int(result.rowcount or 0)
+        batches += 1
+        if progress is not None:
+            progress(deleted)
+        logger.info("analytics purge batch %s removed %s events (total %s)", batches, len(ids), deleted)
+        if len(ids) < batch_size:
+            break
+    reclaimed = _reclaim_space(engine, vacuum) if deleted else "skipped"
+    return {
+        "deleted_events": deleted,
+        "batches": batches,
+        "cutoff_utc": cutoff.isoformat(),
+        "archived_to": str(archive_path) if archive_path is not None and deleted else None,
+        "space_reclaim": reclaimed,
+    }
 
 
 def nightly_analytics_job() -> dict:
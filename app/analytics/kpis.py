@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import time
 from datetime import date, datetime, timedelta
 from typing import Any, Dict
 
 from fastapi import APIRouter, Depends
+from sqlalchemy import case, distinct
+from sqlalchemy.orm import aliased
 from sqlmodel import Session, select, func
 
 from ..db import get_session
@@ -13,12 +16,14 @@ from .models import AnalyticsDailyAgg
 router = APIRouter(prefix="/analytics/admin", tags=["analytics-admin"])
 
 
-def _days_ago(days: int) -> date:
-    return date.today() - timedelta(days=days)
+KPI_CACHE_TTL: int = 300  # seconds; the nightly rollup also clears it
+
+_kpi_cache: Dict[str, Any] | None = None
+_kpi_cache_at: float = 0.0
 
 
-def _user_set(rows: list[AnalyticsDailyAgg]) -> set[str]:
-    return {str(row.user_id) for row in rows}
+def _days_ago(days: int) -> date:
+    return date.today() - timedelta(days=days)
 
 
 def _scalar(value: Any) -> float:
@@ -27,44 +32,64 @@ def _scalar(value: Any) -> float:
     return value
 
 
-@router.get("/kpis")
-def kpis(session: Session = Depends(get_session)) -> Dict[str, Any]:
+def invalidate_kpi_cache() -> None:
+    """Drop the cached KPI payload so the next request recomputes it."""
+    global _kpi_cache, _kpi_cache_at
+    _kpi_cache = None
+    _kpi_cache_at = 0.0
+
+
+def _retention(session: Session, window_days: int) -> float:
+    start = _days_ago(window_days)
+    prev_start = _days_ago(window_days * 2)
+    recent = aliased(AnalyticsDailyAgg)
+    returned = (
+        select(recent.id)
+        .where(recent.user_id == AnalyticsDailyAgg.user_id, recent.day >= start)
+        .exists()
+    )
+    prev_users, kept = session.exec(
+        select(
+            func.count(distinct(AnalyticsDailyAgg.user_id)),
+            func.count(distinct(case((returned, AnalyticsDailyAgg.user_id)))),
+        ).where(
+            AnalyticsDailyAgg.day >= prev_start,
+            AnalyticsDailyAgg.day < start,
+        )
+    ).one()
+    if not prev_users:
+        return 0.0
+    return round(100.0 * int(kept or 0) / int(prev_users), 2)
+
+
+def compute_kpis(session: Session) -> Dict[str, Any]:
     today = date.today()
     d7 = _days_ago(7)
-    d28 = _days_ago(28)
-
-    rows_today = session.exec(select(AnalyticsDailyAgg).where(AnalyticsDailyAgg.day == today)).all()
-    dau = len([row for row in rows_today if (row.sessions > 0 or row.reviews > 0)])
-
-    rows7 = session.exec(select(AnalyticsDailyAgg).where(AnalyticsDailyAgg.day >= d7)).all()
-    wau = len(_user_set(rows7))
-
-    def _retention(window_days: int) -> float:
-        start = _days_ago(window_days)
-        prev_start = _days_ago(window_days * 2)
-        recent_rows = session.exec(select(AnalyticsDailyAgg).where(AnalyticsDailyAgg.day >= start)).all()
-        prev_rows = session.exec(
-            select(AnalyticsDailyAgg).where(
-                AnalyticsDailyAgg.day >= prev_start,
-                AnalyticsDailyAgg.day < start,
-            )
-        ).all()
-        prev_users = _user_set(prev_rows)
-        if not prev_users:
-            return 0.0
-        kept = len(_user_set(recent_rows) & prev_users)
-        return round(100.0 * kept / len(prev_users), 2)
-
-    retention7 = _retention(7)
-    retention28 = _retention(28)
-
-    total_minutes = sum(row.minutes_active for row in rows7)
-    total_sessions = sum(row.sessions for row in rows7)
-    total_reviews = sum(row.reviews for row in rows7)
-    users7 = max(wau, 1)
 
-    avg_session_minutes = round(total_minutes / max(total_sessions, 1), 2)
-    reviews_per_user = round(total_reviews / users7, 2)
+    dau = session.exec(
+        select(func.count(distinct(AnalyticsDailyAgg.user_id))).where(
+            AnalyticsDailyAgg.day == today,
+            (AnalyticsDailyAgg.sessions > 0) | (AnalyticsDailyAgg.reviews > 0),
+        )
+    ).one()
+    dau = int(_scalar(dau) or 0)
+
+    wau, total_minutes, total_sessions, total_reviews = session.exec(
+        select(
+            func.count(distinct(AnalyticsDailyAgg.user_id)),
+            func.coalesce(func.sum(AnalyticsDailyAgg.minutes_active), 0.0),
+            func.coalesce(func.sum(AnalyticsDailyAgg.sessions), 0),
+            func.coalesce(func.sum(AnalyticsDailyAgg.reviews), 0),
+        ).where(AnalyticsDailyAgg.day >= d7)
+    ).one()
+    wau = int(wau or 0)
+
+    retention7 = _retention(session, 7)
+    retention28 = _retention(session, 28)
+
+    users7 = max(wau, 1)
+    avg_session_minutes = round(float(total_minutes) / max(int(total_sessions), 1), 2)
+    reviews_per_user = round(int(total_reviews) / users7, 2)
 
     now_utc = datetime.utcnow()
     paid_row = session.exec(
@@ -89,3 +114,19 @@ def kpis(session: Session = Depends(get_session)) -> Dict[str, Any]:
         "window_7d_start": str(d7),
         "today": str(today),
     }
+
+
+@router.get("/kpis")
+def kpis(session: Session = Depends(get_session)) -> Dict[str, Any]:
+    global _kpi_cache, _kpi_cache_at
+    cached = _kpi_cache
+    if (
+        cached is not None
+        and cached.get("today") == str(date.today())
+        and (time.time() - _kpi_cache_at) < KPI_CACHE_TTL
+    ):
+        return cached
+    result = compute_kpis(session)
+    _kpi_cache = result
+    _kpi_cache_at = time.time()
+    return result
@@ -22,3 +22,12 @@ class AnalyticsDailyAgg(AppSQLModel, table=True):
     reviews: int = Field(default=0, index=True)
     minutes_active: float = Field(default=0.0)
     last_recomputed_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class AnalyticsRollupState(AppSQLModel, table=True):
+    """Watermark for the incremental daily rollup: events with ts < watermark are folded."""
+
+    name: str = Field(primary_key=True)
+    watermark: datetime
+    events_folded: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
 from collections import defaultdict
-from datetime import date, datetime, timedelta
-from typing import Dict, Any
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Any, Tuple
 from uuid import UUID
 
+from sqlalchemy import delete, insert, update
 from sqlmodel import Session, select
 
 from app.models import AnalyticsEvent
-from .models import AnalyticsDailyAgg
+from .models import AnalyticsDailyAgg, AnalyticsRollupState
 
 ROLLUP_WINDOW_DAYS_DEFAULT = 7
+ROLLUP_STATE_NAME = "daily_agg"
+ROLLUP_CHUNK_SIZE = 2000
+# Events are only folded once they are this old, so rows committed slightly
+# out of ts order by concurrent requests are not skipped by the watermark.
+ROLLUP_SETTLE_SECONDS = 300
 SESSION_EVENT_KINDS = {"memory.review_fetch", "memory.review_shown"}
 REVIEW_EVENT_KINDS = {"memory.review_logged", "exercise_correct", "exercise_incorrect"}
 MINUTE_PAYLOAD_CANDIDATES = ("minutes", "minutes_active", "duration_minutes")
@@ -28,7 +35,11 @@ def _ensure_uuid(value: str | UUID | None) -> UUID | None:
 
 
 def _extract_minutes(event: AnalyticsEvent) -> float:
-    payload = event.payload or {}
+    return _minutes_from_payload(event.payload)
+
+
+def _minutes_from_payload(payload: Dict[str, Any] | None) -> float:
+    payload = payload or {}
     for key in MINUTE_PAYLOAD_CANDIDATES:
         value = payload.get(key)
         if isinstance(value, (int, float)):
@@ -99,3 +110,143 @@ def rollup_events_to_daily(session: Session, user_id: str | UUID, *, window_days
             session.add(agg)
 
     session.commit()
+
+
+@dataclass
+class _DayAccumulator:
+    counts: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    sessions: int = 0
+    reviews: int = 0
+    minutes: float = 0.0
+
+    def add(self, kind: str, payload: Dict[str, Any] | None) -> None:
+        self.counts[kind] += 1
+        if kind in SESSION_EVENT_KINDS:
+            self.sessions += 1
+        if kind in REVIEW_EVENT_KINDS:
+            self.reviews += 1
+        self.minutes += _minutes_from_payload(payload)
+
+
+def _load_rollup_state(session: Session, *, bootstrap_days: int) -> AnalyticsRollupState:
+    state = session.get(AnalyticsRollupState, ROLLUP_STATE_NAME)
+    if state is not None:
+        return state
+    # First incremental run: rebuild the recent window from scratch so folded
+    # deltas never stack on rows written by the old full recompute.
+    first_day = datetime.utcnow().date() - timedelta(days=bootstrap_days)
+    session.exec(delete(AnalyticsDailyAgg).where(AnalyticsDailyAgg.day >= first_day))
+    state = AnalyticsRollupState(name=ROLLUP_STATE_NAME, watermark=datetime.combine(first_day, time.min))
+    session.add(state)
+    return state
+
+
+def _upsert_accumulators(
+    session: Session,
+    accumulators: Dict[Tuple[UUID, date], _DayAccumulator],
+    now: datetime,
+) -> int:
+    if not accumulators:
+        return 0
+    user_ids = {user_id for user_id, _ in accumulators}
+    days = {day for _, day in accumulators}
+    existing = {
+        (row.user_id, row.day): row
+        for row in session.exec(
+            select(
+                AnalyticsDailyAgg.id,
+                AnalyticsDailyAgg.user_id,
+                AnalyticsDailyAgg.day,
+                AnalyticsDailyAgg.counts,
+                AnalyticsDailyAgg.sessions,
+                AnalyticsDailyAgg.reviews,
+                AnalyticsDailyAgg.minutes_active,
+            ).where(
+                AnalyticsDailyAgg.user_id.in_(user_ids),
+                AnalyticsDailyAgg.day.in_(days),
+            )
+        )
+    }
+    inserts: list[dict[str, Any]] = []
+    updates: list[dict[str, Any]] = []
+    for key, acc in accumulators.items():
+        row = existing.get(key)
+        if row is None:
+            inserts.append(
+                {
+                    "user_id": key[0],
+                    "day": key[1],
+                    "counts": dict(acc.counts),
+                    "sessions": acc.sessions,
+                    "reviews": acc.reviews,
+                    "minutes_active": acc.minutes,
+                    "last_recomputed_at": now,
+                }
+            )
+            continue
+        counts = {k: int(v) for k, v in (row.counts or {}).items()}
+        for kind, value in acc.counts.items():
+            counts[kind] = counts.get(kind, 0) + value
+        updates.append(
+            {
+                "id": row.id,
+                "counts": counts,
+                "sessions": row.sessions + acc.sessions,
+                "reviews": row.reviews + acc.reviews,
+                "minutes_active": row.minutes_active + acc.minutes,
+                "last_recomputed_at": now,
+            }
+        )
+    if inserts:
+        session.exec(insert(AnalyticsDailyAgg), params=inserts)
+    if updates:
+        session.exec(update(AnalyticsDailyAgg), params=updates)
+    return len(inserts) + len(updates)
+
+
+def rollup_events_incremental(
+    session: Session,
+    *,
+    chunk_size: int = ROLLUP_CHUNK_SIZE,
+    bootstrap_days: int = ROLLUP_WINDOW_DAYS_DEFAULT,
+    until: datetime | None = None,
+) -> Dict[str, Any]:
+    """
+    Fold events newer than the stored watermark into AnalyticsDailyAgg.
+
+    Events are streamed in ts order in ``chunk_size`` batches, accumulated per
+    (user, day) in memory, and written back with one bulk INSERT and one bulk
+    UPDATE. The watermark moves in the same transaction, so a failed run is
+    simply retried from the previous watermark.
+    """
+    now = datetime.utcnow()
+    until = until or now - timedelta(seconds=ROLLUP_SETTLE_SECONDS)
+    state = _load_rollup_state(session, bootstrap_days=bootstrap_days)
+    since = state.watermark
+    if until <= since:
+        session.commit()
+        return {"events_folded": 0, "days_upserted": 0, "watermark": since.isoformat()}
+
+    stmt = (
+        select(AnalyticsEvent.user_id, AnalyticsEvent.kind, AnalyticsEvent.ts, AnalyticsEvent.payload)
+        .where(
+            AnalyticsEvent.user_id.is_not(None),
+            AnalyticsEvent.ts >= since,
+            AnalyticsEvent.ts < until,
+        )
+        .order_by(AnalyticsEvent.ts)
+        .execution_options(yield_per=chunk_size)
+    )
+    accumulators: Dict[Tuple[UUID, date], _DayAccumulator] = defaultdict(_DayAccumulator)
+    folded = 0
+    for user_id, kind, ts, payload in session.exec(stmt):
+        accumulators[(user_id, ts.date())].add(kind, payload)
+        folded += 1
+
+    days_upserted = _upsert_accumulators(session, accumulators, now)
+    state.watermark = until
+    state.events_folded = (state.events_folded or 0) + folded
+    state.updated_at = now
+    session.add(state)
+    session.commit()
+    return {"events_folded": folded, "days_upserted": days_upserted, "watermark": until.isoformat()}
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from app.db import get_engine
+from app.models import AnalyticsEvent
+
+logger = logging.getLogger("teski.analytics.writer")
+
+DEFAULT_QUEUE_SIZE = 10_000
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL_MS = 250
+DEFAULT_ENQUEUE_TIMEOUT_MS = 20
+
+
+class BufferedEventWriter:
+    """
+    Background thread that drains a bounded queue of analytics rows into
+    multi-row INSERTs, every ``batch_size`` rows or ``flush_interval_ms``.
+
+    When the queue is full, ``submit`` waits up to ``enqueue_timeout_ms`` and
+    then drops the event, so a stalled database slows analytics instead of the
+    request path.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_queue: int = DEFAULT_QUEUE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval_ms: int = DEFAULT_FLUSH_INTERVAL_MS,
+        enqueue_timeout_ms: int = DEFAULT_ENQUEUE_TIMEOUT_MS,
+        engine_factory: Callable[[], Any] = get_engine,
+    ) -> None:
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = max(1, flush_interval_ms) / 1000.0
+        self._enqueue_timeout = max(0, enqueue_timeout_ms) / 1000.0
+        self._engine_factory = engine_factory
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._counters = {"submitted": 0, "flushed": 0, "dropped": 0, "failed": 0, "batches": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the worker after flushing everything already queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._drain()
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        try:
+            self._queue.put(row, timeout=self._enqueue_timeout)
+        except queue.Full:
+            self._bump("dropped")
+            return False
+        self._bump("submitted")
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            data = dict(self._counters)
+        data["queued"] = self._queue.qsize()
+        return data
+
+    def _bump(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[key] += amount
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+
+    def _collect(self) -> List[Dict[str, Any]]:
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self._flush_interval
+        while len(batch) < self._batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self._batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            with Session(self._engine_factory()) as session:
+                session.exec(insert(AnalyticsEvent), params=batch)
+                session.commit()
+        except Exception:  # pragma: no cover - logged and counted, never raised to callers
+            logger.exception("failed to flush %s analytics events", len(batch))
+            self._bump("failed", len(batch))
+            return
+        self._bump("flushed", len(batch))
+        self._bump("batches")
+
+
+_writer: Optional[BufferedEventWriter] = None
+
+
+def get_event_writer() -> Optional[BufferedEventWriter]:
+    """Return the running writer, or None when events are written synchronously."""
+    writer = _writer
+    if writer is not None and writer.running:
+        return writer
+    return None
+
+
+def start_event_writer(**kwargs: Any) -> BufferedEventWriter:
+    global _writer
+    if _writer is None:
+        _writer = BufferedEventWriter(**kwargs)
+    _writer.start()
+    return _writer
+
+
+def stop_event_writer(timeout: float = 5.0) -> None:
+    global _writer
+    writer = _writer
+    _writer = None
+    if writer is not None:
+        writer.stop(timeout)
+
+
+def event_writer_stats() -> Dict[str, Any]:
+    writer = _writer
+    if writer is None:
+        return {"enabled": False}
+    return {"enabled": writer.running, **writer.stats()}
@@ -10,12 +10,13 @@ from sqlmodel import Session, select
 
 from app.abtest import assign_and_persist
 from app.analytics import log as log_event
+from app.attempts import today_attempt_counts
 from app.badges import check_nemesis
 from app.config import get_settings
 from app.db import get_session
 from app.detectors import classify_mistake
 from app.exercises import load_exercises
-from app.models import AnalyticsEvent, MemoryItem, Mistake, ReviewLog, User
+from app.models import MemoryItem, Mistake, ReviewLog, User
 from app.personas import get_persona_copy
 from app.timeutil import user_day_bounds
 from app.scheduler import enforce_daily_cap, get_next_reviews, review as review_memory, schedule_from_mistake
@@ -145,7 +146,7 @@ def stats_endpoint(user_id: UUID, session: Session = Depends(get_session)) -> St
     if isinstance(due_count, tuple):
         due_count = due_count[0]
     due_count = int(due_count or 0)
-    ex_correct, ex_incorrect = _today_exercise_counts(session, user)
+    ex_correct, ex_incorrect = today_attempt_counts(session, user)
     suggested = _suggested_exercises(user)
     settings = get_settings()
     return StatsOut(
@@ -188,31 +189,6 @@ def _remaining_today(session: Session, user: User) -> int:
     return remaining
 
 
-def _today_exercise_counts(session: Session, user: User) -> tuple[int, int]:
-    start, end = user_day_bounds(user.timezone)
-    correct = session.exec(
-        select(func.count()).where(
-            AnalyticsEvent.user_id == user.id,
-            AnalyticsEvent.kind == "exercise_correct",
-            AnalyticsEvent.ts >= start,
-            AnalyticsEvent.ts < end,
-        )
-    ).one()
-    incorrect = session.exec(
-        select(func.count()).where(
-            AnalyticsEvent.user_id == user.id,
-            AnalyticsEvent.kind == "exercise_incorrect",
-            AnalyticsEvent.ts >= start,
-            AnalyticsEvent.ts < end,
-        )
-    ).one()
-    if isinstance(correct, tuple):
-        correct = correct[0]
-    if isinstance(incorrect, tuple):
-        incorrect = incorrect[0]
-    return int(correct or 0), int(incorrect or 0)
-
-
 def _suggested_exercises(user: User) -> int:
     exercises = load_exercises()
     if user.display_name:  # placeholder for course preference later
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.models import ExerciseAttempt, User
+from app.timeutil import _utcnow, user_day_bounds
+
+
+def record_attempt(
+    session: Session,
+    user_id: UUID,
+    *,
+    exercise_id: str,
+    skill_key: str,
+    correct: bool,
+    difficulty: int,
+    ts: Optional[datetime] = None,
+) -> ExerciseAttempt:
+    """Add an attempt row to ``session``; the caller owns the commit."""
+    attempt = ExerciseAttempt(
+        user_id=user_id,
+        exercise_id=exercise_id,
+        skill_key=skill_key,
+        correct=correct,
+        difficulty=difficulty,
+        ts=ts or _utcnow(),
+    )
+    session.add(attempt)
+    return attempt
+
+
+def recent_attempts(session: Session, user_id: UUID, limit: int) -> List[ExerciseAttempt]:
+    stmt = (
+        select(ExerciseAttempt)
+        .where(ExerciseAttempt.user_id == user_id)
+        .order_by(ExerciseAttempt.ts.desc())
+        .limit(limit)
+    )
+    return list(session.exec(stmt).all())
+
+
+def correct_streak(attempts: List[ExerciseAttempt]) -> int:
+    """Count consecutive correct attempts from the newest one backwards."""
+    streak = 0
+    for attempt in attempts:
+        if not attempt.correct:
+            break
+        streak += 1
+    return streak
+
+
+def current_correct_streak(session: Session, user_id: UUID, limit: int = 25) -> int:
+    """Consecutive correct attempts from the newest one backwards, over the last ``limit``."""
+    stmt = (
+        select(ExerciseAttempt.correct)
+        .where(ExerciseAttempt.user_id == user_id)
+        .order_by(ExerciseAttempt.ts.desc())
+        .limit(limit)
+    )
+    streak = 0
+    for is_correct in session.exec(stmt):
+        if not is_correct:
+            break
+        streak += 1
+    return streak
+
+
+def today_attempt_counts(session: Session, user: User) -> Tuple[int, int]:
+    """Return (correct, incorrect) attempt counts for the user's local day."""
+    start, end = user_day_bounds(user.timezone)
+    stmt = (
+        select(ExerciseAttempt.correct, func.count())
+        .where(
+            ExerciseAttempt.user_id == user.id,
+            ExerciseAttempt.ts >= start,
+            ExerciseAttempt.ts < end,
+        )
+        .group_by(ExerciseAttempt.correct)
+    )
+    correct = 0
+    incorrect = 0
+    for is_correct, count in session.exec(stmt).all():
+        if is_correct:
+            correct = int(count or 0)
+        else:
+            incorrect = int(count or 0)
+    return correct, incorrect
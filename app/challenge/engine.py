@@ -1,21 +1,22 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from collections import Counter
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 from enum import Enum
-from functools import lru_cache
-from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 from uuid import UUID
 
 from sqlmodel import Session, select
 
 from app.data.mock_exercises import MOCK_EXERCISES
-from app.exercises import Exercise, load_exercises
+from app.exercises import Exercise, load_exercises, register_invalidation_hook
 from app.behavioral.model import get_behavior_profile
 from app.mastery.models import Skill, UserSkillMastery
 from app.mastery.service import get_mastery_record, get_or_create_skill
-from app.models import AnalyticsEvent, BehavioralProfile, Mistake, MemoryItem
+from app.attempts import correct_streak, recent_attempts
+from app.models import BehavioralProfile, ExerciseAttempt, Mistake, MemoryItem
 
 DIFFICULTY_MIN = 1
 DIFFICULTY_MAX = 5
@@ -24,6 +25,7 @@ RECENT_COOLDOWN_IDS = 5
 REVIEW_RATIO_STRUGGLE = 0.5
 REVIEW_RATIO_NORMAL = 0.25
 NEAR_TERM_WINDOW_DAYS = 2
+HISTORY_SCAN_LIMIT = 200
 
 
 class DifficultyBand(str, Enum):
@@ -94,7 +96,34 @@ class SessionPlan:
     performance: PerformanceSnapshot
 
 
-_CONCEPT_SKILL_MAP: Dict[str, str] = {}
+@dataclass
+class PlannerContext:
+    """Per-user planner state fetched up front by ``load_planner_context``.
+
+    Lists keep the ordering the planner relies on: masteries weakest first,
+    attempts and mistakes newest first, memory items soonest due first.
+    """
+
+    user_id: UUID
+    behavior: Optional[BehavioralProfile]
+    masteries: List[Tuple[UserSkillMastery, Skill]]
+    recent_attempts: List[ExerciseAttempt]
+    memory_items: List[MemoryItem]
+    mistakes: List[Mistake]
+
+    def weakest_skill(self) -> Optional[Skill]:
+        return self.masteries[0][1] if self.masteries else None
+
+    def mastery_for(self, session: Session, skill: Skill) -> UserSkillMastery:
+        for record, mastery_skill in self.masteries:
+            if mastery_skill.id == skill.id:
+                return record
+        record = get_mastery_record(session, self.user_id, skill.id)
+        self.masteries.append((record, skill))
+        return record
+
+    def correct_streak(self) -> int:
+        return correct_streak(self.recent_attempts)
 
 
 def _normalize(text: str) -> str:
@@ -133,12 +162,35 @@ def _primary_skill_name_from_mock(mock: Dict[str, object]) -> str:
     return str(concept) if concept else "General"
 
 
-@lru_cache()
-def _candidate_map() -> Dict[str, ExerciseCandidate]:
-    global _CONCEPT_SKILL_MAP
-    _CONCEPT_SKILL_MAP = {}
+@dataclass(frozen=True)
+class CandidateIndex:
+    """Immutable lookup tables over the exercise catalogue.
+
+    Skill and concept buckets are keyed by normalized name and pre-sorted by
+    (difficulty, id), so planners only touch the candidates they return.
+    """
+
+    by_id: Mapping[str, ExerciseCandidate]
+    by_skill: Mapping[str, Tuple[ExerciseCandidate, ...]]
+    by_concept: Mapping[str, Tuple[ExerciseCandidate, ...]]
+    concept_skill: Mapping[str, str]
+    ordered: Tuple[ExerciseCandidate, ...]
+
+
+_CANDIDATE_INDEX: Optional[CandidateIndex] = None
+
+
+def _difficulty_sort_key(candidate: ExerciseCandidate) -> Tuple[int, str]:
+    return candidate.difficulty, candidate.id
+
+
+def _build_candidate_index(
+    exercises: Iterable[Exercise],
+    mocks: Iterable[Dict[str, object]] = (),
+) -> CandidateIndex:
     candidates: Dict[str, ExerciseCandidate] = {}
-    for exercise in load_exercises():
+    concept_skill: Dict[str, str] = {}
+    for exercise in exercises:
         skill_name = _primary_skill_name(exercise)
         candidate = ExerciseCandidate(
             id=exercise.id,
@@ -150,8 +202,8 @@ def _candidate_map() -> Dict[str, ExerciseCandidate]:
             keywords=tuple(exercise.keywords or []),
         )
         candidates[candidate.id] = candidate
-        _CONCEPT_SKILL_MAP[_normalize(exercise.concept)] = candidate.skill_name
-    for mock in MOCK_EXERCISES:
+        concept_skill[_normalize(exercise.concept)] = candidate.skill_name
+    for mock in mocks:
         skill_name = _primary_skill_name_from_mock(mock)
         candidate = ExerciseCandidate(
             id=str(mock["id"]),
@@ -163,13 +215,56 @@ def _candidate_map() -> Dict[str, ExerciseCandidate]:
             keywords=tuple(mock.get("tags", []) or []),
         )
         candidates[candidate.id] = candidate
-        _CONCEPT_SKILL_MAP[_normalize(candidate.concept)] = candidate.skill_name
-    return candidates
+        concept_skill[_normalize(candidate.concept)] = candidate.skill_name
+
+    by_skill: Dict[str, List[ExerciseCandidate]] = defaultdict(list)
+    by_concept: Dict[str, List[ExerciseCandidate]] = defaultdict(list)
+    for candidate in candidates.values():
+        by_skill[candidate.skill_key].append(candidate)
+        by_concept[_normalize(candidate.concept)].append(candidate)
+
+    return CandidateIndex(
+        by_id=MappingProxyType(candidates),
+        by_skill=MappingProxyType(
+            {key: tuple(sorted(group, key=_difficulty_sort_key)) for key, group in by_skill.items()}
+        ),
+        by_concept=MappingProxyType(
+            {key: tuple(sorted(group, key=_difficulty_sort_key)) for key, group in by_concept.items()}
+        ),
+        concept_skill=MappingProxyType(concept_skill),
+        ordered=tuple(candidates.values()),
+    )
+
+
+def _candidate_index() -> CandidateIndex:
+    global _CANDIDATE_INDEX
+    index = _CANDIDATE_INDEX
+    if index is None:
+        index = _build_candidate_index(load_exercises(), MOCK_EXERCISES)
+        _CANDIDATE_INDEX = index
+    return index
+
+
+def rebuild_candidate_index() -> None:
+    """Rebuild the candidate index from the current catalogue and swap it in.
+
+    Readers keep using the previous index until the single assignment below,
+    so a concurrent plan never observes a half-built index.
+    """
+    global _CANDIDATE_INDEX
+    _CANDIDATE_INDEX = _build_candidate_index(load_exercises(), MOCK_EXERCISES)
+
+
+register_invalidation_hook(rebuild_candidate_index)
+
+
+def _candidate_map() -> Mapping[str, ExerciseCandidate]:
+    return _candidate_index().by_id
 
 
 def _concept_to_skill_name(concept: str) -> str:
     key = _normalize(concept)
-    return _CONCEPT_SKILL_MAP.get(key, concept.strip())
+    return _candidate_index().concept_skill.get(key, concept.strip())
 
 
 def get_candidate(exercise_id: str) -> Optional[ExerciseCandidate]:
@@ -186,13 +281,12 @@ def derive_skill_name_for_concept(concept: str) -> str:
     return _concept_to_skill_name(concept)
 
 
-def _candidates_for_skill(skill_key: str) -> List[ExerciseCandidate]:
-    return [cand for cand in _candidate_map().values() if cand.skill_key == skill_key]
+def _candidates_for_skill(skill_key: str) -> Tuple[ExerciseCandidate, ...]:
+    return _candidate_index().by_skill.get(skill_key, ())
 
 
-def _candidates_by_concept(concept: str) -> List[ExerciseCandidate]:
-    key = _normalize(concept)
-    return [cand for cand in _candidate_map().values() if _normalize(cand.concept) == key]
+def _candidates_by_concept(concept: str) -> Tuple[ExerciseCandidate, ...]:
+    return _candidate_index().by_concept.get(_normalize(concept), ())
 
 
 def _difficulty_band_for_mastery(value: float) -> Tuple[int, int]:
@@ -244,41 +338,32 @@ def derive_policy(base: ChallengePolicy, behavior: Optional[BehavioralProfile])
     )
 
 
-def compute_recent_performance(session: Session, user_id: UUID, skill: Skill) -> PerformanceSnapshot:
-    events = session.exec(
-        select(AnalyticsEvent)
-        .where(
-            AnalyticsEvent.user_id == user_id,
-            AnalyticsEvent.kind.in_(("exercise_correct", "exercise_incorrect")),
-        )
-        .order_by(AnalyticsEvent.ts.desc())
-        .limit(RECENT_WINDOW)
-    ).all()
+def compute_recent_performance(
+    session: Session,
+    user_id: UUID,
+    skill: Skill,
+    *,
+    attempts_window: Optional[Sequence[ExerciseAttempt]] = None,
+) -> PerformanceSnapshot:
+    if attempts_window is None:
+        attempts_window = recent_attempts(session, user_id, RECENT_WINDOW)
     skill_key = _normalize(skill.name)
     attempts = 0
     correct = 0
     streak = 0
     total_difficulty = 0
     recent_ids: List[str] = []
-    for event in events:
-        exercise_id = None
-        payload = event.payload or {}
-        if isinstance(payload, dict):
-            exercise_id = payload.get("exercise_id")
-        if not exercise_id:
-            continue
-        candidate = get_candidate(str(exercise_id))
-        if not candidate or candidate.skill_key != skill_key:
+    for attempt in attempts_window:
+        if not attempt.exercise_id or attempt.skill_key != skill_key:
             continue
         attempts += 1
-        correct_flag = event.kind == "exercise_correct"
-        if correct_flag:
+        if attempt.correct:
             correct += 1
             streak = streak + 1 if attempts == len(recent_ids) + 1 else streak + 1
         else:
             streak = 0
-        total_difficulty += candidate.difficulty
-        recent_ids.append(candidate.id)
+        total_difficulty += attempt.difficulty
+        recent_ids.append(attempt.exercise_id)
     if attempts == 0:
         return PerformanceSnapshot(
             attempts=0,
@@ -325,11 +410,34 @@ def _review_target(performance: PerformanceSnapshot, length: int) -> int:
     return max(1, int(round(length * ratio)))
 
 
+def _memory_items_by_due(session: Session, user_id: UUID) -> List[MemoryItem]:
+    stmt = (
+        select(MemoryItem)
+        .where(MemoryItem.user_id == user_id)
+        .order_by(MemoryItem.due_at.asc())
+        .limit(HISTORY_SCAN_LIMIT)
+    )
+    return list(session.exec(stmt).all())
+
+
+def _recent_mistakes(session: Session, user_id: UUID) -> List[Mistake]:
+    stmt = (
+        select(Mistake)
+        .where(Mistake.user_id == user_id)
+        .order_by(Mistake.created_at.desc())
+        .limit(HISTORY_SCAN_LIMIT)
+    )
+    return list(session.exec(stmt).all())
+
+
 def get_due_mistake_exercises(
     session: Session,
     user_id: UUID,
     skill: Skill,
     limit: int,
+    *,
+    memory_items: Optional[Sequence[MemoryItem]] = None,
+    mistakes: Optional[Sequence[Mistake]] = None,
 ) -> List[ExerciseCandidate]:
     if limit <= 0:
         return []
@@ -339,13 +447,9 @@ def get_due_mistake_exercises(
     now = datetime.utcnow()
     near_term = now + timedelta(days=NEAR_TERM_WINDOW_DAYS)
 
-    memory_stmt = (
-        select(MemoryItem)
-        .where(MemoryItem.user_id == user_id)
-        .order_by(MemoryItem.due_at.asc())
-        .limit(200)
-    )
-    for memory in session.exec(memory_stmt):
+    if memory_items is None:
+        memory_items = _memory_items_by_due(session, user_id)
+    for memory in memory_items:
         if memory.due_at and memory.due_at > near_term:
             continue
         concept_skill = _normalize(_concept_to_skill_name(memory.concept))
@@ -359,13 +463,9 @@ def get_due_mistake_exercises(
             if len(due) >= limit:
                 return due
 
-    mistake_stmt = (
-        select(Mistake)
-        .where(Mistake.user_id == user_id)
-        .order_by(Mistake.created_at.desc())
-        .limit(200)
-    )
-    mistakes = [m for m in session.exec(mistake_stmt) if _normalize(_concept_to_skill_name(m.concept)) == skill_key]
+    if mistakes is None:
+        mistakes = _recent_mistakes(session, user_id)
+    mistakes = [m for m in mistakes if _normalize(_concept_to_skill_name(m.concept)) == skill_key]
     freq_by_subtype: Counter[str] = Counter()
     for mistake in mistakes:
         if mistake.subtype:
@@ -422,7 +522,7 @@ def _pick_new_candidates(
         return []
     pool = [cand for cand in _candidates_for_skill(skill_key) if cand.id not in avoid_ids]
     if not pool:
-        pool = [cand for cand in _candidate_map().values() if cand.id not in avoid_ids]
+        pool = [cand for cand in _candidate_index().ordered if cand.id not in avoid_ids]
     ordered = _sort_candidates_by_target(pool, target_low, target_high, prefer_harder)
     return ordered[:count]
 
@@ -527,7 +627,14 @@ def _allocate_by_band(
     return planned
 
 
-def _pick_skill_for_user(session: Session, user_id: UUID) -> Skill:
+def _pick_skill_for_user(
+    session: Session,
+    user_id: UUID,
+    context: Optional[PlannerContext] = None,
+) -> Skill:
+    weakest = context.weakest_skill() if context is not None else None
+    if weakest:
+        return weakest
     mastery_row = session.exec(
         select(UserSkillMastery).where(UserSkillMastery.user_id == user_id).order_by(UserSkillMastery.mastery.asc())
     ).first()
@@ -535,12 +642,55 @@ def _pick_skill_for_user(session: Session, user_id: UUID) -> Skill:
         skill = session.get(Skill, mastery_row.skill_id)
         if skill:
             return skill
+    return _fallback_skill(session)
+
+
+def _fallback_skill(session: Session) -> Skill:
     # fallback to the first available candidate skill
-    for candidate in _candidate_map().values():
+    for candidate in _candidate_index().ordered:
         return get_or_create_skill(session, candidate.skill_name)
     return get_or_create_skill(session, "General Skill")
 
 
+def load_planner_context(
+    session: Session,
+    user_id: UUID,
+    *,
+    include_profile: bool = True,
+    include_attempts: bool = True,
+    include_memory: bool = True,
+    include_mistakes: bool = True,
+) -> PlannerContext:
+    """Fetch the per-user state the planner needs in one bounded batch of queries.
+
+    ``include_profile`` covers the behavior profile and mastery rows; the
+    other flags cover the last ``RECENT_WINDOW`` graded attempts and the
+    ``HISTORY_SCAN_LIMIT`` memory items and mistakes. Callers that only need
+    part of the state switch the rest off.
+    """
+    behavior: Optional[BehavioralProfile] = None
+    masteries: List[Tuple[UserSkillMastery, Skill]] = []
+    if include_profile:
+        behavior = get_behavior_profile(session, user_id)
+        masteries = [
+            (record, skill)
+            for record, skill in session.exec(
+                select(UserSkillMastery, Skill)
+                .join(Skill, Skill.id == UserSkillMastery.skill_id)
+                .where(UserSkillMastery.user_id == user_id)
+                .order_by(UserSkillMastery.mastery.asc())
+            ).all()
+        ]
+    return PlannerContext(
+        user_id=user_id,
+        behavior=behavior,
+        masteries=masteries,
+        recent_attempts=recent_attempts(session, user_id, RECENT_WINDOW) if include_attempts else [],
+        memory_items=_memory_items_by_due(session, user_id) if include_memory else [],
+        mistakes=_recent_mistakes(session, user_id) if include_mistakes else [],
+    )
+
+
 def select_exercises_for_session(
     session: Session,
     user_id: UUID,
@@ -548,20 +698,25 @@ def select_exercises_for_session(
     skill_id: Optional[UUID] = None,
     length: int = 3,
     behavior_profile: Optional[BehavioralProfile] = None,
+    context: Optional[PlannerContext] = None,
 ) -> SessionPlan:
     length = max(1, min(10, length))
+    if context is None:
+        context = load_planner_context(session, user_id)
     if skill_id:
         skill = session.get(Skill, skill_id)
         if not skill:
             raise ValueError("skill_not_found")
     else:
-        skill = _pick_skill_for_user(session, user_id)
+        skill = _pick_skill_for_user(session, user_id, context)
 
-    behavior = behavior_profile or get_behavior_profile(session, user_id)
+    behavior = behavior_profile or context.behavior or get_behavior_profile(session, user_id)
     policy = derive_policy(DEFAULT_CHALLENGE_POLICY, behavior)
-    mastery_record = get_mastery_record(session, user_id, skill.id)
+    mastery_record = context.mastery_for(session, skill)
     base_band = _difficulty_band_for_mastery(mastery_record.mastery)
-    performance = compute_recent_performance(session, user_id, skill)
+    performance = compute_recent_performance(
+        session, user_id, skill, attempts_window=context.recent_attempts
+    )
     adjusted_band = _adjust_band(base_band, performance)
     target_low, target_high = adjusted_band
 
@@ -569,7 +724,14 @@ def select_exercises_for_session(
     review_target = min(total_items, int(round(total_items * policy.review_ratio)))
     recent_ids = set(_recent_exercise_ids(performance))
 
-    review_candidates = get_due_mistake_exercises(session, user_id, skill, review_target * 2)
+    review_candidates = get_due_mistake_exercises(
+        session,
+        user_id,
+        skill,
+        review_target * 2,
+        memory_items=context.memory_items,
+        mistakes=context.mistakes,
+    )
     avoid_ids: set[str] = set(recent_ids)
     for candidate in review_candidates:
         avoid_ids.add(candidate.id)
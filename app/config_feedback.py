@@ -20,6 +20,8 @@ class FeedbackSettings:
     max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
     backoff_base_s: float = float(os.getenv("LLM_BACKOFF_S", "0.6"))
 
+    memory_cache_size: int = int(os.getenv("FEEDBACK_MEMORY_CACHE_SIZE", "1024"))
+
 
 def get_feedback_settings() -> FeedbackSettings:
     return FeedbackSettings()
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional
+
+import httpx
+
+logger = logging.getLogger("teski.http")
+
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "10"))
+HTTP_POOL_KEEPALIVE_EXPIRY_S = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY_S", "30"))
+HTTP_ENABLE_HTTP2 = os.getenv("HTTP_ENABLE_HTTP2", "true").lower() in {"1", "true", "yes"}
+
+# httpx only negotiates HTTP/2 when the optional "h2" package is installed.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@dataclass
+class _PooledClient:
+    client: httpx.AsyncClient
+    loop: asyncio.AbstractEventLoop
+    max_connections: int
+    max_keepalive: int
+    http2: bool
+    counters: Dict[str, int] = field(default_factory=lambda: {"requests": 0})
+
+
+_clients: Dict[str, _PooledClient] = {}
+_lock = threading.Lock()
+
+
+def get_http_client(
+    name: str,
+    *,
+    timeout: float = 30.0,
+    headers: Optional[Mapping[str, str]] = None,
+    follow_redirects: bool = False,
+    max_connections: Optional[int] = None,
+    max_keepalive: Optional[int] = None,
+    http2: Optional[bool] = None,
+) -> httpx.AsyncClient:
+    """
+    Return the shared ``AsyncClient`` registered under ``name``, creating it on
+    first use. Each name talks to one upstream host, so its pool limits act as
+    per-host connection limits. The options only apply when the client is built.
+
+    Clients are tied to the event loop that created them; a call from another
+    loop (e.g. a second ``asyncio.run``) gets a fresh client for that loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        pooled = _clients.get(name)
+        if pooled is not None and pooled.loop is loop and not pooled.client.is_closed:
+            return pooled.client
+
+        limit = max_connections or HTTP_POOL_MAX_CONNECTIONS
+        keepalive = min(limit, max_keepalive or HTTP_POOL_MAX_KEEPALIVE)
+        use_http2 = (HTTP_ENABLE_HTTP2 if http2 is None else http2) and HTTP2_AVAILABLE
+        counters = {"requests": 0}
+
+        async def _on_request(request: httpx.Request) -> None:
+            counters["requests"] += 1
+
+        client = httpx.AsyncClient(
+            timeout=timeout,
+            headers=dict(headers or {}),
+            follow_redirects=follow_redirects,
+            http2=use_http2,
+            limits=httpx.Limits(
+                max_connections=limit,
+                max_keepalive_connections=keepalive,
+                keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY_S,
+            ),
+            event_hooks={"request": [_on_request]},
+        )
+        _clients[name] = _PooledClient(
+            client=client,
+            loop=loop,
+            max_connections=limit,
+            max_keepalive=keepalive,
+            http2=use_http2,
+            counters=counters,
+        )
+        return client
+
+
+def _pool_usage(client: httpx.AsyncClient) -> Dict[str, int]:
+    # httpcore does not expose pool metrics publicly; read them defensively
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for conn in connections if conn.is_idle())
+    return {
+        "connections": len(connections),
+        "idle": idle,
+        "active": len(connections) - idle,
+        "queued": len(getattr(pool, "_requests", []) or []),
+    }
+
+
+def http_client_stats() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        items = list(_clients.items())
+    stats: Dict[str, Dict[str, Any]] = {}
+    for name, pooled in items:
+        data: Dict[str, Any] = {
+            "max_connections": pooled.max_connections,
+            "max_keepalive": pooled.max_keepalive,
+            "http2": pooled.http2,
+            "closed": pooled.client.is_closed,
+            "requests": pooled.counters["requests"],
+        }
+        try:
+            data.update(_pool_usage(pooled.client))
+        except Exception:  # pragma: no cover - private httpcore API changed
+            logger.debug("pool usage unavailable for %s", name, exc_info=True)
+        stats[name] = data
+    return stats
+
+
+async def close_http_clients() -> None:
+    """Close every registered client; called from the app shutdown hook."""
+    with _lock:
+        items = list(_clients.items())
+        _clients.clear()
+    current = asyncio.get_running_loop()
+    for name, pooled in items:
+        if pooled.loop is not current or pooled.client.is_closed:
+            continue
+        try:
+            await pooled.client.aclose()
+        except Exception:  # pragma: no cover - best effort on shutdown
+            logger.warning("failed to close http client %s", name, exc_info=True)
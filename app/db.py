@@ -3,8 +3,10 @@ from __future__ import annotations
 from collections.abc import AsyncGenerator
 
 from contextlib import contextmanager
-from typing import Generator
+from typing import Any, Dict, Generator, List, Sequence
 
+from sqlalchemy import Table
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlmodel import Session, create_engine
 
 from app.config import get_settings
@@ -34,3 +36,30 @@ def get_session() -> Generator[Session, None, None]:
 
 def get_engine():
     return engine
+
+
+def upsert_add(
+    session: Session,
+    table: Table,
+    rows: List[Dict[str, Any]],
+    *,
+    key_columns: Sequence[str],
+    sum_columns: Sequence[str],
+) -> None:
+    """
+    Insert ``rows`` into ``table``; on a key conflict add ``sum_columns`` onto the
+    existing row and overwrite every other given column.
+
+    One INSERT .. ON CONFLICT DO UPDATE (PostgreSQL or SQLite) is issued, so
+    concurrent writers never lose each other's increments. Nothing is committed.
+    """
+    if not rows:
+        return
+    dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(table)
+    updates = {col: table.c[col] + stmt.excluded[col] for col in sum_columns}
+    for col in rows[0]:
+        if col not in updates and col not in key_columns:
+            updates[col] = stmt.excluded[col]
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c[col] for col in key_columns], set_=updates)
+    session.exec(stmt, params=rows)
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import case
+from sqlmodel import Session, func, select
+
+from ..db import upsert_add
+from .models import ConfidenceCalibration, ConfidenceLog
+
+logger = logging.getLogger("teski.deep.calibration")
+
+ALL_BUCKETS = 0
+CONFIDENCE_BUCKETS = (1, 2, 3, 4, 5)
+_SUMS = ("total", "correct", "confidence_sum")
+
+
+def expected_accuracy_pct(confidence: float) -> float:
+    """Accuracy a perfectly calibrated learner reports at this confidence (1 -> 20 %, 5 -> 100 %)."""
+    return confidence * 20.0
+
+
+def _bump(session: Session, rows: List[Dict[str, Any]]) -> None:
+    upsert_add(
+        session,
+        ConfidenceCalibration.__table__,
+        rows,
+        key_columns=("user_id", "topic_id", "confidence"),
+        sum_columns=_SUMS,
+    )
+
+
+def _bucket_rows(
+    user_id: UUID, topic_id: str, confidence: int, *, total: int, correct: int, now: datetime
+) -> List[Dict[str, Any]]:
+    """The increments one confidence level contributes: its own bucket and the all-levels row."""
+    return [
+        {
+            "user_id": user_id,
+            "topic_id": topic_id,
+            "confidence": bucket,
+            "total": total,
+            "correct": correct,
+            "confidence_sum": confidence * total,
+            "updated_at": now,
+        }
+        for bucket in (ALL_BUCKETS, confidence)
+    ]
+
+
+def record_confidence(session: Session, row: ConfidenceLog) -> ConfidenceLog:
+    """
+    Add a confidence answer and count it into the user's calibration for the
+    topic. The caller commits, so the log row and its counts land together.
+    """
+    session.add(row)
+    _bump(
+        session,
+        _bucket_rows(
+            row.user_id,
+            row.topic_id,
+            int(row.confidence),
+            total=1,
+            correct=1 if row.correct else 0,
+            now=datetime.utcnow(),
+        ),
+    )
+    return row
+
+
+def calibration_summary(session: Session, user_id: UUID, topic_id: str) -> Dict[str, float]:
+    """Average confidence, accuracy and their gap: a primary-key read of the totals row."""
+    agg = session.get(ConfidenceCalibration, (user_id, topic_id, ALL_BUCKETS))
+    if agg is None or not agg.total:
+        return {"avg_confidence": 0.0, "accuracy_pct": 0.0, "calibration_error": 0.0}
+    avg_conf = agg.confidence_sum / agg.total
+    accuracy = 100.0 * agg.correct / agg.total
+    return {
+        "avg_confidence": round(avg_conf, 2),
+        "accuracy_pct": round(accuracy, 2),
+        "calibration_error": round(expected_accuracy_pct(avg_conf) - accuracy, 2),
+    }
+
+
+def calibration_bins(session: Session, user_id: UUID, topic_id: str) -> Dict[str, Any]:
+    """
+    Reliability curve: observed vs expected accuracy per confidence level, plus
+    the expected calibration error (count-weighted mean absolute gap).
+    """
+    rows = {
+        agg.confidence: agg
+        for agg in session.exec(
+            select(ConfidenceCalibration).where(
+                ConfidenceCalibration.user_id == user_id,
+                ConfidenceCalibration.topic_id == topic_id,
+            )
+        ).all()
+    }
+    totals = rows.get(ALL_BUCKETS)
+    n = totals.total if totals else 0
+    bins: List[Dict[str, Any]] = []
+    ece = 0.0
+    for bucket in CONFIDENCE_BUCKETS:
+        agg = rows.get(bucket)
+        count = agg.total if agg else 0
+        expected = expected_accuracy_pct(bucket)
+        accuracy: Optional[float] = 100.0 * agg.correct / count if count else None
+        gap = expected - accuracy if accuracy is not None else None
+        if gap is not None and n:
+            ece += (count / n) * abs(gap)
+        bins.append(
+            {
+                "confidence": bucket,
+                "count": count,
+                "correct": agg.correct if agg else 0,
+                "expected_pct": expected,
+                "accuracy_pct": round(accuracy, 2) if accuracy is not None else None,
+                "gap_pct": round(gap, 2) if gap is not None else None,
+            }
+        )
+    return {"total": n, "expected_calibration_error": round(ece, 2), "bins": bins}
+
+
+def rebuild_calibration(session: Session) -> int:
+    """Replace every calibration count with a recount of ``ConfidenceLog``; returns the rows written."""
+    grouped = session.exec(
+        select(
+            ConfidenceLog.user_id,
+            ConfidenceLog.topic_id,
+            ConfidenceLog.confidence,
+            func.count(ConfidenceLog.id),
+            func.sum(case((ConfidenceLog.correct.is_(True), 1), else_=0)),
+        ).group_by(ConfidenceLog.user_id, ConfidenceLog.topic_id, ConfidenceLog.confidence)
+    ).all()
+    now = datetime.utcnow()
+    merged: Dict[tuple, Dict[str, Any]] = {}
+    for user_id, topic_id, confidence, count, correct in grouped:
+        increments = _bucket_rows(
+            user_id, topic_id, int(confidence), total=int(count), correct=int(correct or 0), now=now
+        )
+        for row in increments:
+            # Every level feeds the same all-levels row; merge so each key is written once.
+            key = (row["user_id"], row["topic_id"], row["confidence"])
+            if key not in merged:
+                merged[key] = row
+                continue
+            for col in _SUMS:
+                merged[key][col] += row[col]
+    session.exec(ConfidenceCalibration.__table__.delete())
+    _bump(session, list(merged.values()))
+    session.commit()
+    return len(merged)
+
+
+def ensure_calibration_aggregates(session: Session) -> Optional[int]:
+    """
+    Build the calibration counts for confidence logs written before they were
+    kept. Runs at startup and does nothing once any count exists.
+    """
+    if session.exec(select(ConfidenceCalibration.topic_id).limit(1)).first() is not None:
+        return None
+    if session.exec(select(ConfidenceLog.id).limit(1)).first() is None:
+        return None
+    written = rebuild_calibration(session)
+    logger.info("built %s confidence calibration rows from existing logs", written)
+    return written
@@ -33,6 +33,22 @@ class ConfidenceLog(AppSQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
 
 
+class ConfidenceCalibration(AppSQLModel, table=True):
+    """
+    Running totals of ``ConfidenceLog`` per (user, topic), bumped in the same
+    transaction as each log row. ``confidence`` is the 1-5 bucket, or 0 for
+    the all-buckets total.
+    """
+
+    user_id: UUID = Field(primary_key=True)
+    topic_id: str = Field(primary_key=True)
+    confidence: int = Field(primary_key=True)
+    total: int = 0
+    correct: int = 0
+    confidence_sum: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class ConceptMap(AppSQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: UUID = Field(index=True)
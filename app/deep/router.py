@@ -6,12 +6,14 @@ from typing import Dict, List, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 from openai import AsyncOpenAI
 
 from ..db import get_session
 from ..feedback.router import call_llm
-from ..prefs.models import UserPrefs
+from ..prefs.cache import load_prefs
+from .calibration import calibration_bins, calibration_summary, record_confidence
 from .models import ConceptMap, ConfidenceLog, ReviewSettings, SelfExplanation
 from .schemas import (
     ConceptMapOut,
@@ -25,7 +27,7 @@ from .schemas import (
     SettingsIn,
     SettingsOut,
 )
-from .stt import transcribe_audio
+from .stt import ENABLE_WHISPER, SttBusy, SttError, SttTimeout, stream_transcription, transcribe_audio
 
 router = APIRouter(prefix="/deep", tags=["deep-learning"])
 FEYNMAN_MODEL = os.getenv("FEYNMAN_EVAL_MODEL", "mini:gpt4_1")
@@ -95,24 +97,11 @@ A: ...
 """
 
 
-def _has_pref(session: Session, user_id: Optional[UUID], field: str) -> bool:
-    if not user_id:
-        return False
-    row = session.exec(select(UserPrefs).where(UserPrefs.user_id == user_id)).first()
-    return bool(getattr(row, field, False)) if row else False
-
-
-def _require_pref(session: Session, user_id: UUID, field: str, message: str) -> None:
-    if not _has_pref(session, user_id, field):
-        raise HTTPException(status_code=403, detail=message)
-
-
 @router.post("/explain/submit", response_model=ExplainOut)
 async def submit_explanation(payload: ExplainIn, session: Session = Depends(get_session)):
-    _require_pref(session, payload.user_id, "allow_llm_feedback", "LLM feedback is disabled in your preferences.")
-    _require_pref(
-        session,
-        payload.user_id,
+    prefs = load_prefs(session, payload.user_id)
+    prefs.require("allow_llm_feedback", "LLM feedback is disabled in your preferences.")
+    prefs.require(
         "store_self_explanations",
         "Storing self-explanations is disabled in your preferences.",
     )
@@ -162,17 +151,58 @@ async def transcribe_explanation_audio(
     file: UploadFile = File(...),
     session: Session = Depends(get_session),
 ):
-    _require_pref(session, user_id, "allow_voice_stt", "Voice transcription is disabled in your preferences.")
-    text = await transcribe_audio(file)
+    load_prefs(session, user_id).require("allow_voice_stt", "Voice transcription is disabled in your preferences.")
+    try:
+        text = await transcribe_audio(file)
+    except SttBusy:
+        raise HTTPException(status_code=503, detail="Transcription is busy, try again shortly")
+    except SttTimeout:
+        raise HTTPException(status_code=504, detail="Transcription timed out")
     if not text:
         raise HTTPException(status_code=400, detail="Transcription unavailable")
     return {"text": text}
 
 
+@router.post("/explain/transcribe/stream")
+async def stream_explanation_audio(
+    user_id: UUID,
+    file: UploadFile = File(...),
+    session: Session = Depends(get_session),
+):
+    """Newline-delimited JSON: one ``{"text": ...}`` per decoded segment."""
+    load_prefs(session, user_id).require("allow_voice_stt", "Voice transcription is disabled in your preferences.")
+    if not ENABLE_WHISPER:
+        raise HTTPException(status_code=400, detail="Transcription unavailable")
+    segments = stream_transcription(await file.read(), file.filename)
+    # Wait for the first segment so a full queue still maps to a status code.
+    try:
+        first = await segments.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=400, detail="Transcription unavailable")
+    except SttBusy:
+        raise HTTPException(status_code=503, detail="Transcription is busy, try again shortly")
+    except SttTimeout:
+        raise HTTPException(status_code=504, detail="Transcription timed out")
+    except Exception:
+        raise HTTPException(status_code=400, detail="Transcription unavailable")
+
+    async def lines():
+        yield json.dumps({"text": first}) + "\n"
+        try:
+            async for segment in segments:
+                yield json.dumps({"text": segment}) + "\n"
+        except SttError as exc:
+            yield json.dumps({"error": type(exc).__name__, "detail": str(exc)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.post("/elaborate", response_model=ElaborateOut)
 async def elaborate(payload: ElaborateIn, user_id: Optional[UUID] = None, session: Session = Depends(get_session)):
     if user_id:
-        _require_pref(session, user_id, "allow_elaboration_prompts", "Elaboration prompts are disabled in your preferences.")
+        load_prefs(session, user_id).require(
+            "allow_elaboration_prompts", "Elaboration prompts are disabled in your preferences."
+        )
     txt = await call_llm(
         "mini:haiku4_5",
         ELABORATE_PROMPT.format(topic=payload.topic, ans=payload.user_answer),
@@ -193,38 +223,35 @@ async def elaborate(payload: ElaborateIn, user_id: Optional[UUID] = None, sessio
 
 @router.post("/confidence/log")
 async def log_confidence(payload: ConfidenceIn, session: Session = Depends(get_session)):
-    _require_pref(session, payload.user_id, "allow_transfer_checks", "Confidence logging is disabled in your preferences.")
-    row = ConfidenceLog(**payload.model_dump())
-    session.add(row)
+    load_prefs(session, payload.user_id).require(
+        "allow_transfer_checks", "Confidence logging is disabled in your preferences."
+    )
+    row = record_confidence(session, ConfidenceLog(**payload.model_dump()))
     session.commit()
     return {"status": "ok", "id": row.id}
 
 
 @router.get("/confidence/calibration")
 async def calibration(user_id: UUID, topic_id: str, session: Session = Depends(get_session)):
-    _require_pref(session, user_id, "allow_transfer_checks", "Confidence analytics are disabled in your preferences.")
-    rows = session.exec(
-        select(ConfidenceLog).where(
-            ConfidenceLog.user_id == user_id,
-            ConfidenceLog.topic_id == topic_id,
-        )
-    ).all()
-    if not rows:
-        return {"avg_confidence": 0.0, "accuracy_pct": 0.0, "calibration_error": 0.0}
-    avg_conf = sum(r.confidence for r in rows) / len(rows)
-    accuracy = 100.0 * (sum(1 for r in rows if r.correct) / len(rows))
-    expected = avg_conf * 20.0
-    return {
-        "avg_confidence": round(avg_conf, 2),
-        "accuracy_pct": round(accuracy, 2),
-        "calibration_error": round(expected - accuracy, 2),
-    }
+    load_prefs(session, user_id).require(
+        "allow_transfer_checks", "Confidence analytics are disabled in your preferences."
+    )
+    return calibration_summary(session, user_id, topic_id)
+
+
+@router.get("/confidence/calibration/bins")
+async def calibration_curve(user_id: UUID, topic_id: str, session: Session = Depends(get_session)):
+    load_prefs(session, user_id).require(
+        "allow_transfer_checks", "Confidence analytics are disabled in your preferences."
+    )
+    return calibration_bins(session, user_id, topic_id)
 
 
 @router.post("/conceptmap/save", response_model=ConceptMapOut)
 async def conceptmap_save(payload: ConceptMapSaveIn, session: Session = Depends(get_session)):
-    _require_pref(session, payload.user_id, "allow_concept_maps", "Concept maps are disabled in your preferences.")
-    _require_pref(session, payload.user_id, "store_concept_maps", "Saving concept maps is disabled in your preferences.")
+    prefs = load_prefs(session, payload.user_id)
+    prefs.require("allow_concept_maps", "Concept maps are disabled in your preferences.")
+    prefs.require("store_concept_maps", "Saving concept maps is disabled in your preferences.")
     row = session.exec(
         select(ConceptMap).where(
             ConceptMap.user_id == payload.user_id,
@@ -246,7 +273,8 @@ async def conceptmap_save(payload: ConceptMapSaveIn, session: Session = Depends(
 
 @router.get("/conceptmap/me", response_model=ConceptMapOut)
 async def conceptmap_me(user_id: UUID, topic_id: str, session: Session = Depends(get_session)):
-    if not _has_pref(session, user_id, "allow_concept_maps") or not _has_pref(session, user_id, "store_concept_maps"):
+    prefs = load_prefs(session, user_id)
+    if not prefs.allows("allow_concept_maps") or not prefs.allows("store_concept_maps"):
         return ConceptMapOut(topic_id=topic_id, graph_json={"nodes": [], "edges": []})
     row = session.exec(
         select(ConceptMap).where(
@@ -275,10 +303,8 @@ async def set_interleaving(payload: SettingsIn, session: Session = Depends(get_s
 
 @router.get("/explain/history", response_model=HistoryOut)
 async def explain_history(user_id: UUID, topic_id: str, session: Session = Depends(get_session)):
-    if not (
-        _has_pref(session, user_id, "allow_llm_feedback")
-        and _has_pref(session, user_id, "store_self_explanations")
-    ):
+    prefs = load_prefs(session, user_id)
+    if not (prefs.allows("allow_llm_feedback") and prefs.allows("store_self_explanations")):
         return HistoryOut(items=[])
     rows = session.exec(
         select(SelfExplanation)
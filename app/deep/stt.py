@@ -1,45 +1,391 @@
 from __future__ import annotations
 
+import asyncio
+import concurrent.futures
+import io
+import logging
 import os
-from tempfile import NamedTemporaryFile
-from typing import Optional
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
 from fastapi import UploadFile
 
+logger = logging.getLogger("teski.deep.stt")
+
 ENABLE_WHISPER = os.getenv("ENABLE_WHISPER", "false").lower() in {"1", "true", "yes"}
 WHISPER_PROVIDER = os.getenv("WHISPER_PROVIDER", "local")
 WHISPER_MODEL_BASE = os.getenv("WHISPER_MODEL_BASE", "tiny")
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "1"))
+WHISPER_QUEUE_SIZE = int(os.getenv("WHISPER_QUEUE_SIZE", "8"))
+WHISPER_TIMEOUT_S = float(os.getenv("WHISPER_TIMEOUT_S", "60"))
+# Seconds of audio decoded per window; 0 keeps the model's default (30 s).
+WHISPER_CHUNK_S = int(os.getenv("WHISPER_CHUNK_S", "0"))
+WHISPER_PRELOAD = os.getenv("WHISPER_PRELOAD", "true").lower() in {"1", "true", "yes"}
+# After a failed model load, requests fail fast for this long before the load is retried.
+WHISPER_LOAD_RETRY_S = float(os.getenv("WHISPER_LOAD_RETRY_S", "30"))
 
 
-async def transcribe_audio(file: UploadFile) -> Optional[str]:
-    if not ENABLE_WHISPER:
-        return None
+class SttError(Exception):
+    """Base class for transcription failures the router maps to HTTP errors."""
 
-    if WHISPER_PROVIDER == "openai":
+
+class SttBusy(SttError):
+    """The transcription queue is full."""
+
+
+class SttTimeout(SttError):
+    """The request's deadline passed before transcription finished."""
+
+
+def _load_whisper_model(workers: int) -> Any:
+    from faster_whisper import WhisperModel
+
+    # num_workers lets that many threads run transcribe() on one model in parallel.
+    return WhisperModel(WHISPER_MODEL_BASE, compute_type="int8", num_workers=max(1, workers))
+
+
+def _post(loop: asyncio.AbstractEventLoop, target: "asyncio.Queue[Optional[str]]", item: Optional[str]) -> None:
+    try:
+        loop.call_soon_threadsafe(target.put_nowait, item)
+    except RuntimeError:  # the requesting loop is gone; nobody is listening
+        pass
+
+
+@dataclass
+class SttJob:
+    audio: bytes
+    deadline: float
+    on_segment: Optional[Callable[[str], None]] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    future: "concurrent.futures.Future[Optional[str]]" = field(default_factory=concurrent.futures.Future)
+    abandoned: threading.Event = field(default_factory=threading.Event)
+
+    def cancel(self) -> None:
+        """Drop a queued job, or stop a running one at its next segment."""
+        self.abandoned.set()
+        self.future.cancel()
+
+
+class SttWorkerPool:
+    """
+    Resident faster-whisper workers fed from a bounded queue.
+
+    The model is loaded once, by the first worker thread, and shared by all
+    workers; CTranslate2 releases the GIL while decoding, so threads run in
+    parallel. Audio is passed as bytes (no temp files) and segments are decoded
+    lazily, so a request whose deadline passes stops consuming the model at the
+    next segment. ``submit`` fails fast with :class:`SttBusy` once
+    ``max_queue`` jobs are waiting. A failed model load is retried by the first
+    job that arrives ``load_retry_s`` after it.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = WHISPER_WORKERS,
+        max_queue: int = WHISPER_QUEUE_SIZE,
+        timeout_s: float = WHISPER_TIMEOUT_S,
+        chunk_s: int = WHISPER_CHUNK_S,
+        load_retry_s: float = WHISPER_LOAD_RETRY_S,
+        model_factory: Callable[[int], Any] = _load_whisper_model,
+    ) -> None:
+        self._workers = max(1, workers)
+        self._queue: "queue.Queue[SttJob]" = queue.Queue(maxsize=max(1, max_queue))
+        self._timeout_s = timeout_s
+        self._chunk_s = chunk_s
+        self._model_factory = model_factory
+        self._model: Any = None
+        self._model_error: Optional[BaseException] = None
+        self._load_retry_s = max(0.0, load_retry_s)
+        self._model_retry_at = 0.0
+        self._model_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._counters: Dict[str, float] = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "audio_s": 0.0,
+            "processing_s": 0.0,
+            "queue_wait_s": 0.0,
+            "model_load_s": 0.0,
+        }
+        self._last_rtf: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"stt-worker-{i}", daemon=True) for i in range(self._workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the workers; jobs still queued fail with :class:`SttBusy`."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job.future.set_running_or_notify_cancel():
+                job.future.set_exception(SttBusy("transcription worker stopped"))
+
+    # -- submission ----------------------------------------------------------
+
+    def submit(
+        self,
+        audio: bytes,
+        *,
+        timeout_s: Optional[float] = None,
+        on_segment: Optional[Callable[[str], None]] = None,
+    ) -> SttJob:
+        job = SttJob(
+            audio=audio,
+            deadline=time.monotonic() + (self._timeout_s if timeout_s is None else timeout_s),
+            on_segment=on_segment,
+        )
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._bump("rejected")
+            raise SttBusy(f"{self._queue.maxsize} transcriptions already queued") from None
+        self._bump("submitted")
+        return job
+
+    async def transcribe(self, audio: bytes, *, timeout_s: Optional[float] = None) -> Optional[str]:
+        timeout = self._timeout_s if timeout_s is None else timeout_s
+        job = self.submit(audio, timeout_s=timeout)
         try:
-            from openai import OpenAI
-
-            client = OpenAI()
-            with NamedTemporaryFile(delete=True) as tmp:
-                content = await file.read()
-                tmp.write(content)
-                tmp.flush()
-                with open(tmp.name, "rb") as fp:
-                    resp = client.audio.transcriptions.create(model="whisper-1", file=fp)
-                return getattr(resp, "text", None)
+            return await asyncio.wait_for(asyncio.wrap_future(job.future), timeout)
+        except asyncio.TimeoutError:
+            if job.future.cancelled():  # dropped while queued: the worker never counts it
+                self._bump("timeouts")
+            raise SttTimeout(f"transcription exceeded {timeout:.0f}s") from None
+        finally:
+            if not job.future.done():
+                job.cancel()
+
+    async def stream(self, audio: bytes, *, timeout_s: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield transcript segments as the worker decodes them."""
+        timeout = self._timeout_s if timeout_s is None else timeout_s
+        loop = asyncio.get_running_loop()
+        segments: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        job = self.submit(
+            audio,
+            timeout_s=timeout,
+            on_segment=lambda text: _post(loop, segments, text),
+        )
+        # Runs on the worker thread after the last on_segment call, so the
+        # sentinel is queued behind every segment.
+        job.future.add_done_callback(lambda _: _post(loop, segments, None))
+        deadline = loop.time() + timeout
+        try:
+            while True:
+                try:
+                    text = await asyncio.wait_for(segments.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    raise SttTimeout(f"transcription exceeded {timeout:.0f}s") from None
+                if text is None:
+                    break
+                yield text
+            if job.future.cancelled():
+                raise SttTimeout("transcription cancelled")
+            job.future.result()  # re-raise worker failures
+        finally:
+            if not job.future.done():  # timed out or the client went away
+                job.cancel()
+
+    # -- workers -------------------------------------------------------------
+
+    def _ensure_model(self) -> Any:
+        with self._model_lock:
+            if self._model is not None:
+                return self._model
+            if self._model_error is not None and time.monotonic() < self._model_retry_at:
+                raise self._model_error
+            started = time.perf_counter()
+            try:
+                self._model = self._model_factory(self._workers)
+            except Exception as exc:
+                logger.exception(
+                    "failed to load whisper model %s; retrying in %.0fs", WHISPER_MODEL_BASE, self._load_retry_s
+                )
+                self._model_error = exc
+                self._model_retry_at = time.monotonic() + self._load_retry_s
+                raise
+            finally:
+                self._bump("model_load_s", time.perf_counter() - started)
+            self._model_error = None
+            return self._model
+
+    def _run(self) -> None:
+        try:
+            self._ensure_model()  # warm up before the first request arrives
         except Exception:
-            return None
+            pass
+        while not self._stop.is_set():
+            try:
+                job = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            self._bump("queue_wait_s", time.monotonic() - job.enqueued_at)
+            with self._lock:
+                self._busy += 1
+            try:
+                job.future.set_result(self._process(job))
+                self._bump("completed")
+            except SttTimeout as exc:
+                self._bump("timeouts")
+                job.future.set_exception(exc)
+            except Exception as exc:
+                logger.warning("transcription failed: %s", exc)
+                self._bump("failed")
+                job.future.set_exception(exc)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+
+    def _process(self, job: SttJob) -> Optional[str]:
+        if job.abandoned.is_set() or time.monotonic() >= job.deadline:
+            raise SttTimeout("deadline passed while queued")
+        model = self._ensure_model()
+        started = time.perf_counter()
+        options: Dict[str, Any] = {"beam_size": 1, "vad_filter": True}
+        if self._chunk_s > 0:
+            options["chunk_length"] = self._chunk_s
+        segments, info = model.transcribe(io.BytesIO(job.audio), **options)
+        parts: List[str] = []
+        for segment in segments:  # lazy: each step decodes the next window
+            if job.abandoned.is_set() or time.monotonic() >= job.deadline:
+                raise SttTimeout("deadline passed while decoding")
+            text = segment.text.strip()
+            if text:
+                parts.append(text)
+                if job.on_segment is not None:
+                    job.on_segment(text)
+        elapsed = time.perf_counter() - started
+        duration = float(getattr(info, "duration", 0.0) or 0.0)
+        self._bump("processing_s", elapsed)
+        self._bump("audio_s", duration)
+        if duration > 0:
+            with self._lock:
+                self._last_rtf = elapsed / duration
+        return " ".join(parts).strip() or None
+
+    # -- metrics -------------------------------------------------------------
+
+    def _bump(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[key] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = dict(self._counters)
+            data["busy"] = self._busy
+            data["last_realtime_factor"] = round(self._last_rtf, 3) if self._last_rtf is not None else None
+        data["workers"] = self._workers
+        data["queued"] = self._queue.qsize()
+        data["max_queue"] = self._queue.maxsize
+        data["model_loaded"] = self._model is not None
+        data["model_error"] = repr(self._model_error) if self._model_error is not None else None
+        # processing time per second of audio; < 1 means faster than realtime
+        data["realtime_factor"] = round(data["processing_s"] / data["audio_s"], 3) if data["audio_s"] else None
+        for key in ("audio_s", "processing_s", "queue_wait_s", "model_load_s"):
+            data[key] = round(data[key], 3)
+        return data
+
+
+_pool: Optional[SttWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_stt_pool() -> SttWorkerPool:
+    """Return the process-wide pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SttWorkerPool()
+        _pool.start()
+        return _pool
+
+
+def start_stt_pool() -> Optional[SttWorkerPool]:
+    """Preload the local model at startup when whisper is enabled."""
+    if not (ENABLE_WHISPER and WHISPER_PROVIDER != "openai" and WHISPER_PRELOAD):
+        return None
+    return get_stt_pool()
+
+
+def stop_stt_pool(timeout: float = 5.0) -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.stop(timeout)
+
 
+def stt_pool_stats() -> Dict[str, Any]:
+    pool = _pool
+    if pool is None:
+        return {"enabled": ENABLE_WHISPER, "provider": WHISPER_PROVIDER, "running": False}
+    return {"enabled": ENABLE_WHISPER, "provider": WHISPER_PROVIDER, "running": pool.running, **pool.stats()}
+
+
+async def _transcribe_openai(filename: Optional[str], content: bytes) -> Optional[str]:
     try:
-        from faster_whisper import WhisperModel
-
-        model = WhisperModel(WHISPER_MODEL_BASE, compute_type="int8")
-        with NamedTemporaryFile(delete=True, suffix=".wav") as tmp:
-            content = await file.read()
-            tmp.write(content)
-            tmp.flush()
-            segments, _ = model.transcribe(tmp.name, beam_size=1, vad_filter=True)
-            text = " ".join(segment.text.strip() for segment in segments)
-            return text.strip() or None
+        from openai import OpenAI
+
+        client = OpenAI()
+        resp = await asyncio.to_thread(
+            client.audio.transcriptions.create,
+            model="whisper-1",
+            file=(filename or "audio.wav", content),
+        )
+        return getattr(resp, "text", None)
     except Exception:
         return None
+
+
+async def transcribe_audio(file: UploadFile) -> Optional[str]:
+    """Transcribe an upload; raises :class:`SttBusy`/:class:`SttTimeout` under load."""
+    if not ENABLE_WHISPER:
+        return None
+    content = await file.read()
+    if WHISPER_PROVIDER == "openai":
+        return await _transcribe_openai(file.filename, content)
+    try:
+        return await get_stt_pool().transcribe(content)
+    except SttError:
+        raise
+    except Exception:
+        return None
+
+
+async def stream_transcription(audio: bytes, filename: Optional[str] = None) -> AsyncIterator[str]:
+    """Yield transcript segments as they are decoded (the OpenAI provider yields one)."""
+    if WHISPER_PROVIDER == "openai":
+        text = await _transcribe_openai(filename, audio)
+        if text:
+            yield text
+        return
+    async for segment in get_stt_pool().stream(audio):
+        yield segment
@@ -4,20 +4,21 @@ import json
 from collections import defaultdict, deque
 from datetime import datetime, timedelta
 from functools import lru_cache
-from typing import Any, Deque, Dict, List, Optional, Tuple
+from typing import Any, Deque, Dict, List, Optional
 from uuid import UUID
 
 import random
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
-from sqlalchemy import func
-from sqlmodel import Session, select
+from sqlmodel import Session
 
 from app.analytics import log as log_event
-from app.behavioral.model import get_behavior_profile, recommend_session_length
+from app.attempts import current_correct_streak, record_attempt, today_attempt_counts
+from app.behavioral.model import recommend_session_length
 from app.challenge.engine import (
     derive_skill_name_for_exercise,
+    load_planner_context,
     plan_to_response_items,
     select_exercises_for_session,
 )
@@ -29,10 +30,9 @@ from app.detectors import classify_mistake
 from app.exercises import Exercise, grade, load_exercises
 from app.mastery.models import Skill
 from app.mastery.service import get_or_create_skill, update_mastery
-from app.models import AnalyticsEvent, Mistake, User
+from app.models import Mistake, User
 from app.persona_reactions import PersonaReaction, generate_persona_reaction
 from app.scheduler import get_next_reviews, schedule_from_mistake
-from app.timeutil import user_day_bounds
 from app.xp import award as award_xp
 from app.data.mock_exercises import MOCK_EXERCISES
 
@@ -361,14 +361,22 @@ def submit_exercise(
     exercise = _get_exercise(exercise_id)
     _validate_payload(exercise, payload)
     user = _ensure_user(session, user_id)
-    correct_today, incorrect_today = _today_exercise_counts(session, user)
-    streak_before = _exercise_correct_streak(session, user)
+    correct_today, incorrect_today = today_attempt_counts(session, user)
+    streak_before = current_correct_streak(session, user.id)
 
     correct, info = grade(payload, exercise)
 
     skill_name = derive_skill_name_for_exercise(exercise)
     skill = get_or_create_skill(session, skill_name)
     mastery_changes: List[Dict[str, Any]] = []
+    record_attempt(
+        session,
+        user.id,
+        exercise_id=exercise.id,
+        skill_key=skill_name.strip().lower(),
+        correct=correct,
+        difficulty=exercise.difficulty,
+    )
 
     if correct:
         xp_awarded = award_xp(user, reason="exercise_correct", session=session)
@@ -484,7 +492,8 @@ def plan_micro_quest(
     session: Session = Depends(get_session),
 ) -> MicroQuestPlanResponse:
     user = _ensure_user(session, payload.user_id)
-    behavior = get_behavior_profile(session, user.id)
+    context = load_planner_context(session, user.id)
+    behavior = context.behavior
     suggested_length = payload.length or recommend_session_length(behavior)
     try:
         plan = select_exercises_for_session(
@@ -493,6 +502,7 @@ def plan_micro_quest(
             skill_id=payload.skill_id,
             length=suggested_length,
             behavior_profile=behavior,
+            context=context,
         )
     except ValueError as exc:  # surface friendly error
         raise HTTPException(status_code=404, detail=str(exc)) from exc
@@ -529,7 +539,7 @@ def next_items(
     if course:
         exercises = [ex for ex in exercises if ex.course == course]
 
-    review_items = get_next_reviews(session, user=user, limit=limit if flow == "review_first" else limit)
+    review_items = get_next_reviews(session, user=user, limit=limit)
     remaining = limit
     mixed: List[NextMixedItem] = []
 
@@ -597,50 +607,6 @@ def _exercise_items(exercises: List[Exercise], count: int) -> List[NextMixedItem
     return items
 
 
-def _today_exercise_counts(session: Session, user: User) -> Tuple[int, int]:
-    start, end = user_day_bounds(user.timezone)
-    correct = session.exec(
-        select(func.count()).where(
-            AnalyticsEvent.user_id == user.id,
-            AnalyticsEvent.kind == "exercise_correct",
-            AnalyticsEvent.ts >= start,
-            AnalyticsEvent.ts < end,
-        )
-    ).one()
-    incorrect = session.exec(
-        select(func.count()).where(
-            AnalyticsEvent.user_id == user.id,
-            AnalyticsEvent.kind == "exercise_incorrect",
-            AnalyticsEvent.ts >= start,
-            AnalyticsEvent.ts < end,
-        )
-    ).one()
-    if isinstance(correct, tuple):
-        correct = correct[0]
-    if isinstance(incorrect, tuple):
-        incorrect = incorrect[0]
-    return int(correct or 0), int(incorrect or 0)
-
-
-def _exercise_correct_streak(session: Session, user: User, limit: int = 25) -> int:
-    stmt = (
-        select(AnalyticsEvent.kind)
-        .where(
-            AnalyticsEvent.user_id == user.id,
-            AnalyticsEvent.kind.in_(("exercise_correct", "exercise_incorrect")),
-        )
-        .order_by(AnalyticsEvent.ts.desc())
-        .limit(limit)
-    )
-    streak = 0
-    for row in session.exec(stmt):
-        kind = row[0] if isinstance(row, tuple) else row
-        if kind != "exercise_correct":
-            break
-        streak += 1
-    return streak
-
-
 def _relative_error(delta: Any, expected: Any) -> Optional[float]:
     try:
         delta = float(delta)
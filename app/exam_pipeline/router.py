@@ -15,12 +15,13 @@ from app.exam_pipeline.schemas import (
     PipelineResponse,
 )
 from app.exam_scraper.schemas import CourseSearchResponse, ExamResult
-from app.exam_scraper.course_index import get_sisu_index
+from app.exam_scraper.course_index import get_sisu_index, sisu_index_store
 from app.exam_scraper.scraper import (
     download_pdf,
+    exam_index_store,
     get_cached_index,
-    search_courses,
 )
+from app.exam_scraper.search_index import current_search_index, get_search_index
 from app.exercises import invalidate_cache
 
 # DB integration — present in the deployed backend; silently skipped for local/test env.
@@ -46,8 +47,9 @@ router = APIRouter(prefix="/exam-pipeline", tags=["exam-pipeline"])
 async def search_exams(q: str = Query(..., min_length=1)):
     """Search LUT courses (Sisu catalog + LTKY exam archive).
 
-    Phase 1 searches the full Sisu course index (~1 900 courses, 24-h cache).
-    Phase 2 supplements with any exam-archive courses not in the Sisu cache.
+    Searches the Sisu course index (~1 900 courses, 24-h cache) merged with any
+    exam-archive courses not in Sisu, through the prebuilt course search index
+    (exact code > code prefix > name prefix > substring > fuzzy).
     Results are annotated with has_exams / exam_count / exam_pdf_urls.
 
     No authentication required — public discovery endpoint.
@@ -67,7 +69,8 @@ async def search_exams(q: str = Query(..., min_length=1)):
         )
         exam_rows = await get_cached_index()
         sisu_rows = []
-    matches = search_courses(exam_rows, q, sisu_rows=sisu_rows)
+    index = await get_search_index(exam_rows, sisu_rows)
+    matches = index.search(q)
     return CourseSearchResponse(
         query=q,
         results=[ExamResult(**row) for row in matches],
@@ -219,5 +222,10 @@ def _upsert_to_db(session: Any, exercises: list[GeneratedExerciseOut]) -> None:
 
 @router.get("/health")
 def health() -> dict[str, Any]:
-    """Liveness probe for the exam pipeline."""
-    return {"status": "ok", "source": "https://exams.ltky.fi"}
+    """Liveness probe for the exam pipeline, with the age of each cached index."""
+    return {
+        "status": "ok",
+        "source": "https://exams.ltky.fi",
+        "indexes": {store.name: store.stats() for store in (exam_index_store, sisu_index_store)},
+        "search_index": index.stats() if (index := current_search_index()) else None,
+    }
@@ -16,11 +16,13 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import time
 from typing import Any
 
 import httpx
 
+from app.core.http import get_http_client
+from app.exam_scraper.index_store import IndexStore
+
 logger = logging.getLogger(__name__)
 
 _BASE_URL = "https://sisu.lut.fi/kori/api/course-unit-search"
@@ -30,8 +32,6 @@ _QUERIES = ["a", "e", "i", "o", "u", "r"]
 _HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; Teski/1.0; educational research)"}
 
 SISU_CACHE_TTL: int = 86400  # 24 hours — course catalog changes slowly
-_sisu_cache: list[dict] | None = None
-_sisu_cache_at: float = 0.0
 
 
 async def fetch_sisu_course_index() -> list[dict]:
@@ -47,10 +47,10 @@ async def fetch_sisu_course_index() -> list[dict]:
     list[dict]
         All unique LUT courses discovered across the query set.
     """
-    async with httpx.AsyncClient(headers=_HEADERS, timeout=30, follow_redirects=True) as client:
-        results_per_query: list[list[dict]] = await asyncio.gather(
-            *[_fetch_query(client, q) for q in _QUERIES]
-        )
+    client = get_http_client("sisu", headers=_HEADERS, timeout=30, follow_redirects=True)
+    results_per_query: list[list[dict]] = await asyncio.gather(
+        *[_fetch_query(client, q) for q in _QUERIES]
+    )
 
     seen_codes: set[str] = set()
     results: list[dict] = []
@@ -112,11 +112,9 @@ async def _fetch_query(client: httpx.AsyncClient, q: str) -> list[dict]:
     return items
 
 
+sisu_index_store = IndexStore("sisu_courses", fetch_sisu_course_index, SISU_CACHE_TTL)
+
+
 async def get_sisu_index() -> list[dict]:
-    """Return the cached Sisu course list, refreshing after SISU_CACHE_TTL seconds."""
-    global _sisu_cache, _sisu_cache_at
-    if _sisu_cache is not None and (time.time() - _sisu_cache_at) < SISU_CACHE_TTL:
-        return _sisu_cache
-    _sisu_cache = await fetch_sisu_course_index()
-    _sisu_cache_at = time.time()
-    return _sisu_cache
+    """Return the Sisu course list, refreshed in the background after SISU_CACHE_TTL seconds."""
+    return await sisu_index_store.get()
@@ -0,0 +1,196 @@
+"""Stale-while-revalidate store for the scraped exam and Sisu indexes.
+
+Each :class:`IndexStore` keeps the last good snapshot of one upstream index in
+memory and on disk.  Readers always get the current snapshot immediately; when
+it is older than the TTL, one background task refreshes it and every other
+caller keeps reading the old rows until the new ones are published.  Only a
+cold start with no snapshot on disk waits for the upstream fetch, and
+concurrent cold callers share that single fetch.
+
+Snapshots live under ``EXAM_INDEX_CACHE_DIR`` (default ``.exam_index_cache`` in
+the working directory); set it to ``off`` to keep them in memory only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+DEFAULT_CACHE_DIR = ".exam_index_cache"
+# After a failed refresh, wait this long before asking upstream again.
+RETRY_AFTER_S: float = 300.0
+
+
+def snapshot_dir() -> Path | None:
+    override = os.getenv("EXAM_INDEX_CACHE_DIR")
+    if override is not None:
+        if override.strip().lower() in {"", "0", "off", "false", "no"}:
+            return None
+        return Path(override)
+    return Path(DEFAULT_CACHE_DIR)
+
+
+class IndexStore:
+    """One upstream index served stale-while-revalidate (see module docstring)."""
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Awaitable[list[dict]]],
+        ttl_s: float,
+        *,
+        directory: Path | None | str = "env",
+    ) -> None:
+        self.name = name
+        self.ttl_s = ttl_s
+        self._loader = loader
+        self._directory = directory
+        self._rows: list[dict] | None = None
+        self._fetched_at: float = 0.0
+        self._loaded_from_disk = False
+        self._refresh: asyncio.Task | None = None
+        self._retry_at: float = 0.0
+        self._last_error: str | None = None
+        self._listeners: list[Callable[[list[dict]], None]] = []
+
+    # -- persistence ---------------------------------------------------------
+
+    def _path(self) -> Path | None:
+        directory = snapshot_dir() if self._directory == "env" else self._directory
+        if directory is None:
+            return None
+        return Path(directory) / f"{self.name}.json"
+
+    def _read_snapshot(self) -> None:
+        self._loaded_from_disk = True
+        path = self._path()
+        if path is None or not path.exists():
+            return
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") != SNAPSHOT_VERSION:
+                return
+            self._rows = list(data["rows"])
+            self._fetched_at = float(data["fetched_at"])
+        except Exception as exc:  # corrupt snapshot: refetch
+            logger.warning("ignoring unreadable %s snapshot %s: %s", self.name, path, exc)
+            return
+        self._notify()
+
+    def _write_snapshot(self) -> None:
+        path = self._path()
+        if path is None:
+            return
+        tmp_name: str | None = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(prefix=path.name, suffix=".tmp", dir=path.parent)
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(
+                    {"version": SNAPSHOT_VERSION, "fetched_at": self._fetched_at, "rows": self._rows},
+                    handle,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_name, path)
+        except OSError as exc:  # read-only disks still serve from memory
+            logger.warning("could not persist %s snapshot %s: %s", self.name, path, exc)
+            if tmp_name is not None and os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+
+    # -- refresh -------------------------------------------------------------
+
+    def add_listener(self, callback: Callable[[list[dict]], None]) -> None:
+        """Call ``callback(rows)`` whenever a new snapshot becomes current."""
+        self._listeners.append(callback)
+
+    def _notify(self) -> None:
+        for callback in self._listeners:
+            try:
+                callback(self._rows)
+            except Exception:  # a derived index must not break the store
+                logger.exception("%s index listener failed", self.name)
+
+    def _publish(self, rows: list[dict]) -> None:
+        self._rows = rows
+        self._fetched_at = time.time()
+        self._last_error = None
+        self._write_snapshot()
+        self._notify()
+
+    async def _run_refresh(self) -> list[dict]:
+        try:
+            rows = await self._loader()
+            if not rows and self._rows:
+                raise ValueError("upstream returned no rows; keeping previous snapshot")
+        except Exception as exc:
+            self._last_error = f"{type(exc).__name__}: {exc}"
+            self._retry_at = time.time() + RETRY_AFTER_S
+            raise
+        self._publish(rows)
+        return rows
+
+    def _start_refresh(self) -> asyncio.Task:
+        """Return the running refresh task, starting one if none is in flight."""
+        task = self._refresh
+        if task is None or task.done():
+            task = asyncio.ensure_future(self._run_refresh())
+            task.add_done_callback(self._refresh_done)
+            self._refresh = task
+        return task
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        exc = task.exception()  # retrieve so background failures are not "never retrieved"
+        if exc is not None and self._rows is not None:
+            logger.warning("%s index refresh failed; serving stale snapshot: %s", self.name, exc)
+
+    def is_stale(self, now: float | None = None) -> bool:
+        return ((now or time.time()) - self._fetched_at) >= self.ttl_s
+
+    async def get(self) -> list[dict]:
+        """Current rows; waits for upstream only when nothing has ever been fetched."""
+        if self._rows is None and not self._loaded_from_disk:
+            self._read_snapshot()
+        rows = self._rows
+        if rows is None:
+            return await asyncio.shield(self._start_refresh())
+        now = time.time()
+        if self.is_stale(now) and now >= self._retry_at:
+            self._start_refresh()
+        return rows
+
+    def peek(self) -> list[dict] | None:
+        """Current rows without loading or refreshing anything."""
+        return self._rows
+
+    async def refresh(self) -> list[dict]:
+        """Force a refresh (joining one already in flight) and wait for it."""
+        return await asyncio.shield(self._start_refresh())
+
+    def clear(self) -> None:
+        """Forget the in-memory snapshot (tests); the disk copy is reread on next use."""
+        self._rows = None
+        self._fetched_at = 0.0
+        self._loaded_from_disk = False
+        self._retry_at = 0.0
+        self._refresh = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "rows": len(self._rows) if self._rows is not None else None,
+            "age_s": round(time.time() - self._fetched_at, 1) if self._rows is not None else None,
+            "stale": self._rows is not None and self.is_stale(),
+            "refreshing": self._refresh is not None and not self._refresh.done(),
+            "last_error": self._last_error,
+            "snapshot": str(self._path()) if self._path() else None,
+        }
@@ -9,9 +9,12 @@ Our approach
 ------------
 1. Fetch the full index once (≈25 KB of HTML).
 2. Parse the entire ``<table>`` in Python using only stdlib ``html.parser``.
-3. Cache the parsed rows in memory for :data:`CACHE_TTL` seconds (30 min) to
-   avoid hammering the site.
-4. Apply our own substring filter in :func:`search_courses`.
+3. Cache the parsed rows for :data:`CACHE_TTL` seconds (30 min) to avoid
+   hammering the site; the last good copy is kept on disk and served while a
+   background refresh runs (see :mod:`app.exam_scraper.index_store`).
+4. Search the merged course list through
+   :class:`~app.exam_scraper.search_index.CourseSearchIndex`, rebuilt whenever
+   either index refreshes (see :func:`search_courses`).
 
 Column order in the table (positional, no class names):
     0  course_code  — e.g. "BH30A1801"
@@ -24,12 +27,16 @@ Column order in the table (positional, no class names):
 from __future__ import annotations
 
 import re
-import time
 from html.parser import HTMLParser
 
 import httpx
 from fastapi import HTTPException
 
+from app.core.http import get_http_client
+from app.exam_scraper.course_index import sisu_index_store
+from app.exam_scraper.index_store import IndexStore
+from app.exam_scraper.search_index import course_search_index, start_search_index_build
+
 _INDEX_URL = "https://exams.ltky.fi/"
 _FETCH_TIMEOUT = 20    # seconds
 _DOWNLOAD_TIMEOUT = 30  # seconds
@@ -69,13 +76,29 @@ _RE_DDMMYYYY = re.compile(r"(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{4})")
 _RE_DDMMYY   = re.compile(r"(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{2})")
 
 # ---------------------------------------------------------------------------
-# In-memory cache
+# Cache
 # ---------------------------------------------------------------------------
 
 CACHE_TTL: int = 1800  # 30 minutes
 
-_cache: list[dict] | None = None
-_cache_at: float = 0.0
+
+# ---------------------------------------------------------------------------
+# HTTP client
+# ---------------------------------------------------------------------------
+
+# Index fetches and PDF downloads all hit the same host; share one pooled
+# keep-alive client instead of opening a connection per request.
+_ARCHIVE_MAX_CONNECTIONS = 8
+
+
+def _archive_client() -> httpx.AsyncClient:
+    return get_http_client(
+        "exam_archive",
+        timeout=_DOWNLOAD_TIMEOUT,
+        headers={"User-Agent": _USER_AGENT},
+        follow_redirects=True,
+        max_connections=_ARCHIVE_MAX_CONNECTIONS,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -94,14 +117,10 @@ async def fetch_exam_index() -> str:
     HTTPException(502)
         On any network failure — timeout, DNS error, or non-2xx HTTP status.
     """
-    headers = {"User-Agent": _USER_AGENT}
     try:
-        async with httpx.AsyncClient(
-            timeout=_FETCH_TIMEOUT, follow_redirects=True, headers=headers
-        ) as client:
-            response = await client.get(_INDEX_URL)
-            response.raise_for_status()
-            return response.text
+        response = await _archive_client().get(_INDEX_URL, timeout=_FETCH_TIMEOUT)
+        response.raise_for_status()
+        return response.text
     except HTTPException:
         raise
     except Exception as exc:
@@ -125,20 +144,22 @@ def parse_exam_table(html: str) -> list[dict]:
     return parser.rows
 
 
+async def _load_exam_index() -> list[dict]:
+    return parse_exam_table(await fetch_exam_index())
+
+
+exam_index_store = IndexStore("exam_archive", _load_exam_index, CACHE_TTL)
+
+
 async def get_cached_index() -> list[dict]:
-    """Return the parsed exam table, fetching and caching it if stale.
+    """Return the parsed exam table from :data:`exam_index_store`.
 
-    The cache is module-level and lives for :data:`CACHE_TTL` seconds.
-    Use this function instead of calling :func:`fetch_exam_index` directly
-    from route handlers.
+    Rows older than :data:`CACHE_TTL` seconds are still returned while one
+    background task refreshes them; only a cold start without a disk snapshot
+    waits for the archive.  Use this function instead of calling
+    :func:`fetch_exam_index` directly from route handlers.
     """
-    global _cache, _cache_at
-    if _cache is not None and (time.time() - _cache_at) < CACHE_TTL:
-        return _cache
-    html = await fetch_exam_index()
-    _cache = parse_exam_table(html)
-    _cache_at = time.time()
-    return _cache
+    return await exam_index_store.get()
 
 
 def search_courses(
@@ -146,16 +167,13 @@ def search_courses(
     query: str,
     sisu_rows: list[dict] | None = None,
 ) -> list[dict]:
-    """Two-phase search: Sisu catalog first, then annotate with exam archive data.
-
-    Phase 1: match ``query`` against the Sisu course index (codes + names).
-             For each Sisu match, look up exam archive rows by code to annotate
-             ``has_exams``, ``exam_count``, and ``exam_pdf_urls``.
+    """Ranked search over the Sisu catalog annotated with exam archive data.
 
-    Phase 2: match ``query`` against exam archive rows whose course code was
-             not already found in Phase 1.
-
-    Results are sorted: courses with exams first, then alphabetically by name.
+    Sisu courses (codes + names) are merged with exam-archive courses missing
+    from Sisu; each result carries ``has_exams``, ``exam_count`` and
+    ``exam_pdf_urls``.  Matches are ranked exact code, code prefix, name/word
+    prefix, substring and finally fuzzy (typo-tolerant) name matches; within a
+    tier courses with exams come first, then alphabetically by name.
     Returns up to 20 results.
 
     Parameters
@@ -166,83 +184,24 @@ def search_courses(
         Search string; leading/trailing whitespace is stripped.
     sisu_rows:
         Output of :func:`~app.exam_scraper.course_index.get_sisu_index`.
-        ``None`` (or empty) disables Phase 1 and falls back to exam-only search.
+        ``None`` (or empty) falls back to exam-only search.
+
+    The index for a given pair of snapshots is built once and reused; route
+    handlers should prefer :func:`~app.exam_scraper.search_index.get_search_index`,
+    which builds off the event loop.
     """
-    q = query.strip().lower()
-    if not q:
-        return []
-
-    # Group exam archive rows by course_code so we can annotate quickly.
-    exam_by_code: dict[str, list[dict]] = {}
-    for row in rows:
-        code = (row.get("course_code") or "").strip()
-        if code:
-            exam_by_code.setdefault(code, []).append(row)
-
-    results: list[dict] = []
-    seen_codes: set[str] = set()
-
-    # ------------------------------------------------------------------
-    # Phase 1 — Sisu catalog search
-    # ------------------------------------------------------------------
-    if sisu_rows:
-        for sisu in sisu_rows:
-            code = (sisu.get("code") or "").strip()
-            name_en = sisu.get("name_en") or ""
-            name_fi = sisu.get("name_fi") or ""
-            if not code:
-                continue
-            if not (q in code.lower() or q in name_en.lower() or q in name_fi.lower()):
-                continue
-            if code in seen_codes:
-                continue
-            seen_codes.add(code)
-
-            exams = exam_by_code.get(code, [])
-            # Use exam-archive name when available (richer / more current).
-            display_name = exams[0]["course_name"] if exams else (name_en or name_fi)
-            department = exams[0].get("department", "") if exams else ""
-            # Most-recent exam date for display.
-            latest_date = max((r["date"] for r in exams if r.get("date")), default="")
-            first_pdf = exams[0]["pdf_url"] if exams else ""
-
-            results.append({
-                "course_code": code,
-                "course_name": display_name,
-                "department": department,
-                "date": latest_date,
-                "pdf_url": first_pdf,
-                "has_exams": bool(exams),
-                "exam_count": len(exams),
-                "exam_pdf_urls": [r["pdf_url"] for r in exams],
-            })
-
-    # ------------------------------------------------------------------
-    # Phase 2 — exam archive search (for codes not found via Sisu)
-    # ------------------------------------------------------------------
-    for code, exams in exam_by_code.items():
-        if code in seen_codes:
-            continue
-        # Use the first row for display fields; check if query matches.
-        first = exams[0]
-        if not (q in code.lower() or q in first.get("course_name", "").lower()):
-            continue
-        seen_codes.add(code)
-        latest_date = max((r["date"] for r in exams if r.get("date")), default="")
-        results.append({
-            "course_code": code,
-            "course_name": first["course_name"],
-            "department": first.get("department", ""),
-            "date": latest_date,
-            "pdf_url": first["pdf_url"],
-            "has_exams": True,
-            "exam_count": len(exams),
-            "exam_pdf_urls": [r["pdf_url"] for r in exams],
-        })
+    return course_search_index(rows, sisu_rows).search(query)
+
+
+def _rebuild_search_index(_rows: list[dict]) -> None:
+    exam_rows = exam_index_store.peek()
+    if exam_rows is not None:
+        start_search_index_build(exam_rows, sisu_index_store.peek())
+
 
-    # Sort: exams-first, then alphabetically by name.
-    results.sort(key=lambda r: (not r["has_exams"], r["course_name"].lower()))
-    return results[:20]
+# Rebuild the search index alongside either cached index.
+exam_index_store.add_listener(_rebuild_search_index)
+sisu_index_store.add_listener(_rebuild_search_index)
 
 
 async def download_pdf(pdf_url: str) -> bytes:
@@ -253,14 +212,10 @@ async def download_pdf(pdf_url: str) -> bytes:
     HTTPException(502)
         On any network failure — timeout, connection error, or non-2xx status.
     """
-    headers = {"User-Agent": _USER_AGENT}
     try:
-        async with httpx.AsyncClient(
-            timeout=_DOWNLOAD_TIMEOUT, follow_redirects=True, headers=headers
-        ) as client:
-            response = await client.get(pdf_url, headers=headers)
-            response.raise_for_status()
-            return response.content
+        response = await _archive_client().get(pdf_url, timeout=_DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        return response.content
     except HTTPException:
         raise
     except Exception as exc:
@@ -0,0 +1,395 @@
+"""In-memory course search index for search-as-you-type.
+
+:class:`CourseSearchIndex` merges the Sisu catalog and the exam archive into one
+list of course entries (the same dicts :func:`~app.exam_scraper.scraper.search_courses`
+returns) and indexes them once, so a keystroke no longer rescans and re-lowercases
+every row.
+
+Entries are stored in display order — courses with exams first, then by name —
+so an entry's position doubles as its rank and every posting list is already
+sorted best-first.  A query is answered tier by tier and each tier stops as soon
+as the result list is full:
+
+0. exact course code
+1. course-code prefix                 (code edge n-grams)
+2. a name, or a word in a name, starting with the query (word edge n-grams)
+3. substring of the code or a name    (trigram postings, verified)
+4. fuzzy word match for typos         (vocabulary trigrams >= FUZZY_MIN_SIMILARITY)
+
+Each index is immutable and built from one exam + Sisu snapshot pair.  When
+either :class:`~app.exam_scraper.index_store.IndexStore` publishes new rows,
+:func:`start_search_index_build` builds the replacement in a worker thread and
+installs it with a single assignment; searches keep using the previous index
+until then, so they never see a half-built one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+MAX_RESULTS = 20
+# Edge n-grams cover prefixes up to this length; longer prefixes are verified.
+EDGE_GRAM_LEN = 3
+GRAM_LEN = 3
+# Share of a query word's trigrams a name word must contain to count as a fuzzy match.
+FUZZY_MIN_SIMILARITY = 0.6
+# Shorter query words are ignored by fuzzy matching.
+FUZZY_MIN_QUERY_LEN = 4
+# Closest vocabulary words considered per query word.
+FUZZY_MAX_WORDS = 32
+
+_NON_WORD = re.compile(r"[^\w]+")
+# Joins the searchable fields so a substring cannot span two of them.
+_FIELD_SEP = "\x00"
+
+
+def _words(text: str) -> str:
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + GRAM_LEN] for i in range(len(text) - GRAM_LEN + 1)}
+
+
+def _course_entries(rows: list[dict], sisu_rows: list[dict] | None) -> list[tuple[dict, tuple[str, ...]]]:
+    """Merge Sisu courses and exam-archive rows into ``(result, names)`` pairs.
+
+    Sisu entries come first and win on duplicate codes; exam-archive courses
+    missing from Sisu are appended.  ``names`` are the texts a query may match
+    besides the code.
+    """
+    exam_by_code: dict[str, list[dict]] = {}
+    for row in rows:
+        code = (row.get("course_code") or "").strip()
+        if code:
+            exam_by_code.setdefault(code, []).append(row)
+
+    entries: list[tuple[dict, tuple[str, ...]]] = []
+    sisu_pos: dict[str, int] = {}
+
+    for sisu in sisu_rows or ():
+        code = (sisu.get("code") or "").strip()
+        if not code:
+            continue
+        name_en = sisu.get("name_en") or ""
+        name_fi = sisu.get("name_fi") or ""
+        if code in sisu_pos:
+            # Duplicate catalog rows keep the first row's display fields but
+            # stay searchable by every name.
+            result, names = entries[sisu_pos[code]]
+            entries[sisu_pos[code]] = (result, (*names, name_en, name_fi))
+            continue
+        sisu_pos[code] = len(entries)
+        exams = exam_by_code.get(code, [])
+        # Use exam-archive name when available (richer / more current).
+        display_name = exams[0]["course_name"] if exams else (name_en or name_fi)
+        entries.append((
+            {
+                "course_code": code,
+                "course_name": display_name,
+                "department": exams[0].get("department", "") if exams else "",
+                "date": max((r["date"] for r in exams if r.get("date")), default=""),
+                "pdf_url": exams[0]["pdf_url"] if exams else "",
+                "has_exams": bool(exams),
+                "exam_count": len(exams),
+                "exam_pdf_urls": [r["pdf_url"] for r in exams],
+            },
+            (name_en, name_fi, display_name),
+        ))
+
+    for code, exams in exam_by_code.items():
+        if code in sisu_pos:
+            continue
+        first = exams[0]
+        entries.append((
+            {
+                "course_code": code,
+                "course_name": first["course_name"],
+                "department": first.get("department", ""),
+                "date": max((r["date"] for r in exams if r.get("date")), default=""),
+                "pdf_url": first["pdf_url"],
+                "has_exams": True,
+                "exam_count": len(exams),
+                "exam_pdf_urls": [r["pdf_url"] for r in exams],
+            },
+            (first.get("course_name", ""),),
+        ))
+
+    return entries
+
+
+class CourseSearchIndex:
+    """Ranked code/prefix/trigram index over one exam + Sisu snapshot."""
+
+    def __init__(self, rows: list[dict], sisu_rows: list[dict] | None = None) -> None:
+        self._sources = (rows, sisu_rows or None)
+
+        entries = _course_entries(rows, sisu_rows)
+        entries.sort(key=lambda e: (not e[0]["has_exams"], e[0]["course_name"].lower(), e[0]["course_code"]))
+
+        self._results: list[dict] = [result for result, _ in entries]
+        self._codes: list[str] = []
+        self._names: list[tuple[str, ...]] = []
+        self._haystacks: list[str] = []
+        self._by_code: dict[str, int] = {}
+        code_edges: defaultdict[str, list[int]] = defaultdict(list)
+        word_edges: defaultdict[str, list[int]] = defaultdict(list)
+        word_postings: defaultdict[str, list[int]] = defaultdict(list)
+        grams: defaultdict[str, list[int]] = defaultdict(list)
+        # Course names repeat a lot (fi/en fallbacks, exam rows); split them once.
+        field_cache: dict[str, tuple[str, str, set[str], set[str], set[str]]] = {}
+
+        for pos, (result, raw_names) in enumerate(entries):
+            code = result["course_code"].lower()
+            fields = []
+            for raw in raw_names:
+                if not raw:
+                    continue
+                cached = field_cache.get(raw)
+                if cached is None:
+                    lowered = raw.lower()
+                    words = _words(lowered)
+                    word_set = set(words.split())
+                    edges = {
+                        word[:length]
+                        for word in word_set
+                        for length in range(1, min(EDGE_GRAM_LEN, len(word)) + 1)
+                    }
+                    cached = field_cache[raw] = (lowered, words, word_set, edges, _trigrams(lowered))
+                fields.append(cached)
+
+            self._codes.append(code)
+            self._names.append(tuple(dict.fromkeys(f[1] for f in fields)))
+            self._haystacks.append(_FIELD_SEP.join((code, *dict.fromkeys(f[0] for f in fields))))
+            self._by_code.setdefault(code, pos)
+            for length in range(1, min(EDGE_GRAM_LEN, len(code)) + 1):
+                code_edges[code[:length]].append(pos)
+            for word in set().union(*(f[2] for f in fields)):
+                word_postings[word].append(pos)
+            for edge in set().union(*(f[3] for f in fields)):
+                word_edges[edge].append(pos)
+            for gram in _trigrams(code).union(*(f[4] for f in fields)):
+                grams[gram].append(pos)
+
+        self._code_edges = dict(code_edges)
+        self._word_edges = dict(word_edges)
+        self._word_postings = dict(word_postings)
+        self._vocab = sorted(self._word_postings)
+        self._grams = dict(grams)
+        # Fuzzy matching compares query words against the (much smaller)
+        # vocabulary rather than against every course.
+        vocab_grams: defaultdict[str, list[str]] = defaultdict(list)
+        for word in self._word_postings:
+            for gram in _trigrams(word):
+                vocab_grams[gram].append(word)
+        self._vocab_grams = dict(vocab_grams)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def built_from(self, rows: list[dict], sisu_rows: list[dict] | None) -> bool:
+        """True when this index was built from exactly these snapshot lists."""
+        return self._sources[0] is rows and self._sources[1] is (sisu_rows or None)
+
+    # -- tiers ---------------------------------------------------------------
+
+    def _code_prefix(self, q: str) -> Iterable[int]:
+        for pos in self._code_edges.get(q[:EDGE_GRAM_LEN], ()):
+            if self._codes[pos].startswith(q):
+                yield pos
+
+    def _name_prefix(self, q: str) -> Iterable[int]:
+        words = _words(q).split()
+        if not words:
+            return
+        if len(words) == 1:
+            word = words[0]
+            if len(word) <= EDGE_GRAM_LEN:
+                yield from self._word_edges.get(word, ())
+                return
+            # Postings of every vocabulary word with this prefix, merged lazily
+            # so the first `limit` positions are found without a full union.
+            start = bisect.bisect_left(self._vocab, word)
+            stop = bisect.bisect_left(self._vocab, word + "\uffff", start)
+            last = -1
+            for pos in heapq.merge(*(self._word_postings[w] for w in self._vocab[start:stop])):
+                if pos != last:
+                    last = pos
+                    yield pos
+            return
+        # A phrase: every word but the last is complete, so the first one's
+        # postings are a superset of the matches.
+        phrase = " ".join(words)
+        bounded = f" {phrase}"
+        for pos in self._word_postings.get(words[0], ()):
+            if any(name.startswith(phrase) or bounded in name for name in self._names[pos]):
+                yield pos
+
+    def _substring(self, q: str) -> Iterable[int]:
+        if len(q) < GRAM_LEN:
+            candidates: Iterable[int] = range(len(self._results))
+        else:
+            postings = [self._grams.get(gram, ()) for gram in _trigrams(q)]
+            candidates = min(postings, key=len)
+        haystacks = self._haystacks
+        for pos in candidates:
+            if q in haystacks[pos]:
+                yield pos
+
+    def _similar_words(self, term: str) -> list[tuple[str, float]]:
+        grams = _trigrams(term)
+        needed = max(1, math.ceil(FUZZY_MIN_SIMILARITY * len(grams) - 1e-9))
+        hits: Counter[str] = Counter()
+        for gram in grams:
+            hits.update(self._vocab_grams.get(gram, ()))
+        similar = [(word, count / len(grams)) for word, count in hits.items() if count >= needed]
+        if len(similar) > FUZZY_MAX_WORDS:
+            similar = heapq.nsmallest(
+                FUZZY_MAX_WORDS, similar, key=lambda ws: (-ws[1], abs(len(ws[0]) - len(term)), ws[0])
+            )
+        return similar
+
+    def _fuzzy(self, q: str, seen: set[int], limit: int) -> list[int]:
+        """Courses with a similar vocabulary word for every query word of 4+ letters."""
+        terms = [term for term in _words(q).split() if len(term) >= FUZZY_MIN_QUERY_LEN]
+        if not terms:
+            return []
+        scores: dict[int, float] | None = None
+        for term in terms:
+            best: dict[int, float] = {}
+            for word, similarity in self._similar_words(term):
+                for pos in self._word_postings[word]:
+                    if similarity > best.get(pos, 0.0):
+                        best[pos] = similarity
+            if scores is None:
+                scores = best
+            else:
+                scores = {pos: score + best[pos] for pos, score in scores.items() if pos in best}
+            if not scores:
+                return []
+        ranked = heapq.nsmallest(limit, ((-score, pos) for pos, score in scores.items() if pos not in seen))
+        return [pos for _, pos in ranked]
+
+    # -- public --------------------------------------------------------------
+
+    def search(self, query: str, limit: int = MAX_RESULTS) -> list[dict]:
+        """Return up to ``limit`` result dicts, best match first."""
+        q = query.strip().lower()
+        if not q or limit <= 0:
+            return []
+
+        picked: list[int] = []
+        seen: set[int] = set()
+
+        def take(positions: Iterable[int]) -> bool:
+            for pos in positions:
+                if pos not in seen:
+                    seen.add(pos)
+                    picked.append(pos)
+                    if len(picked) >= limit:
+                        return True
+            return False
+
+        exact = self._by_code.get(q)
+        if not take(() if exact is None else (exact,)) and not take(self._code_prefix(q)) \
+                and not take(self._name_prefix(q)) and not take(self._substring(q)):
+            take(self._fuzzy(q, seen, limit - len(picked)))
+
+        return [{**self._results[pos], "exam_pdf_urls": list(self._results[pos]["exam_pdf_urls"])} for pos in picked]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "courses": len(self._results),
+            "words": len(self._vocab),
+            "trigrams": len(self._grams),
+            "postings": sum(len(p) for p in self._grams.values()),
+        }
+
+
+_current: CourseSearchIndex | None = None
+_current_generation = 0
+_generation = 0
+_building: tuple[list[dict], list[dict] | None, asyncio.Task] | None = None
+
+
+def _install(index: CourseSearchIndex, generation: int) -> None:
+    # A build that started later may have finished first; never go backwards.
+    global _current, _current_generation
+    if generation >= _current_generation:
+        _current = index
+        _current_generation = generation
+
+
+def _next_generation() -> int:
+    global _generation
+    _generation += 1
+    return _generation
+
+
+def course_search_index(rows: list[dict], sisu_rows: list[dict] | None = None) -> CourseSearchIndex:
+    """Return the index for these snapshot lists, building it inline when they changed.
+
+    Snapshots are replaced, never mutated, so identity is enough to tell whether
+    the current index is still valid.
+    """
+    index = _current
+    if index is None or not index.built_from(rows, sisu_rows):
+        index = CourseSearchIndex(rows, sisu_rows)
+        _install(index, _next_generation())
+    return index
+
+
+def _build_done(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("course search index build failed", exc_info=task.exception())
+
+
+def start_search_index_build(rows: list[dict], sisu_rows: list[dict] | None = None) -> asyncio.Task:
+    """Build the index for these snapshots in a worker thread; one build per snapshot pair."""
+    global _building
+    sisu_rows = sisu_rows or None
+    if _building is not None:
+        built_rows, built_sisu, task = _building
+        if built_rows is rows and built_sisu is sisu_rows and not task.done():
+            return task
+
+    generation = _next_generation()
+
+    async def build() -> CourseSearchIndex:
+        index = await asyncio.to_thread(CourseSearchIndex, rows, sisu_rows)
+        _install(index, generation)
+        logger.info("course search index rebuilt: %s", index.stats())
+        return index
+
+    task = asyncio.ensure_future(build())
+    task.add_done_callback(_build_done)
+    _building = (rows, sisu_rows, task)
+    return task
+
+
+async def get_search_index(rows: list[dict], sisu_rows: list[dict] | None = None) -> CourseSearchIndex:
+    """Return the index for these snapshots without blocking the event loop.
+
+    When the snapshots changed, the rebuild runs in the background and the
+    previous index keeps answering; only the very first search waits for it.
+    """
+    index = _current
+    if index is not None and index.built_from(rows, sisu_rows):
+        return index
+    task = start_search_index_build(rows, sisu_rows)
+    if index is not None:
+        return index
+    return await asyncio.shield(task)
+
+
+def current_search_index() -> CourseSearchIndex | None:
+    return _current
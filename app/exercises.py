@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import json
+import logging
+import os
+import pickle
 import re
+import tempfile
+import threading
 
 try:
     import yaml  # type: ignore
@@ -37,40 +43,172 @@ class Exercise:
 
 
 _EXERCISE_CACHE: Optional[List[Exercise]] = None
+_INVALIDATION_HOOKS: List[Callable[[], None]] = []
 _FRONT_MATTER_PATTERN = re.compile(r"^---\s*$", re.MULTILINE)
 
+logger = logging.getLogger("teski.exercises")
+
+# Compiled catalogue snapshot: file name -> (mtime_ns, size, parsed exercise or
+# None for files without front matter). Bump the version when Exercise changes.
+CATALOGUE_VERSION = 1
+CATALOGUE_FILENAME = ".exercise_catalogue.pickle"
+_CatalogueEntry = Tuple[int, int, Optional[Exercise]]
+_CATALOGUE_ENTRIES: Dict[Path, Dict[str, _CatalogueEntry]] = {}
+_LOAD_LOCK = threading.Lock()
+
+# Re-parsing at least this many files at once fans out to a process pool.
+PARALLEL_PARSE_THRESHOLD = int(os.getenv("EXERCISE_PARALLEL_PARSE_THRESHOLD", "500"))
+PARALLEL_PARSE_CHUNK_SIZE = 64
+
+
+@dataclass
+class ParsedFile:
+    path: Path
+    exercise: Optional[Exercise] = None
+    error: Optional[str] = None
+
+
+def _parse_exercise_file(path: Path) -> ParsedFile:
+    """Parse one markdown file; runs in pool workers, so errors are returned, not raised."""
+    try:
+        metadata, _body = _extract_front_matter(path.read_text(encoding="utf-8"))
+        exercise = _exercise_from_metadata(metadata, path) if metadata else None
+    except Exception as exc:
+        return ParsedFile(path=path, error=f"{path}: {exc}")
+    return ParsedFile(path=path, exercise=exercise)
+
+
+def parse_exercise_files(
+    paths: Iterable[Path],
+    *,
+    workers: Optional[int] = None,
+    chunk_size: int = PARALLEL_PARSE_CHUNK_SIZE,
+) -> List[ParsedFile]:
+    """Parse ``paths`` and return one result per file in sorted path order.
+
+    ``workers=None`` uses a process pool (one worker per CPU) once there are
+    ``PARALLEL_PARSE_THRESHOLD`` files; ``workers=1`` always parses in-process.
+    Parse failures are collected on the results instead of stopping the run.
+    """
+    ordered: Sequence[Path] = sorted(paths)
+    if workers is None and len(ordered) < PARALLEL_PARSE_THRESHOLD:
+        workers = 1
+    if workers == 1 or len(ordered) < 2:
+        return [_parse_exercise_file(path) for path in ordered]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_parse_exercise_file, ordered, chunksize=max(1, chunk_size)))
+
+
+def _catalogue_path(directory: Path) -> Optional[Path]:
+    """Snapshot location; ``EXERCISE_CATALOGUE_CACHE=off`` disables persistence."""
+    override = os.getenv("EXERCISE_CATALOGUE_CACHE")
+    if override is not None:
+        if override.strip().lower() in {"", "0", "off", "false", "no"}:
+            return None
+        return Path(override)
+    return directory / CATALOGUE_FILENAME
+
+
+def _read_catalogue(path: Optional[Path]) -> Dict[str, _CatalogueEntry]:
+    if path is None or not path.exists():
+        return {}
+    try:
+        with path.open("rb") as handle:
+            data = pickle.load(handle)
+    except Exception as exc:  # corrupt or from an incompatible build: rebuild
+        logger.warning("ignoring unreadable exercise catalogue %s: %s", path, exc)
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CATALOGUE_VERSION:
+        return {}
+    return data.get("entries") or {}
+
+
+def _write_catalogue(path: Optional[Path], entries: Dict[str, _CatalogueEntry]) -> None:
+    if path is None:
+        return
+    tmp_name: Optional[str] = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=path.name, suffix=".tmp", dir=path.parent)
+        with os.fdopen(fd, "wb") as handle:
+            pickle.dump({"version": CATALOGUE_VERSION, "entries": entries}, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, path)
+    except OSError as exc:  # read-only content dirs still load, just without persistence
+        logger.warning("could not persist exercise catalogue %s: %s", path, exc)
+        if tmp_name is not None and os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+
+
+def _is_fresh(cached: Optional[_CatalogueEntry], stat: os.stat_result) -> bool:
+    return cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size
+
+
+def _scan_catalogue(directory: Path) -> List[Exercise]:
+    """Re-parse only markdown files whose mtime or size changed since the last scan."""
+    key = directory.resolve()
+    snapshot_path = _catalogue_path(directory)
+    previous = _CATALOGUE_ENTRIES.get(key)
+    if previous is None:
+        previous = _read_catalogue(snapshot_path)
+
+    current: List[Tuple[Path, os.stat_result]] = [(path, path.stat()) for path in sorted(directory.glob("*.md"))]
+    stale = [path for path, stat in current if not _is_fresh(previous.get(path.name), stat)]
+    parsed = {result.path: result for result in parse_exercise_files(stale)}
+    errors = [result.error for result in parsed.values() if result.error]
+    if errors:
+        raise ValueError(f"Failed to load {len(errors)} exercise file(s): " + "; ".join(errors))
+
+    entries: Dict[str, _CatalogueEntry] = {}
+    for path, stat in current:
+        result = parsed.get(path)
+        if result is None:
+            entries[path.name] = previous[path.name]
+        else:
+            entries[path.name] = (stat.st_mtime_ns, stat.st_size, result.exercise)
+
+    if parsed or entries.keys() != previous.keys():
+        _write_catalogue(snapshot_path, entries)
+    _CATALOGUE_ENTRIES[key] = entries
+    return [exercise for _, _, exercise in entries.values() if exercise is not None]
+
 
 def load_exercises(content_dir: str | Path = "content") -> List[Exercise]:
-    """Load exercises from markdown files that include YAML front matter."""
+    """Load exercises from markdown files that include YAML front matter.
+
+    Parsed files are kept in a snapshot next to the content (see
+    ``_catalogue_path``), so restarts and ``invalidate_cache()`` only re-parse
+    files that changed. The returned list is built completely before it is
+    published, so concurrent readers see either the old or the new catalogue.
+    """
     global _EXERCISE_CACHE
-    if _EXERCISE_CACHE is not None:
-        return _EXERCISE_CACHE
-
-    directory = Path(content_dir)
-    exercises: List[Exercise] = []
-    if not directory.exists():
-        _EXERCISE_CACHE = []
-        return _EXERCISE_CACHE
-
-    for path in sorted(directory.glob("*.md")):
-        text = path.read_text(encoding="utf-8")
-        metadata, _body = _extract_front_matter(text)
-        if not metadata:
-            continue
-        try:
-            exercise = _exercise_from_metadata(metadata, path)
-        except Exception as exc:  # pragma: no cover - invalid content
-            raise ValueError(f"Failed to load exercise from {path}: {exc}") from exc
-        exercises.append(exercise)
+    cached = _EXERCISE_CACHE
+    if cached is not None:
+        return cached
 
-    _EXERCISE_CACHE = exercises
-    return exercises
+    with _LOAD_LOCK:
+        if _EXERCISE_CACHE is not None:
+            return _EXERCISE_CACHE
+        directory = Path(content_dir)
+        exercises = _scan_catalogue(directory) if directory.exists() else []
+        _EXERCISE_CACHE = exercises
+        return exercises
 
 
 def invalidate_cache() -> None:
-    """Clear the exercise cache so the next call to load_exercises reloads from disk."""
+    """Clear the exercise cache so the next call to load_exercises re-scans the disk.
+
+    Per-file parse results are kept, so only changed files are parsed again.
+    """
     global _EXERCISE_CACHE
     _EXERCISE_CACHE = None
+    for hook in list(_INVALIDATION_HOOKS):
+        hook()
+
+
+def register_invalidation_hook(hook: Callable[[], None]) -> None:
+    """Run ``hook`` after every ``invalidate_cache()`` so derived indexes can rebuild."""
+    if hook not in _INVALIDATION_HOOKS:
+        _INVALIDATION_HOOKS.append(hook)
 
 
 def _extract_front_matter(text: str) -> Tuple[Dict[str, Any], str]:
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Summary fields that change on every request without changing what the
+# feedback should say; they are dropped before hashing the cache key.
+VOLATILE_SUMMARY_KEYS = frozenset(
+    {
+        "generated_at",
+        "created_at",
+        "updated_at",
+        "timestamp",
+        "ts",
+        "now",
+        "request_id",
+        "trace_id",
+    }
+)
+FLOAT_KEY_DIGITS = 6
+
+
+def normalize_summary(value: Any) -> Any:
+    """Drop volatile keys (at any depth) and round floats so equal summaries hash equal."""
+    if isinstance(value, dict):
+        return {
+            str(key): normalize_summary(item)
+            for key, item in value.items()
+            if str(key).lower() not in VOLATILE_SUMMARY_KEYS
+        }
+    if isinstance(value, (list, tuple)):
+        return [normalize_summary(item) for item in value]
+    if isinstance(value, float):
+        return round(value, FLOAT_KEY_DIGITS)
+    return value
+
+
+@dataclass(frozen=True)
+class CachedFeedback:
+    feedback_text: str
+    model_used: str
+    tokens_in: int
+    tokens_out: int
+
+
+class FeedbackMemoryCache:
+    """
+    In-process LRU in front of the ``FeedbackCache`` table, plus single-flight
+    coalescing so concurrent misses for one key share a single provider call.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self._max_entries = max(0, max_entries)
+        self._entries: "OrderedDict[str, CachedFeedback]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "coalesced": 0}
+
+    def get(self, key: str) -> Optional[CachedFeedback]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["memory_hits"] += 1
+            return entry
+
+    def put(self, key: str, entry: CachedFeedback) -> None:
+        if not self._max_entries:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def record(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    async def single_flight(self, key: str, producer: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Run ``producer`` once per key at a time. Returns ``(result, shared)``;
+        ``shared`` is True for callers that awaited another caller's run.
+        """
+        while True:
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            self.record("coalesced")
+            try:
+                return await asyncio.shield(pending), True
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # the leader went away (client disconnect); take over the key
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await producer()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            data = dict(self._counters)
+            data["memory_entries"] = len(self._entries)
+        data["inflight"] = len(self._inflight)
+        return data
+
+
+_cache: Optional[FeedbackMemoryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_feedback_cache() -> FeedbackMemoryCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from ..config_feedback import get_feedback_settings
+
+                _cache = FeedbackMemoryCache(get_feedback_settings().memory_cache_size)
+    return _cache
+
+
+def feedback_cache_counters() -> Dict[str, int]:
+    return get_feedback_cache().stats()
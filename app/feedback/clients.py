@@ -3,12 +3,12 @@ from __future__ import annotations
 import asyncio
 from typing import Tuple
 
-import httpx
 import tiktoken
 from anthropic import AsyncAnthropic
 from openai import AsyncOpenAI
 
 from ..config_feedback import get_feedback_settings
+from ..core.http import get_http_client
 
 settings = get_feedback_settings()
 
@@ -102,20 +102,20 @@ async def call_local_llama(model: str, prompt: str) -> Tuple[str, int]:
     url = settings.local_llm_base_url.rstrip("/") + "/generate"
 
     async def _call():
-        async with httpx.AsyncClient(timeout=settings.request_timeout_s) as client:
-            resp = await client.post(
-                url,
-                json={
-                    "model": model,
-                    "prompt": prompt,
-                    "max_new_tokens": 220,
-                    "temperature": 0.3,
-                },
-            )
-            resp.raise_for_status()
-            payload = resp.json()
-            text = (payload.get("text") or "").strip()
-            tokens_out = count_tokens_estimate(text, "llama-3.1-70b")
-            return text, tokens_out
+        client = get_http_client("local_llm", timeout=settings.request_timeout_s)
+        resp = await client.post(
+            url,
+            json={
+                "model": model,
+                "prompt": prompt,
+                "max_new_tokens": 220,
+                "temperature": 0.3,
+            },
+        )
+        resp.raise_for_status()
+        payload = resp.json()
+        text = (payload.get("text") or "").strip()
+        tokens_out = count_tokens_estimate(text, "llama-3.1-70b")
+        return text, tokens_out
 
     return await _with_retries(_call)
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import logging
 import os
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
+from sqlalchemy import String, case, cast, literal, union_all
 from sqlmodel import Session, select, func
 
-from .models import FeedbackEvent
+from ..db import upsert_add
+from .cache import feedback_cache_counters
+from .models import FeedbackCostLedger, FeedbackEvent
+
+logger = logging.getLogger("teski.feedback.costs")
 
 EUR = float(os.getenv("EUR_MULTIPLIER", "1.0"))
 
@@ -24,33 +31,207 @@ def estimate_cost_eur(model: str, tokens_in: int, tokens_out: int) -> float:
     return (tokens_in / 1_000_000) * prices["in"] + (tokens_out / 1_000_000) * prices["out"]
 
 
-def _scalar(value: Any) -> float:
-    if isinstance(value, tuple):
-        return value[0]
-    return float(value or 0.0)
+LEDGER_ALL_MODELS = "*"
+_LEDGER_SUMS = ("cost_eur", "events", "cached_hits", "tokens_in", "tokens_out")
+
+
+def _month_key(ts: datetime) -> str:
+    return ts.strftime("%Y-%m")
+
+
+def _day_key(ts: datetime) -> str:
+    return ts.strftime("%Y-%m-%d")
+
+
+def _ledger_keys(ts: datetime, model: str) -> List[tuple[str, str]]:
+    month, day = _month_key(ts), _day_key(ts)
+    return [(month, LEDGER_ALL_MODELS), (month, model), (day, LEDGER_ALL_MODELS), (day, model)]
+
+
+def _bump_ledger(session: Session, rows: List[Dict[str, Any]]) -> None:
+    upsert_add(
+        session,
+        FeedbackCostLedger.__table__,
+        rows,
+        key_columns=("period", "model_used"),
+        sum_columns=_LEDGER_SUMS,
+    )
+
+
+def record_feedback_event(session: Session, event: FeedbackEvent) -> FeedbackEvent:
+    """Stage ``event`` and bump its ledger rows; both commit with the caller's transaction."""
+    session.add(event)
+    now = datetime.utcnow()
+    ts = event.created_at or now
+    _bump_ledger(
+        session,
+        [
+            {
+                "period": period,
+                "model_used": model,
+                "cost_eur": float(event.cost_eur or 0.0),
+                "events": 1,
+                "cached_hits": 1 if event.cached_hit else 0,
+                "tokens_in": int(event.tokens_in or 0),
+                "tokens_out": int(event.tokens_out or 0),
+                "updated_at": now,
+            }
+            for period, model in _ledger_keys(ts, event.model_used)
+        ],
+    )
+    return event
+
+
+def get_monthly_spend(session: Session, now: Optional[datetime] = None) -> float:
+    """Spend so far in the current UTC month: a primary-key read of the ledger."""
+    period = _month_key(now or datetime.utcnow())
+    total = session.exec(
+        select(FeedbackCostLedger.cost_eur).where(
+            FeedbackCostLedger.period == period,
+            FeedbackCostLedger.model_used == LEDGER_ALL_MODELS,
+        )
+    ).first()
+    return float(total or 0.0)
 
 
 def get_cost_stats(session: Session) -> Dict[str, float | int]:
     """Aggregate feedback generation cost metrics for admin dashboards."""
 
     month_ago = datetime.utcnow() - timedelta(days=30)
-    total_cost = _scalar(session.exec(select(func.sum(FeedbackEvent.cost_eur))).one())
-    cost_30d = _scalar(
-        session.exec(
-            select(func.sum(FeedbackEvent.cost_eur)).where(FeedbackEvent.created_at >= month_ago)
-        ).one()
-    )
-    total_events = _scalar(session.exec(select(func.count(FeedbackEvent.id))).one())
-    total_hits = _scalar(
-        session.exec(
-            select(func.count(FeedbackEvent.id)).where(FeedbackEvent.cached_hit.is_(True))
-        ).one()
-    )
+    all_models = FeedbackCostLedger.model_used == LEDGER_ALL_MODELS
+    total_cost, total_events, total_hits = session.exec(
+        select(
+            func.coalesce(func.sum(FeedbackCostLedger.cost_eur), 0.0),
+            func.coalesce(func.sum(FeedbackCostLedger.events), 0),
+            func.coalesce(func.sum(FeedbackCostLedger.cached_hits), 0),
+        ).where(all_models, func.length(FeedbackCostLedger.period) == 7)
+    ).one()
+    # day rows, so "last 30 days" is counted in whole UTC days
+    cost_30d = session.exec(
+        select(func.coalesce(func.sum(FeedbackCostLedger.cost_eur), 0.0)).where(
+            all_models,
+            func.length(FeedbackCostLedger.period) == 10,
+            FeedbackCostLedger.period >= _day_key(month_ago),
+        )
+    ).one()
     hit_rate = float(total_hits) / float(total_events) if total_events else 0.0
+    # in-process counters since start: misses include the coalesced requests
+    counters = feedback_cache_counters()
 
     return {
         "cost_total_eur": float(total_cost),
         "cost_last_30d_eur": float(cost_30d),
         "events_total": int(total_events),
         "cache_hit_rate": hit_rate,
+        "cache_memory_hits": counters["memory_hits"],
+        "cache_db_hits": counters["db_hits"],
+        "cache_misses": counters["misses"],
+        "cache_coalesced": counters["coalesced"],
     }
+
+
+def _ledger_snapshot(
+    session: Session, start: Optional[datetime]
+) -> tuple[Dict[tuple[str, str], List[float]], Dict[tuple[str, str], List[float]]]:
+    """
+    Return (expected, actual) ledger sums from raw events and from the ledger.
+
+    Both sides come from one UNION ALL statement, i.e. one snapshot: an event
+    committed while the job runs is either in both or in neither, so it can
+    never show up as drift.
+    """
+    day = func.date(FeedbackEvent.created_at)
+    events = select(
+        literal("event", String).label("source"),
+        cast(day, String).label("period"),
+        FeedbackEvent.model_used.label("model_used"),
+        func.sum(FeedbackEvent.cost_eur),
+        func.count(FeedbackEvent.id),
+        func.sum(case((FeedbackEvent.cached_hit.is_(True), 1), else_=0)),
+        func.sum(FeedbackEvent.tokens_in),
+        func.sum(FeedbackEvent.tokens_out),
+    ).group_by(day, FeedbackEvent.model_used)
+    ledger = select(
+        literal("ledger", String),
+        FeedbackCostLedger.period,
+        FeedbackCostLedger.model_used,
+        *(getattr(FeedbackCostLedger, col) for col in _LEDGER_SUMS),
+    )
+    if start is not None:
+        events = events.where(FeedbackEvent.created_at >= start)
+        ledger = ledger.where(FeedbackCostLedger.period >= _month_key(start))
+
+    expected: Dict[tuple[str, str], List[float]] = defaultdict(lambda: [0.0, 0, 0, 0, 0])
+    actual: Dict[tuple[str, str], List[float]] = {}
+    for source, period, model, cost, *counts in session.exec(union_all(events, ledger)).all():
+        sums = [float(cost or 0.0), *(int(value or 0) for value in counts)]
+        if source == "ledger":
+            actual[(period, model)] = sums
+            continue
+        for key in _ledger_keys(datetime.fromisoformat(str(period)), model):
+            row = expected[key]
+            for idx, value in enumerate(sums):
+                row[idx] += value
+    return expected, actual
+
+
+def reconcile_cost_ledger(
+    session: Session,
+    *,
+    since: Optional[datetime] = None,
+    tolerance_eur: float = 1e-6,
+) -> Dict[str, Any]:
+    """
+    Recompute the ledger from raw ``FeedbackEvent`` rows (from the month of
+    ``since``, or everything) and add the difference to drifting rows.
+
+    Expected and current totals are read from the same snapshot and the
+    corrections are applied as deltas through the live upsert, so usage
+    recorded while the job runs is neither counted as drift nor overwritten.
+    """
+    start = None
+    if since is not None:
+        start = datetime(since.year, since.month, 1)
+    expected, actual = _ledger_snapshot(session, start)
+
+    now = datetime.utcnow()
+    deltas: List[Dict[str, Any]] = []
+    drift: List[Dict[str, Any]] = []
+    max_drift = 0.0
+    for key in sorted(set(expected) | set(actual)):
+        want = expected.get(key, [0.0, 0, 0, 0, 0])
+        have = actual.get(key, [0.0, 0, 0, 0, 0])
+        diff = [w - h for w, h in zip(want, have)]
+        if abs(diff[0]) <= tolerance_eur and not any(diff[1:]):
+            continue
+        max_drift = max(max_drift, abs(diff[0]))
+        drift.append({"period": key[0], "model_used": key[1], "ledger_eur": have[0], "actual_eur": want[0]})
+        deltas.append(
+            {"period": key[0], "model_used": key[1], **dict(zip(_LEDGER_SUMS, diff)), "updated_at": now}
+        )
+    _bump_ledger(session, deltas)
+    session.commit()
+    if drift:
+        logger.warning("feedback cost ledger drift fixed in %s rows (max %.6f EUR)", len(drift), max_drift)
+    return {
+        "rows_checked": len(set(expected) | set(actual)),
+        "rows_fixed": len(drift),
+        "max_drift_eur": max_drift,
+        "drift": drift[:50],
+    }
+
+
+def ensure_cost_ledger(session: Session) -> Optional[Dict[str, Any]]:
+    """Backfill the ledger from raw events when it is empty (first start after upgrade)."""
+    if session.exec(select(FeedbackCostLedger.period).limit(1)).first() is not None:
+        return None
+    if session.exec(select(FeedbackEvent.id).limit(1)).first() is None:
+        return None
+    return reconcile_cost_ledger(session)
+
+
+def reconcile_cost_ledger_job() -> Dict[str, Any]:
+    from ..db import get_engine
+
+    with Session(get_engine()) as session:
+        return reconcile_cost_ledger(session)
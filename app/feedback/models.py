@@ -31,3 +31,20 @@ class FeedbackEvent(AppSQLModel, table=True):
     cost_eur: float
     cached_hit: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class FeedbackCostLedger(AppSQLModel, table=True):
+    """
+    Running totals of feedback usage, bumped in the same transaction as each
+    ``FeedbackEvent``. ``period`` is a UTC month ("2025-11") or day
+    ("2025-11-07"); ``model_used`` is a model key or ``"*"`` for all models.
+    """
+
+    period: str = Field(primary_key=True)
+    model_used: str = Field(primary_key=True)
+    cost_eur: float = 0.0
+    events: int = 0
+    cached_hits: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
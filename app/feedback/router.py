@@ -2,18 +2,25 @@ from __future__ import annotations
 
 import json
 import os
-from calendar import monthrange
 from datetime import datetime, timedelta
 from hashlib import sha256
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select, func
 
 from ..db import get_session
 from ..config_feedback import get_feedback_settings
 from ..models import User
-from .costs import estimate_cost_eur, get_cost_stats
+from .cache import CachedFeedback, get_feedback_cache, normalize_summary
+from .costs import (
+    estimate_cost_eur,
+    get_cost_stats,
+    get_monthly_spend,
+    reconcile_cost_ledger,
+    record_feedback_event,
+)
 from .models import FeedbackCache, FeedbackEvent
 from .schemas import FeedbackGenerateIn, FeedbackGenerateOut, FeedbackSummaryIn, FeedbackSummaryOut
 from .clients import (
@@ -35,25 +42,6 @@ def _scalar(value):
     return value
 
 
-def _month_bounds_utc(dt: datetime) -> tuple[datetime, datetime]:
-    start = datetime(dt.year, dt.month, 1)
-    last_day = monthrange(dt.year, dt.month)[1]
-    end = datetime(dt.year, dt.month, last_day, 23, 59, 59, 999999)
-    return start, end
-
-
-def get_monthly_spend(session: Session) -> float:
-    now = datetime.utcnow()
-    start, end = _month_bounds_utc(now)
-    total = session.exec(
-        select(func.sum(FeedbackEvent.cost_eur)).where(
-            FeedbackEvent.created_at >= start,
-            FeedbackEvent.created_at <= end,
-        )
-    ).one()
-    return float(total or 0.0)
-
-
 def choose_model(summary_json: dict, difficulty: int | None, language: str) -> str:
     size = len(json.dumps(summary_json))
     if size <= 1500 and (difficulty is None or difficulty <= 3):
@@ -75,7 +63,8 @@ def make_cache_key(
     summary_json: dict,
     max_sentences: int,
 ) -> str:
-    blob = f"{user_id}|{persona}|{topic}|{lang}|{max_sentences}|{json.dumps(summary_json, sort_keys=True)}"
+    summary = json.dumps(normalize_summary(summary_json), sort_keys=True, default=str)
+    blob = f"{user_id}|{persona}|{topic}|{lang}|{max_sentences}|{summary}"
     return sha256(blob.encode("utf-8")).hexdigest()
 
 
@@ -130,42 +119,51 @@ def build_prompt(persona: str, language: str, max_sentences: int, summary_json:
     )
 
 
-@router.post("/generate", response_model=FeedbackGenerateOut)
-async def generate_feedback(payload: FeedbackGenerateIn, session: Session = Depends(get_session)):
-    user_uuid = parse_user_id(payload.user_id)
-    user = session.get(User, user_uuid)
-    pro_check(user)
+def _cached_response(session: Session, user_id: str, entry: CachedFeedback) -> FeedbackGenerateOut:
+    record_feedback_event(
+        session,
+        FeedbackEvent(
+            user_id=user_id,
+            model_used=entry.model_used,
+            tokens_in=entry.tokens_in,
+            tokens_out=entry.tokens_out,
+            cost_eur=0.0,
+            cached_hit=True,
+        ),
+    )
+    session.commit()
+    return FeedbackGenerateOut(
+        feedback=entry.feedback_text,
+        model_used=entry.model_used,
+        cached=True,
+        estimated_tokens_in=entry.tokens_in,
+        estimated_tokens_out=entry.tokens_out,
+        estimated_cost_eur=0.0,
+    )
 
-    cache_key = make_cache_key(
-        payload.user_id,
-        payload.persona,
-        payload.topic,
-        payload.language,
-        payload.summary_json,
-        payload.max_sentences,
+
+def _lookup_cached(session: Session, cache_key: str) -> CachedFeedback | None:
+    cache = get_feedback_cache()
+    entry = cache.get(cache_key)
+    if entry is not None:
+        return entry
+    row = session.exec(select(FeedbackCache).where(FeedbackCache.key_hash == cache_key)).first()
+    if row is None:
+        return None
+    entry = CachedFeedback(
+        feedback_text=row.feedback_text,
+        model_used=row.model_used,
+        tokens_in=row.tokens_in,
+        tokens_out=row.tokens_out,
     )
-    cached = session.exec(select(FeedbackCache).where(FeedbackCache.key_hash == cache_key)).first()
-    if cached:
-        session.add(
-            FeedbackEvent(
-                user_id=payload.user_id,
-                model_used=cached.model_used,
-                tokens_in=cached.tokens_in,
-                tokens_out=cached.tokens_out,
-                cost_eur=0.0,
-                cached_hit=True,
-            )
-        )
-        session.commit()
-        return FeedbackGenerateOut(
-            feedback=cached.feedback_text,
-            model_used=cached.model_used,
-            cached=True,
-            estimated_tokens_in=cached.tokens_in,
-            estimated_tokens_out=cached.tokens_out,
-            estimated_cost_eur=0.0,
-        )
+    cache.record("db_hits")
+    cache.put(cache_key, entry)
+    return entry
+
 
+async def _generate_uncached(
+    session: Session, payload: FeedbackGenerateIn, cache_key: str
+) -> FeedbackGenerateOut:
     month_spend = get_monthly_spend(session)
     forced_mini: str | None = None
     if month_spend >= FEEDBACK_MONTHLY_CAP_EUR:
@@ -182,29 +180,39 @@ async def generate_feedback(payload: FeedbackGenerateIn, session: Session = Depe
     est_out = real_out or est_out
     est_cost = estimate_cost_eur(model, est_in, est_out)
 
-    cache_row = FeedbackCache(
-        key_hash=cache_key,
+    event = FeedbackEvent(
+        user_id=payload.user_id,
         model_used=model,
-        language=payload.language,
-        persona=payload.persona,
-        topic=payload.topic,
-        feedback_text=feedback_text,
         tokens_in=est_in,
         tokens_out=est_out,
         cost_eur=est_cost,
+        cached_hit=False,
     )
-    session.add(cache_row)
     session.add(
-        FeedbackEvent(
-            user_id=payload.user_id,
+        FeedbackCache(
+            key_hash=cache_key,
             model_used=model,
+            language=payload.language,
+            persona=payload.persona,
+            topic=payload.topic,
+            feedback_text=feedback_text,
             tokens_in=est_in,
             tokens_out=est_out,
             cost_eur=est_cost,
-            cached_hit=False,
         )
     )
-    session.commit()
+    record_feedback_event(session, event)
+    try:
+        session.commit()
+    except IntegrityError:
+        # another worker process cached the same key first; keep the spend record
+        session.rollback()
+        record_feedback_event(session, event)
+        session.commit()
+    get_feedback_cache().put(
+        cache_key,
+        CachedFeedback(feedback_text=feedback_text, model_used=model, tokens_in=est_in, tokens_out=est_out),
+    )
 
     return FeedbackGenerateOut(
         feedback=feedback_text,
@@ -216,6 +224,44 @@ async def generate_feedback(payload: FeedbackGenerateIn, session: Session = Depe
     )
 
 
+@router.post("/generate", response_model=FeedbackGenerateOut)
+async def generate_feedback(payload: FeedbackGenerateIn, session: Session = Depends(get_session)):
+    user_uuid = parse_user_id(payload.user_id)
+    user = session.get(User, user_uuid)
+    pro_check(user)
+
+    cache_key = make_cache_key(
+        payload.user_id,
+        payload.persona,
+        payload.topic,
+        payload.language,
+        payload.summary_json,
+        payload.max_sentences,
+    )
+    cached = _lookup_cached(session, cache_key)
+    if cached:
+        return _cached_response(session, payload.user_id, cached)
+
+    cache = get_feedback_cache()
+    cache.record("misses")
+    result, shared = await cache.single_flight(
+        cache_key, lambda: _generate_uncached(session, payload, cache_key)
+    )
+    if shared:
+        # another request paid for this generation; record ours as a free hit
+        return _cached_response(
+            session,
+            payload.user_id,
+            CachedFeedback(
+                feedback_text=result.feedback,
+                model_used=result.model_used,
+                tokens_in=result.estimated_tokens_in,
+                tokens_out=result.estimated_tokens_out,
+            ),
+        )
+    return result
+
+
 @router.post("/summary", response_model=FeedbackSummaryOut)
 async def make_summary(payload: FeedbackSummaryIn, session: Session = Depends(get_session)):
     summary = {
@@ -248,6 +294,11 @@ async def feedback_cost_stats(session: Session = Depends(get_session)):
     return get_cost_stats(session)
 
 
+@router.post("/admin/stats/costs/reconcile")
+async def feedback_cost_reconcile(session: Session = Depends(get_session)):
+    return reconcile_cost_ledger(session)
+
+
 @router.delete("/admin/cache/purge")
 async def feedback_cache_purge(session: Session = Depends(get_session)):
     cutoff = datetime.utcnow() - timedelta(days=90)
@@ -257,4 +308,5 @@ async def feedback_cache_purge(session: Session = Depends(get_session)):
         session.delete(row)
         purged += 1
     session.commit()
+    get_feedback_cache().clear()
     return {"purged": purged, "older_than_days": 90}
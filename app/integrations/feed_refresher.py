@@ -0,0 +1,390 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import or_
+from sqlmodel import Session, select
+
+from app.core.http import get_http_client
+from app.db import get_engine
+from app.integrations.ics_parser import parse_ics_text
+from app.integrations.models import MoodleFeed, MoodleFeedItem
+from app.models import _utcnow
+from app.tasks.models import Task
+from app.tasks.schemas import TaskCreate
+from app.tasks.service import create_task_with_blocks
+
+logger = logging.getLogger("teski.integrations.moodle")
+
+MOODLE_REFRESH_ENABLED = os.getenv("MOODLE_REFRESH_ENABLED", "false").lower() in {"1", "true", "yes"}
+MOODLE_REFRESH_INTERVAL_S = float(os.getenv("MOODLE_REFRESH_INTERVAL_S", "3600"))
+MOODLE_REFRESH_TICK_S = float(os.getenv("MOODLE_REFRESH_TICK_S", "60"))
+MOODLE_REFRESH_BATCH_SIZE = int(os.getenv("MOODLE_REFRESH_BATCH_SIZE", "200"))
+MOODLE_REFRESH_CONCURRENCY = int(os.getenv("MOODLE_REFRESH_CONCURRENCY", "8"))
+MOODLE_FETCH_TIMEOUT_S = float(os.getenv("MOODLE_FETCH_TIMEOUT_S", "15"))
+
+
+class FeedFetchError(Exception):
+    """The ICS feed could not be downloaded."""
+
+
+@dataclass
+class FeedFetch:
+    """One download; ``not_modified`` means the server answered 304 and ``text`` is empty."""
+
+    not_modified: bool
+    text: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+
+
+@dataclass
+class FeedSyncResult:
+    feed_id: Optional[int]
+    status: str  # synced | not_modified | unchanged | error
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    error: Optional[str] = None
+
+
+Fetcher = Callable[..., Awaitable[FeedFetch]]
+
+
+async def fetch_feed(
+    url: str, *, etag: Optional[str] = None, last_modified: Optional[str] = None
+) -> FeedFetch:
+    """GET ``url`` on the shared Moodle pool, conditionally when validators are known."""
+    headers: Dict[str, str] = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    client = get_http_client(
+        "moodle",
+        timeout=MOODLE_FETCH_TIMEOUT_S,
+        follow_redirects=True,
+        max_connections=MOODLE_REFRESH_CONCURRENCY,
+    )
+    try:
+        response = await client.get(url, headers=headers)
+        if response.status_code == 304:
+            return FeedFetch(
+                not_modified=True,
+                etag=response.headers.get("etag") or etag,
+                last_modified=response.headers.get("last-modified") or last_modified,
+            )
+        response.raise_for_status()
+    except httpx.HTTPError as exc:
+        raise FeedFetchError(str(exc) or exc.__class__.__name__) from exc
+    return FeedFetch(
+        not_modified=False,
+        text=response.text,
+        etag=response.headers.get("etag"),
+        last_modified=response.headers.get("last-modified"),
+        content_hash=hashlib.sha256(response.content).hexdigest(),
+    )
+
+
+def _parse_datetime(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _update_task_from_event(
+    session: Session,
+    record: MoodleFeedItem,
+    event: dict,
+    due_at: datetime,
+    title: str,
+) -> None:
+    task = session.get(Task, record.task_id) if record.task_id else None
+    if task:
+        changed = False
+        course = event.get("course")
+        if task.title != title:
+            task.title = title
+            changed = True
+        if course and task.course != course:
+            task.course = course
+            changed = True
+        if task.due_at != due_at:
+            task.due_at = due_at
+            changed = True
+        if changed:
+            task.updated_at = _utcnow()
+            session.add(task)
+    record.title = title
+    record.due_at = due_at
+    record.last_synced_at = _utcnow()
+    session.add(record)
+
+
+def apply_feed_events(session: Session, feed: MoodleFeed, events: List[dict]) -> Tuple[int, int, int]:
+    """
+    Create or update the tasks behind ``events``. Nothing is committed, so a
+    feed's inserts and updates land in the caller's single transaction.
+    """
+    existing_items = session.exec(select(MoodleFeedItem).where(MoodleFeedItem.feed_id == feed.id)).all()
+    by_external = {item.external_id: item for item in existing_items}
+    task_ids = [item.task_id for item in existing_items if item.task_id]
+    if task_ids:
+        # Load the linked tasks in one query; session.get() below hits the identity map.
+        session.exec(select(Task).where(Task.id.in_(task_ids))).all()
+    created = updated = skipped = 0
+
+    for event in events:
+        due_at = _parse_datetime(event.get("due_iso"))
+        title = (event.get("title") or "").strip()
+        if not due_at or not title:
+            skipped += 1
+            continue
+
+        external_id = event.get("id") or f"ics_{abs(hash((title, due_at)))}"
+        existing = by_external.get(external_id)
+
+        if existing:
+            _update_task_from_event(session, existing, event, due_at, title)
+            updated += 1
+            continue
+
+        payload = TaskCreate(
+            title=title,
+            course=event.get("course"),
+            kind="moodle",
+            due_at=due_at,
+            base_estimated_minutes=60,
+        )
+        task, _, _ = create_task_with_blocks(session, feed.user_id, payload, commit=False)
+        item = MoodleFeedItem(
+            feed_id=feed.id,
+            external_id=external_id,
+            task_id=task.id,
+            title=title,
+            due_at=due_at,
+            last_synced_at=_utcnow(),
+        )
+        session.add(item)
+        by_external[external_id] = item
+        created += 1
+
+    return created, updated, skipped
+
+
+def sync_feed(session: Session, feed: MoodleFeed, fetch: FeedFetch, *, force: bool = False) -> FeedSyncResult:
+    """Apply a download to ``feed`` and commit once; unchanged bodies skip parsing entirely."""
+    result = FeedSyncResult(feed_id=feed.id, status="not_modified" if fetch.not_modified else "unchanged")
+    if not fetch.not_modified and (force or fetch.content_hash != feed.content_hash):
+        created, updated, skipped = apply_feed_events(session, feed, parse_ics_text(fetch.text or ""))
+        result = FeedSyncResult(feed_id=feed.id, status="synced", created=created, updated=updated, skipped=skipped)
+        feed.content_hash = fetch.content_hash
+    feed.etag = fetch.etag
+    feed.last_modified = fetch.last_modified
+    feed.last_fetch_at = _utcnow()
+    feed.last_error = None
+    session.add(feed)
+    session.commit()
+    return result
+
+
+async def refresh_feed(session: Session, feed: MoodleFeed, *, force: bool = False) -> FeedSyncResult:
+    """Conditionally download and sync one feed; ``force`` ignores stored validators."""
+    fetch = await fetch_feed(
+        feed.ics_url,
+        etag=None if force else feed.etag,
+        last_modified=None if force else feed.last_modified,
+    )
+    return sync_feed(session, feed, fetch, force=force)
+
+
+class MoodleFeedRefresher:
+    """
+    Background loop that keeps every active feed within ``interval_s`` of fresh.
+
+    Each tick picks at most ``batch_size`` overdue feeds (never-fetched first,
+    then oldest) and refreshes them with at most ``concurrency`` in flight, so a
+    burst of new feeds is spread over several ticks instead of fetched at once.
+    Parsing and the per-feed transaction run in a worker thread.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval_s: float = MOODLE_REFRESH_INTERVAL_S,
+        tick_s: float = MOODLE_REFRESH_TICK_S,
+        batch_size: int = MOODLE_REFRESH_BATCH_SIZE,
+        concurrency: int = MOODLE_REFRESH_CONCURRENCY,
+        engine_factory: Callable[[], Any] = get_engine,
+        fetcher: Fetcher = fetch_feed,
+    ) -> None:
+        self._interval = timedelta(seconds=max(0.0, interval_s))
+        self._tick_s = max(1.0, tick_s)
+        self._batch_size = max(1, batch_size)
+        self._concurrency = max(1, concurrency)
+        self._engine_factory = engine_factory
+        self._fetcher = fetcher
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight = 0
+        self._last_tick_at: Optional[datetime] = None
+        self._last_tick_ms: Optional[float] = None
+        self._counters = {
+            "ticks": 0,
+            "synced": 0,
+            "not_modified": 0,
+            "unchanged": 0,
+            "errors": 0,
+            "created": 0,
+            "updated": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def due_feed_ids(self, session: Session, now: Optional[datetime] = None) -> List[int]:
+        cutoff = (now or _utcnow()) - self._interval
+        stmt = (
+            select(MoodleFeed.id)
+            .where(
+                MoodleFeed.active == True,  # noqa: E712
+                or_(MoodleFeed.last_fetch_at.is_(None), MoodleFeed.last_fetch_at <= cutoff),
+            )
+            .order_by(MoodleFeed.last_fetch_at.is_not(None), MoodleFeed.last_fetch_at, MoodleFeed.id)
+            .limit(self._batch_size)
+        )
+        return list(session.exec(stmt).all())
+
+    def _apply(self, engine: Any, feed_id: int, fetch: FeedFetch) -> FeedSyncResult:
+        with Session(engine) as session:
+            feed = session.get(MoodleFeed, feed_id)
+            if feed is None:
+                return FeedSyncResult(feed_id=feed_id, status="unchanged")
+            return sync_feed(session, feed, fetch)
+
+    def _record_error(self, engine: Any, feed_id: int, error: str) -> None:
+        # Stamping last_fetch_at keeps a broken feed out of the next ticks until its interval passes.
+        with Session(engine) as session:
+            feed = session.get(MoodleFeed, feed_id)
+            if feed is None:
+                return
+            feed.last_fetch_at = _utcnow()
+            feed.last_error = error[:500]
+            session.add(feed)
+            session.commit()
+
+    async def _refresh_one(self, engine: Any, semaphore: asyncio.Semaphore, feed_id: int) -> FeedSyncResult:
+        async with semaphore:
+            self._in_flight += 1
+            try:
+                with Session(engine) as session:
+                    feed = session.get(MoodleFeed, feed_id)
+                    if feed is None or not feed.active:
+                        return FeedSyncResult(feed_id=feed_id, status="unchanged")
+                    url, etag, last_modified = feed.ics_url, feed.etag, feed.last_modified
+                fetch = await self._fetcher(url, etag=etag, last_modified=last_modified)
+                return await asyncio.to_thread(self._apply, engine, feed_id, fetch)
+            except Exception as exc:
+                error = str(exc) or exc.__class__.__name__
+                logger.warning("moodle feed %s refresh failed: %s", feed_id, error)
+                self._record_error(engine, feed_id, error)
+                return FeedSyncResult(feed_id=feed_id, status="error", error=error)
+            finally:
+                self._in_flight -= 1
+
+    async def refresh_once(self) -> List[FeedSyncResult]:
+        """Refresh every feed that is currently due (up to ``batch_size``)."""
+        started = time.perf_counter()
+        engine = self._engine_factory()
+        with Session(engine) as session:
+            feed_ids = self.due_feed_ids(session)
+        semaphore = asyncio.Semaphore(self._concurrency)
+        results = await asyncio.gather(*(self._refresh_one(engine, semaphore, fid) for fid in feed_ids))
+        self._counters["ticks"] += 1
+        for result in results:
+            self._counters["errors" if result.status == "error" else result.status] += 1
+            self._counters["created"] += result.created
+            self._counters["updated"] += result.updated
+        self._last_tick_at = _utcnow()
+        self._last_tick_ms = round((time.perf_counter() - started) * 1000, 1)
+        return list(results)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # pragma: no cover - keep the loop alive on DB hiccups
+                logger.exception("moodle feed refresh tick failed")
+            await asyncio.sleep(self._tick_s)
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._counters,
+            "in_flight": self._in_flight,
+            "interval_s": self._interval.total_seconds(),
+            "batch_size": self._batch_size,
+            "concurrency": self._concurrency,
+            "last_tick_at": self._last_tick_at.isoformat() if self._last_tick_at else None,
+            "last_tick_ms": self._last_tick_ms,
+        }
+
+
+_refresher: Optional[MoodleFeedRefresher] = None
+
+
+def get_feed_refresher() -> MoodleFeedRefresher:
+    global _refresher
+    if _refresher is None:
+        _refresher = MoodleFeedRefresher()
+    return _refresher
+
+
+def start_feed_refresher() -> Optional[MoodleFeedRefresher]:
+    """Start the background loop at startup when ``MOODLE_REFRESH_ENABLED`` is set."""
+    if not MOODLE_REFRESH_ENABLED:
+        return None
+    refresher = get_feed_refresher()
+    refresher.start()
+    return refresher
+
+
+async def stop_feed_refresher() -> None:
+    global _refresher
+    refresher, _refresher = _refresher, None
+    if refresher is not None:
+        await refresher.stop()
+
+
+def feed_refresher_stats() -> Dict[str, Any]:
+    refresher = _refresher
+    if refresher is None:
+        return {"enabled": MOODLE_REFRESH_ENABLED, "running": False}
+    return {"enabled": MOODLE_REFRESH_ENABLED, "running": refresher.running, **refresher.stats()}
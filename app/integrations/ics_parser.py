@@ -1,14 +1,47 @@
 from __future__ import annotations
 
+import hashlib
+import io
 import re
-from typing import Any, Dict, List
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from ics import Calendar
 
 DUE_RE = re.compile(r"\b(due|deadline|closes?|submission|submit|DL)\b", re.I)
 
+# The only VEVENT properties the due-event filter and the task payload read.
+_WANTED = frozenset({"UID", "SUMMARY", "DESCRIPTION", "DTSTART", "DTEND", "DURATION"})
+_DURATION_RE = re.compile(
+    r"^\+?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?"
+    r"(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$"
+)
+
+
+class IcsParseError(ValueError):
+    """The text is not an iCalendar feed."""
+
+
+class _Unsupported(Exception):
+    """A construct the fast path does not handle; the caller falls back to ``ics``."""
+
 
 def parse_ics_text(text: str) -> List[Dict[str, Any]]:
+    """
+    Return the due-like events of an ICS feed. Uses the streaming parser and
+    falls back to :func:`parse_ics_calendar` for constructs it does not cover
+    (VTIMEZONE-only zones, unusual date formats, malformed lines).
+    """
+    try:
+        return list(iter_due_events(io.StringIO(text)))
+    except _Unsupported:
+        return parse_ics_calendar(text)
+
+
+def parse_ics_calendar(text: str) -> List[Dict[str, Any]]:
+    """Reference implementation: build the full ``ics.Calendar`` and filter its events."""
     cal = Calendar(text)
     tasks: List[Dict[str, Any]] = []
     for ev in cal.events:
@@ -40,6 +73,170 @@ def parse_ics_text(text: str) -> List[Dict[str, Any]]:
     return tasks
 
 
+def iter_due_events(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Stream due-like VEVENTs from ICS ``lines`` without building a calendar.
+
+    Folded lines are unfolded on the fly, only the properties in ``_WANTED``
+    are kept, nested components (VALARM, ...) are skipped, and the keyword
+    filter runs before any datetime is parsed. Due times are always tz-aware.
+    Raises :class:`IcsParseError` when no VCALENDAR is found.
+    """
+    seen_calendar = False
+    props: Optional[Dict[str, Tuple[str, str]]] = None
+    depth = 0
+    for line in _unfold(lines):
+        name, params, value = _split_content_line(line)
+        if name == "BEGIN":
+            if props is not None:
+                depth += 1
+            elif value.upper() == "VEVENT":
+                props, depth = {}, 0
+            elif value.upper() == "VCALENDAR":
+                seen_calendar = True
+        elif name == "END":
+            if props is None:
+                continue
+            if depth:
+                depth -= 1
+            elif value.upper() == "VEVENT":
+                event = _due_event(props)
+                props = None
+                if event is not None:
+                    yield event
+        elif props is not None and not depth and name in _WANTED:
+            if name in props:
+                raise _Unsupported(f"duplicate {name}")
+            props[name] = (params, value)
+    if not seen_calendar:
+        raise IcsParseError("No VCALENDAR found in ICS feed")
+
+
+def _unfold(lines: Iterable[str]) -> Iterator[str]:
+    current: Optional[str] = None
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if not line.strip():
+            continue
+        if line[0] in " \t" and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _split_content_line(line: str) -> Tuple[str, str, str]:
+    colon = line.find(":")
+    if colon == -1:
+        raise _Unsupported(f"malformed line {line[:40]!r}")
+    if line.find('"', 0, colon) != -1:
+        # A quoted parameter value may itself contain ':'.
+        in_quotes = False
+        for i, ch in enumerate(line):
+            if ch == '"':
+                in_quotes = not in_quotes
+            elif ch == ":" and not in_quotes:
+                colon = i
+                break
+    head, value = line[:colon], line[colon + 1 :]
+    name, _, params = head.partition(";")
+    return name.upper(), params, value
+
+
+def _param(params: str, key: str) -> Optional[str]:
+    if not params:
+        return None
+    for part in params.split(";"):
+        name, _, value = part.partition("=")
+        if name.upper() == key:
+            return value.strip('"')
+    return None
+
+
+def _unescape(value: str) -> str:
+    # Same replacement order as ics.utils.unescape_string.
+    if "\\" not in value:
+        return value
+    for escaped, plain in (("\\;", ";"), ("\\,", ","), ("\\n", "\n"), ("\\N", "\n"), ("\\r", "\r"), ("\\R", "\r")):
+        value = value.replace(escaped, plain)
+    return value.replace("\\\\", "\\")
+
+
+@lru_cache(maxsize=64)
+def _zone(tzid: str) -> tzinfo:
+    try:
+        return ZoneInfo(tzid)
+    except (ZoneInfoNotFoundError, ValueError) as exc:
+        raise _Unsupported(f"unknown TZID {tzid!r}") from exc
+
+
+def _parse_datetime(params: str, value: str) -> Tuple[datetime, bool]:
+    """Return the aware datetime and whether it was a DATE (all-day) value."""
+    value = value.strip()
+    is_date = "T" not in value
+    is_utc = value[-1:] in ("Z", "z")
+    try:
+        if is_date:
+            naive = datetime.strptime(value, "%Y%m%d")
+        else:
+            naive = datetime.strptime(value[:-1] if is_utc else value, "%Y%m%dT%H%M%S")
+    except ValueError as exc:
+        raise _Unsupported(f"date format {value!r}") from exc
+    tzid = None if is_utc else _param(params, "TZID")
+    # Floating times are read as UTC, like the ics library does.
+    return naive.replace(tzinfo=_zone(tzid) if tzid else timezone.utc), is_date
+
+
+def _parse_duration(value: str) -> timedelta:
+    match = _DURATION_RE.match(value.strip())
+    if not match or value.strip() in ("P", "PT", "+P", "+PT"):
+        raise _Unsupported(f"duration {value!r}")
+    parts = {key: int(num) for key, num in match.groupdict().items() if num}
+    return timedelta(**parts)
+
+
+def _stable_uid(title: str, due_iso: str) -> str:
+    # Stable across processes, unlike hash(); refreshes must map to the same task.
+    return "ics_" + hashlib.sha1(f"{title}\n{due_iso}".encode("utf-8")).hexdigest()[:16]
+
+
+def _due_event(props: Dict[str, Tuple[str, str]]) -> Optional[Dict[str, Any]]:
+    title = _unescape(props["SUMMARY"][1]).strip() if "SUMMARY" in props else ""
+    desc = _unescape(props["DESCRIPTION"][1]) if "DESCRIPTION" in props else ""
+    if not DUE_RE.search(f"{title}\n{desc}"):
+        return None
+    if "DTEND" in props and "DURATION" in props:
+        raise _Unsupported("DTEND and DURATION")
+
+    begin: Optional[datetime] = None
+    all_day = False
+    if "DTSTART" in props:
+        begin, all_day = _parse_datetime(*props["DTSTART"])
+    if "DURATION" in props:
+        if begin is None:
+            raise _Unsupported("DURATION without DTSTART")
+        due = begin + _parse_duration(props["DURATION"][1])
+    elif "DTEND" in props:
+        due = _parse_datetime(*props["DTEND"])[0]
+    elif begin is not None:
+        due = begin + timedelta(days=1) if all_day else begin
+    else:
+        return None
+
+    due_iso = due.isoformat()
+    uid = props["UID"][1] if "UID" in props else ""
+    return {
+        "id": uid or _stable_uid(title, due_iso),
+        "title": title or "Moodle Deadline",
+        "course": _extract_course(title, desc),
+        "due_iso": due_iso,
+        "notes": desc[:500] if desc else None,
+    }
+
+
 def _extract_course(title: str, desc: str | None = None) -> str | None:
     for pat in (r"\[([A-Z]{2,5}[- ]?\d{2,4})\]", r"\b([A-Z]{2,5}[- ]?\d{2,4})\b"):
         match = re.search(pat, title)
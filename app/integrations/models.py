@@ -18,6 +18,11 @@ class MoodleFeed(AppSQLModel, table=True):
     added_at: datetime = Field(default_factory=_utcnow)
     last_fetch_at: Optional[datetime] = Field(default=None)
     active: bool = Field(default=True, index=True)
+    # Validators from the last successful fetch; cleared when the URL changes.
+    etag: Optional[str] = Field(default=None)
+    last_modified: Optional[str] = Field(default=None)
+    content_hash: Optional[str] = Field(default=None, max_length=64)
+    last_error: Optional[str] = Field(default=None)
 
 
 class MoodleFeedItem(AppSQLModel, table=True):
@@ -4,6 +4,7 @@ import os
 
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
+from sqlmodel import Session
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
@@ -15,7 +16,9 @@ if os.path.exists(".env"):
 from app.api import router as memory_router
 from app.ex_api import router as ex_router
 from app.exams.api import exam_router
-from app.db import init_db
+from app.db import get_engine, init_db
+from app.deep.calibration import ensure_calibration_aggregates
+from app.feedback.costs import ensure_cost_ledger, reconcile_cost_ledger_job
 from app.feedback.router import router as feedback_router
 from app.analytics.admin import router as analytics_admin_router
 from app.analytics.kpis import router as analytics_kpis_router
@@ -23,7 +26,10 @@ from app.analytics.investor_router import router as investor_analytics_router
 from app.analytics.router import institution_router as analytics_institution_router
 from app.analytics.router import router as analytics_me_router
 from app.analytics.jobs import nightly_analytics_job
+from app.analytics.writer import start_event_writer, stop_event_writer
+from app.core.http import close_http_clients, http_client_stats
 from app.deep.router import router as deep_router
+from app.deep.stt import start_stt_pool, stop_stt_pool, stt_pool_stats
 from app.prefs.router import router as prefs_router
 from app.pilot.router import router as pilot_router
 from app.learner.router import router as onboarding_router
@@ -31,6 +37,7 @@ from app.tasks.router import router as tasks_router
 from app.notifications.router import router as notifications_router
 from app.explanations.router import router as explanations_router
 from app.study.router import router as study_router
+from app.integrations.feed_refresher import feed_refresher_stats, start_feed_refresher, stop_feed_refresher
 from app.integrations.moodle import router as moodle_router
 from app.users.router import router as users_router
 from app.reports.router import router as reports_router
@@ -40,6 +47,10 @@ from app.exam_pipeline.router import router as exam_pipeline_router
 
 ENABLE_ANALYTICS_JOBS = os.getenv("ENABLE_ANALYTICS_JOBS", "false").lower() in {"1", "true", "yes"}
 ANALYTICS_CRON = os.getenv("ANALYTICS_CRON", "0 2 * * *")
+ANALYTICS_BUFFERED_WRITES = os.getenv("ANALYTICS_BUFFERED_WRITES", "true").lower() in {"1", "true", "yes"}
+ANALYTICS_WRITER_QUEUE_SIZE = int(os.getenv("ANALYTICS_WRITER_QUEUE_SIZE", "10000"))
+ANALYTICS_WRITER_BATCH_SIZE = int(os.getenv("ANALYTICS_WRITER_BATCH_SIZE", "200"))
+ANALYTICS_WRITER_FLUSH_MS = int(os.getenv("ANALYTICS_WRITER_FLUSH_MS", "250"))
 
 _scheduler: BackgroundScheduler | None = None
 
@@ -70,6 +81,13 @@ def _start_scheduler() -> None:
             max_instances=1,
             replace_existing=True,
         )
+        _scheduler.add_job(
+            reconcile_cost_ledger_job,
+            trigger,
+            id="teski_feedback_cost_reconcile",
+            max_instances=1,
+            replace_existing=True,
+        )
         _scheduler.start()
 
 
@@ -103,6 +121,18 @@ def create_app() -> FastAPI:
     async def health() -> dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/health/http-pools", tags=["system"])
+    async def health_http_pools() -> dict:
+        return http_client_stats()
+
+    @app.get("/health/stt", tags=["system"])
+    async def health_stt() -> dict:
+        return stt_pool_stats()
+
+    @app.get("/health/moodle-feeds", tags=["system"])
+    async def health_moodle_feeds() -> dict:
+        return feed_refresher_stats()
+
     api_router.include_router(memory_router)
     api_router.include_router(ex_router)
     api_router.include_router(exam_router)
@@ -131,12 +161,27 @@ def create_app() -> FastAPI:
     @app.on_event("startup")
     async def _startup() -> None:
         init_db()
+        with Session(get_engine()) as session:
+            ensure_cost_ledger(session)
+            ensure_calibration_aggregates(session)
         if ENABLE_ANALYTICS_JOBS:
             _start_scheduler()
+        if ANALYTICS_BUFFERED_WRITES:
+            start_event_writer(
+                max_queue=ANALYTICS_WRITER_QUEUE_SIZE,
+                batch_size=ANALYTICS_WRITER_BATCH_SIZE,
+                flush_interval_ms=ANALYTICS_WRITER_FLUSH_MS,
+            )
+        start_stt_pool()
+        start_feed_refresher()
 
     @app.on_event("shutdown")
     async def _shutdown() -> None:
         _stop_scheduler()
+        stop_event_writer()
+        stop_stt_pool()
+        await stop_feed_refresher()
+        await close_http_clients()
 
     return app
 
@@ -0,0 +1,29 @@
+"""add legacy outbox receipts
+
+Revision ID: 3c9d7e1f5a62
+Revises: 8d3f6a2b7c41
+Create Date: 2026-10-17 14:21:08.913402
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "3c9d7e1f5a62"
+down_revision = "8d3f6a2b7c41"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "legacy_outbox_receipt",
+        sa.Column("idempotency_key", sa.String(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False, server_default=""),
+        sa.Column("applied_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("idempotency_key"),
+    )
+
+
+def downgrade():
+    op.drop_table("legacy_outbox_receipt")
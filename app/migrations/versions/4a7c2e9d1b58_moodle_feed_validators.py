@@ -0,0 +1,45 @@
+"""add moodle feed conditional-get validators
+
+Revision ID: 4a7c2e9d1b58
+Revises: 6e1b4d9a2f37
+Create Date: 2026-10-17 18:21:09.304117
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "4a7c2e9d1b58"
+down_revision = "6e1b4d9a2f37"
+branch_labels = None
+depends_on = None
+
+_COLUMNS = (
+    ("etag", sa.String()),
+    ("last_modified", sa.String()),
+    ("content_hash", sa.String(length=64)),
+    ("last_error", sa.String()),
+)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # moodle_feed itself is created by init_db(); only patch tables that predate these columns.
+    if "moodle_feed" not in inspector.get_table_names():
+        return
+    existing = {col["name"] for col in inspector.get_columns("moodle_feed")}
+    with op.batch_alter_table("moodle_feed", schema=None) as batch_op:
+        for name, type_ in _COLUMNS:
+            if name not in existing:
+                batch_op.add_column(sa.Column(name, type_, nullable=True))
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "moodle_feed" not in inspector.get_table_names():
+        return
+    existing = {col["name"] for col in inspector.get_columns("moodle_feed")}
+    with op.batch_alter_table("moodle_feed", schema=None) as batch_op:
+        for name, _ in reversed(_COLUMNS):
+            if name in existing:
+                batch_op.drop_column(name)
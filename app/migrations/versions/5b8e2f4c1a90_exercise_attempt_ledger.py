@@ -0,0 +1,44 @@
+"""add exercise attempt ledger
+
+Revision ID: 5b8e2f4c1a90
+Revises: d147f0acaae3
+Create Date: 2026-10-17 09:12:40.118204
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "5b8e2f4c1a90"
+down_revision = "d147f0acaae3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "exerciseattempt",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("user_id", sa.String(length=36), nullable=False),
+        sa.Column("exercise_id", sa.String(length=255), nullable=False),
+        sa.Column("skill_key", sa.String(length=255), nullable=False, server_default=""),
+        sa.Column("correct", sa.Boolean(), nullable=False, server_default=sa.text("0")),
+        sa.Column("difficulty", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("ts", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_exerciseattempt_id", "exerciseattempt", ["id"])
+    op.create_index("ix_exerciseattempt_user_id", "exerciseattempt", ["user_id"])
+    op.create_index("ix_exerciseattempt_exercise_id", "exerciseattempt", ["exercise_id"])
+    op.create_index("ix_exerciseattempt_skill_key", "exerciseattempt", ["skill_key"])
+    op.create_index("ix_exerciseattempt_user_ts", "exerciseattempt", ["user_id", "ts"])
+
+
+def downgrade():
+    op.drop_index("ix_exerciseattempt_user_ts", table_name="exerciseattempt")
+    op.drop_index("ix_exerciseattempt_skill_key", table_name="exerciseattempt")
+    op.drop_index("ix_exerciseattempt_exercise_id", table_name="exerciseattempt")
+    op.drop_index("ix_exerciseattempt_user_id", table_name="exerciseattempt")
+    op.drop_index("ix_exerciseattempt_id", table_name="exerciseattempt")
+    op.drop_table("exerciseattempt")
@@ -0,0 +1,34 @@
+"""add feedback cost ledger
+
+Revision ID: 6e1b4d9a2f37
+Revises: 3c9d7e1f5a62
+Create Date: 2026-10-17 15:02:44.518730
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "6e1b4d9a2f37"
+down_revision = "3c9d7e1f5a62"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "feedbackcostledger",
+        sa.Column("period", sa.String(length=10), nullable=False),
+        sa.Column("model_used", sa.String(length=32), nullable=False),
+        sa.Column("cost_eur", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("events", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cached_hits", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("tokens_in", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("tokens_out", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("period", "model_used"),
+    )
+
+
+def downgrade():
+    op.drop_table("feedbackcostledger")
@@ -0,0 +1,30 @@
+"""add analytics rollup watermark
+
+Revision ID: 8d3f6a2b7c41
+Revises: 5b8e2f4c1a90
+Create Date: 2026-10-17 11:03:52.480117
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "8d3f6a2b7c41"
+down_revision = "5b8e2f4c1a90"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "analyticsrollupstate",
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("watermark", sa.DateTime(), nullable=False),
+        sa.Column("events_folded", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade():
+    op.drop_table("analyticsrollupstate")
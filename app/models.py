@@ -5,7 +5,7 @@ from enum import Enum
 from typing import Optional, List, Dict
 from uuid import UUID, uuid4
 
-from sqlalchemy import MetaData
+from sqlalchemy import Index, MetaData
 from sqlalchemy.dialects.sqlite import JSON
 from sqlmodel import Field, SQLModel
 
@@ -187,6 +187,20 @@ class AnalyticsEvent(AppSQLModel, table=True):
     ts: datetime = Field(default_factory=_utcnow, index=True)
 
 
+class ExerciseAttempt(AppSQLModel, table=True):
+    """Typed ledger of graded exercise submissions, one row per attempt."""
+
+    __table_args__ = (Index("ix_exerciseattempt_user_ts", "user_id", "ts"),)
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True, index=True)
+    user_id: UUID = Field(foreign_key="user.id", index=True)
+    exercise_id: str = Field(index=True)
+    skill_key: str = Field(default="", index=True)
+    correct: bool = Field(default=False)
+    difficulty: int = Field(default=1)
+    ts: datetime = Field(default_factory=_utcnow)
+
+
 class XPEvent(AppSQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True, index=True)
     user_id: UUID = Field(foreign_key="user.id", index=True)
@@ -207,6 +221,15 @@ class LegacyTaskMap(AppSQLModel, table=True):
     task_id: UUID = Field(foreign_key="task.id", index=True)
 
 
+class LegacyOutboxReceipt(AppSQLModel, table=True):
+    """Idempotency keys of legacy memory-outbox entries already applied here."""
+
+    __tablename__ = "legacy_outbox_receipt"
+    idempotency_key: str = Field(primary_key=True)
+    kind: str = Field(default="")
+    applied_at: datetime = Field(default_factory=_utcnow)
+
+
 try:
     import app.analytics.models  # noqa: F401  # ensures metadata registration
 except ImportError:
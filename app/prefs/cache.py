@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from .models import UserPrefs
+
+PREFS_CACHE_TTL_S = float(os.getenv("PREFS_CACHE_TTL_S", "30"))
+PREFS_CACHE_MAX_ENTRIES = int(os.getenv("PREFS_CACHE_MAX_ENTRIES", "10000"))
+
+# Every boolean opt-in on UserPrefs; a user without a row gets the defaults.
+PREF_FIELDS: Tuple[str, ...] = tuple(
+    name for name, info in UserPrefs.model_fields.items() if info.annotation is bool
+)
+_DEFAULTS: Dict[str, bool] = {name: bool(UserPrefs.model_fields[name].default) for name in PREF_FIELDS}
+
+
+@dataclass(frozen=True)
+class PrefsSnapshot:
+    """Immutable view of one user's opt-ins, read once per request."""
+
+    user_id: Optional[UUID]
+    values: Mapping[str, bool] = field(default_factory=dict)
+
+    def allows(self, pref: str) -> bool:
+        if self.user_id is None:
+            return False
+        return bool(self.values.get(pref, False))
+
+    def require(self, pref: str, message: str) -> None:
+        if not self.allows(pref):
+            raise HTTPException(status_code=403, detail=message)
+
+
+class PrefsCache:
+    """
+    Process-wide TTL + LRU cache of :class:`PrefsSnapshot` keyed by user.
+
+    Writes through ``app/prefs`` (and any other ORM write to ``UserPrefs``)
+    invalidate the user's entry. A load that raced with an invalidation is not
+    cached, so a snapshot read before a write can never outlive it here; other
+    processes see the change within ``ttl_s``.
+    """
+
+    def __init__(self, ttl_s: float = PREFS_CACHE_TTL_S, max_entries: int = PREFS_CACHE_MAX_ENTRIES) -> None:
+        self._ttl_s = max(0.0, ttl_s)
+        self._max_entries = max(0, max_entries)
+        self._entries: "OrderedDict[UUID, Tuple[float, PrefsSnapshot]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, user_id: UUID, now: Optional[float] = None) -> Optional[PrefsSnapshot]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[user_id]
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self._counters["hits"] += 1
+            return entry[1]
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def put(self, snapshot: PrefsSnapshot, generation: int) -> None:
+        if not self._max_entries or not self._ttl_s or snapshot.user_id is None:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return  # an invalidation happened while this snapshot was loading
+            self._entries[snapshot.user_id] = (time.monotonic() + self._ttl_s, snapshot)
+            self._entries.move_to_end(snapshot.user_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[UUID] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            self._counters["invalidations"] += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries)}
+
+
+_cache = PrefsCache()
+
+
+def get_prefs_cache() -> PrefsCache:
+    return _cache
+
+
+def load_prefs(session: Session, user_id: Optional[UUID]) -> PrefsSnapshot:
+    """Return the user's preference snapshot, from the cache when fresh."""
+    if not user_id:
+        return PrefsSnapshot(user_id=None)
+    cached = _cache.get(user_id)
+    if cached is not None:
+        return cached
+    generation = _cache.generation()
+    row = session.exec(select(UserPrefs).where(UserPrefs.user_id == user_id)).first()
+    values = {name: bool(getattr(row, name)) for name in PREF_FIELDS} if row else dict(_DEFAULTS)
+    snapshot = PrefsSnapshot(user_id=user_id, values=values)
+    _cache.put(snapshot, generation)
+    return snapshot
+
+
+def invalidate_prefs(user_id: Optional[UUID] = None) -> None:
+    """Drop one user's cached snapshot (or all of them)."""
+    _cache.invalidate(user_id)
+
+
+@event.listens_for(UserPrefs, "after_insert")
+@event.listens_for(UserPrefs, "after_update")
+@event.listens_for(UserPrefs, "after_delete")
+def _invalidate_on_write(mapper, connection, target: UserPrefs) -> None:
+    invalidate_prefs(target.user_id)
@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends
 from sqlmodel import Session, select
 
 from ..db import get_session
+from .cache import invalidate_prefs
 from .models import UserPrefs
 from .schemas import PrefsIn, PrefsOut
 
@@ -19,6 +20,7 @@ def _ensure(session: Session, user_id: UUID) -> UserPrefs:
         row = UserPrefs(user_id=user_id)
         session.add(row)
         session.commit()
+        invalidate_prefs(user_id)
         session.refresh(row)
     return row
 
@@ -39,5 +41,8 @@ def set_prefs(payload: PrefsIn, session: Session = Depends(get_session)) -> Pref
     row.updated_at = datetime.utcnow()
     session.add(row)
     session.commit()
+    # Also invalidated at flush; again after commit so a read that raced the
+    # write cannot leave the old values cached.
+    invalidate_prefs(payload.user_id)
     session.refresh(row)
     return PrefsOut(**row.model_dump())
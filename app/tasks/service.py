@@ -33,8 +33,8 @@ PRACTICE_STYLE_TWEAKS = {
 }
 
 
-def create_task(session: Session, user_id: UUID, payload: TaskCreate) -> Task:
-    """Persist a new task for the user."""
+def create_task(session: Session, user_id: UUID, payload: TaskCreate, *, commit: bool = True) -> Task:
+    """Persist a new task for the user; ``commit=False`` only flushes so the caller owns the transaction."""
     now = _utcnow()
     task = Task(
         user_id=user_id,
@@ -48,16 +48,21 @@ def create_task(session: Session, user_id: UUID, payload: TaskCreate) -> Task:
         updated_at=now,
     )
     session.add(task)
+    if not commit:
+        session.flush()
+        return task
     session.commit()
     session.refresh(task)
     return task
 
 
-def create_task_with_blocks(session: Session, user_id: UUID, payload: TaskCreate) -> tuple[Task, List[TaskBlock], LearnerProfile]:
+def create_task_with_blocks(
+    session: Session, user_id: UUID, payload: TaskCreate, *, commit: bool = True
+) -> tuple[Task, List[TaskBlock], LearnerProfile]:
     """Convenience helper that creates a task and immediately generates blocks."""
     profile = get_or_default_profile(session, user_id)
-    task = create_task(session, user_id, payload)
-    blocks = generate_blocks_for_task(session, task, profile)
+    task = create_task(session, user_id, payload, commit=commit)
+    blocks = generate_blocks_for_task(session, task, profile, commit=commit)
     return task, blocks, profile
 
 
@@ -66,7 +71,9 @@ def compute_personalized_minutes(task: Task, profile: LearnerProfile) -> int:
     return max(5, int(math.ceil(task.base_estimated_minutes * multiplier)))
 
 
-def generate_blocks_for_task(session: Session, task: Task, profile: LearnerProfile) -> List[TaskBlock]:
+def generate_blocks_for_task(
+    session: Session, task: Task, profile: LearnerProfile, *, commit: bool = True
+) -> List[TaskBlock]:
     """Create TaskBlock rows that reflect the learner's preferences."""
     total_minutes = compute_personalized_minutes(task, profile)
     block_specs = _plan_block_sequence(total_minutes, profile)
@@ -82,6 +89,8 @@ def generate_blocks_for_task(session: Session, task: Task, profile: LearnerProfi
         )
         session.add(block)
         blocks.append(block)
+    if not commit:
+        return blocks
     session.commit()
     for block in blocks:
         session.refresh(block)
@@ -44,6 +44,8 @@ def _ensure_task_columns(conn: sqlite3.Connection) -> None:
         alters.append("ALTER TABLE task ADD COLUMN suggested_start_utc TEXT")
     if "completed_at" not in cols:
         alters.append("ALTER TABLE task ADD COLUMN completed_at TEXT")
+    if "next_reminder_at" not in cols:
+        alters.append("ALTER TABLE task ADD COLUMN next_reminder_at TEXT")
     for stmt in alters:
         cur.execute(stmt)
     if alters:
@@ -106,6 +108,21 @@ def _ensure_external_user_id(conn: sqlite3.Connection) -> None:
         cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_user_external_id ON user(external_user_id)")
         conn.commit()
 
+def _ensure_review_card_indexes(conn: sqlite3.Connection) -> None:
+    """Add the (user_id, next_review_at) due-queue index to existing review_cards tables."""
+    cur = conn.cursor()
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_review_cards_user_due ON review_cards(user_id, next_review_at)")
+    conn.commit()
+
+
+def _ensure_reminder_indexes(conn: sqlite3.Connection) -> None:
+    """Indexes used by the incremental reminder sweep on existing databases."""
+    cur = conn.cursor()
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_task_next_reminder_at ON task(next_reminder_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_reminder_task_id ON reminder(task_id)")
+    conn.commit()
+
+
 def _ensure_feedback_raffle_columns(conn: sqlite3.Connection) -> None:
     """Add raffle-related columns to feedback_items if missing."""
     cur = conn.cursor()
@@ -203,6 +220,11 @@ def init_db():
 
         _ = (ReviewCard,)
         # <<< MEMORY V1 END
+        # >>> MEMORY OUTBOX START
+        from models_memory import MemoryOutbox
+
+        _ = (MemoryOutbox,)
+        # <<< MEMORY OUTBOX END
         # >>> DFE START
         from models_dfe import SkillEdge, SkillMastery, SkillNode, TaskAttempt, TaskInstance, TaskTemplate
         _ = (SkillEdge, SkillMastery, SkillNode, TaskAttempt, TaskInstance, TaskTemplate)
@@ -247,6 +269,8 @@ def init_db():
         _ensure_external_user_id(conn)
         _ensure_onboarded_columns(conn)
         _ensure_feedback_raffle_columns(conn)
+        _ensure_review_card_indexes(conn)
+        _ensure_reminder_indexes(conn)
 
         mode = _ensure_help_library_tables(conn)
         print(f"[DB] Help Library tables ensured (mode={mode})", file=sys.stderr)
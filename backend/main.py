@@ -281,9 +281,34 @@ if ENABLE_SCHEDULER:
         with Session(engine) as s:
             run_sweep(s, persona="teacher")
     scheduler.add_job(job, "interval", minutes=15)
+    # >>> MEMORY OUTBOX START
+    from datetime import timedelta
+    from services.memory_bridge import prune_memory_outbox, relay_memory_outbox
+    from settings import memory_settings
+
+    if memory_settings.MEMORY_V2_DUAL_WRITE:
+        def memory_outbox_job():
+            with Session(engine) as s:
+                relay_memory_outbox(s)
+                prune_memory_outbox(s, older_than=timedelta(hours=memory_settings.OUTBOX_RETENTION_H))
+        scheduler.add_job(
+            memory_outbox_job,
+            "interval",
+            seconds=memory_settings.OUTBOX_RELAY_INTERVAL_S,
+            max_instances=1,
+            coalesce=True,
+        )
+    # <<< MEMORY OUTBOX END
     scheduler.start()
 else:
     logger.info("[startup] Scheduler disabled (ENABLE_SCHEDULER=false)")
+    # >>> MEMORY OUTBOX START
+    from settings import memory_settings
+
+    if memory_settings.MEMORY_V2_DUAL_WRITE:
+        # Only the scheduler relays and prunes the outbox; without it the table grows unbounded.
+        raise RuntimeError("TESKI_MEMORY_V2_DUAL_WRITE=true requires ENABLE_SCHEDULER=true")
+    # <<< MEMORY OUTBOX END
 
 # >>> SEED EXERCISES START
 from seed.exercises_intro_python import seed_intro_python_exercises
@@ -311,6 +336,18 @@ def log_key_routes():
     logger.warning("Mounted routes (%d): %s", len(routes), sorted(set(routes)))
 # <<< SEED EXERCISES END
 
+# >>> LEADERBOARD STANDINGS START
+from services.leaderboard import backfill_standings
+
+@app.on_event("startup")
+def backfill_leaderboard_standings():
+    # Standings reads never write; members from before the table get their rows here.
+    with Session(engine) as session:
+        rebuilt = backfill_standings(session)
+    if rebuilt:
+        logger.info("[startup] Rebuilt leaderboard standings for %d boards", rebuilt)
+# <<< LEADERBOARD STANDINGS END
+
 # Backward compatibility: allow legacy clients hitting /tasks/upcoming without /api prefix
 from routes.tasks import list_upcoming as list_upcoming_tasks  # type: ignore
 
@@ -15,7 +15,7 @@ else:
     from typing import Optional, Dict, Any
     from uuid import uuid4
 
-    from sqlalchemy import Column
+    from sqlalchemy import Column, event
     from sqlalchemy.types import JSON
     from sqlmodel import SQLModel, Field, UniqueConstraint
 
@@ -99,11 +99,21 @@ else:
         suggested_start_utc: Optional[datetime] = Field(default=None)  # when Duey thinks you should start
         signals_json: Optional[str] = Field(default=None)  # JSON blob of signals used in estimate
         completed_at: Optional[str] = None
+        # next time the reminder sweep must look at this task (local wall time);
+        # NULL means "evaluate on the next sweep"
+        next_reminder_at: Optional[datetime] = Field(default=None, index=True)
+
+
+    @event.listens_for(Task.due_iso, "set")
+    def _reschedule_reminder_on_due_change(target, value, oldvalue, initiator):
+        # a moved deadline changes the escalation tier, so re-evaluate next sweep
+        if value != oldvalue:
+            target.next_reminder_at = None
 
 
     class Reminder(SQLModel, table=True):
         id: Optional[int] = Field(default=None, primary_key=True)
-        task_id: str
+        task_id: str = Field(index=True)
         escalation: EscalationEnum
         persona: str  # 'teacher' | 'roommate' | 'sergeant'
         created_at: datetime = Field(default_factory=lambda: datetime.now(DEFAULT_TIMEZONE))
@@ -3,7 +3,7 @@
 
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
 from sqlalchemy import UniqueConstraint
@@ -70,4 +70,28 @@ class WeeklyScore(SQLModel, table=True):
     week_year: int
     week_number: int
     points: int = Field(default=0)
+
+
+class LeaderboardStanding(SQLModel, table=True):
+    """Per-member totals kept current by ``award_points`` so standings need no event scans.
+
+    Day fields are local days in ``DEFAULT_TZ``; ``streak_before`` counts the
+    consecutive positive days that ended the day before ``last_active_day``.
+    """
+
+    __table_args__ = (
+        UniqueConstraint("leaderboard_id", "user_id", name="uq_leaderboard_standing"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    leaderboard_id: int = Field(foreign_key="leaderboard.id", index=True)
+    user_id: int = Field(foreign_key="user.id")
+    week_year: int = Field(default=0)
+    week_number: int = Field(default=0)
+    weekly_points: int = Field(default=0)
+    total_points: int = Field(default=0)
+    last_active_day: Optional[date] = Field(default=None)
+    last_day_points: int = Field(default=0)
+    streak_before: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=lambda: time_utils.now_utc())
 # >>> LEADERBOARD END MODELS
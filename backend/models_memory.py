@@ -4,7 +4,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Dict, Optional, Literal
 
-from sqlalchemy import Column
+from sqlalchemy import Column, Index
 from sqlalchemy.dialects.sqlite import JSON as SQLITE_JSON
 from sqlmodel import Field, SQLModel, UniqueConstraint
 
@@ -91,6 +91,39 @@ class ReviewCard(SQLModel, table=True):
     last_result: Optional[bool] = Field(default=None)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
-    __table_args__ = (UniqueConstraint("user_id", "template_code", name="uq_review_user_tpl"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "template_code", name="uq_review_user_tpl"),
+        # due queue: "next N due cards for a user" is an index range scan
+        Index("ix_review_cards_user_due", "user_id", "next_review_at"),
+    )
 # <<< MEMORY V1 END
+# >>> MEMORY OUTBOX START
+OutboxStatus = Literal["pending", "done", "dead"]
+
+
+class MemoryOutbox(SQLModel, table=True):
+    """
+    Pending v2 memory dual writes, committed with the legacy change that caused
+    them and replayed against the app database by the outbox relay.
+    """
+
+    __tablename__ = "memory_outbox"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    idempotency_key: str = Field(index=True, unique=True)
+    kind: str = Field(index=True)
+    user_id: int = Field(index=True)
+    payload: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(SQLITE_JSON))
+    status: str = Field(default="pending", index=True)
+    attempts: int = Field(default=0)
+    last_error: Optional[str] = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    processed_at: Optional[datetime] = Field(default=None)
+
+    __table_args__ = (
+        # relay scan: "oldest pending rows that are ready to retry"
+        Index("ix_memory_outbox_status_next", "status", "next_attempt_at"),
+    )
+# <<< MEMORY OUTBOX END
 # <<< MEMORY END
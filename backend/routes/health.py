@@ -1,5 +1,9 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Depends, Request
+from sqlmodel import Session
+
 import settings
+from db import get_session
+from services.memory_bridge import outbox_stats
 
 router = APIRouter()
 
@@ -8,6 +12,11 @@ def health():
     return {"ok": True}
 
 
+@router.get("/health/memory-outbox")
+def health_memory_outbox(session: Session = Depends(get_session)):
+    return outbox_stats(session)
+
+
 @router.get("/health/auth")
 def health_auth():
     debug_enabled = getenv("TESKI_DEBUG", "0") == "1"
@@ -9,7 +9,7 @@ from db import get_session
 from models import Task, Reminder
 from schemas import NextReminderReq, NextReminderOut
 from services.scoring import score, script_hint
-from services.reminder_engine import run_sweep, maybe_create_reminder_for_task  # <-- add this module
+from services.reminder_engine import sweep_reminders, maybe_create_reminder_for_task  # <-- add this module
 from settings import DEFAULT_TIMEZONE
 
 router = APIRouter(prefix="/reminders", tags=["reminders"])
@@ -61,8 +61,13 @@ def run_reminder_sweep(
     persona: str = Query("teacher", description="persona key used for created reminders"),
     session: Session = Depends(get_session),
 ):
-    checked, created = run_sweep(session, persona=persona)
-    return {"checked": checked, "created": created}
+    stats = sweep_reminders(session, persona=persona)
+    return {
+        "checked": stats.checked,
+        "created": stats.created,
+        "rescheduled": stats.rescheduled,
+        "duration_ms": stats.duration_ms,
+    }
 
 
 # ---------------------------
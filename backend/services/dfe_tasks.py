@@ -4,8 +4,9 @@ from __future__ import annotations
 import math
 import random
 from datetime import datetime, timezone
+from functools import lru_cache
 from secrets import token_hex
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from fastapi import HTTPException
 from jinja2 import Environment, StrictUndefined
@@ -51,9 +52,15 @@ def _infer_skill_title(skill_key: str) -> str:
     return leaf.replace("_", " ").title()
 
 
+@lru_cache(maxsize=1024)
+def _compiled_template(template_str: str):
+    # Keyed by the template source itself, so an edited template is a new entry.
+    return _TEMPLATE_ENV.from_string(template_str)
+
+
 def _render_text(template_str: str, params: Dict[str, Any]) -> str:
     try:
-        template = _TEMPLATE_ENV.from_string(template_str)
+        template = _compiled_template(template_str)
         return template.render(**params)
     except (UndefinedError, TemplateError) as exc:
         raise ValueError(f"Failed to render template: {exc}") from exc
@@ -98,30 +105,16 @@ def _maybe_validate_constraints(params: Dict[str, Any], constraint_expr: Optiona
         return False
 
 
-def instantiate_for_user(session: Session, template_code: str, user_id: int, force_new: bool = False) -> Tuple[TaskInstance, TaskTemplate]:
-    template_stmt = select(TaskTemplate).where(TaskTemplate.code == template_code)
-    template = session.exec(template_stmt).first()
-    if not template:
-        raise HTTPException(status_code=404, detail="Task template not found")
-
+def _instance_seed(template: TaskTemplate, user_id: int, force_new: bool) -> Tuple[str, int]:
     if not force_new:
         base_seed = str(deterministic_seed(user_id, template.code, TESKI_PARAM_SALT))
-        instance_stmt = select(TaskInstance).where(
-            TaskInstance.template_id == template.id,
-            TaskInstance.user_id == user_id,
-            TaskInstance.seed == base_seed,
-        )
-        existing = session.exec(instance_stmt).first()
-        if existing:
-            return existing, template
-        rng_seed = int(base_seed)
-        seed_value = base_seed
-    else:
-        # fresh seed path for forced regeneration
-        seed_suffix = token_hex(8)
-        seed_value = f"force:{seed_suffix}"
-        rng_seed = deterministic_seed(user_id, f"{template.code}:{seed_suffix}", TESKI_PARAM_SALT)
+        return base_seed, int(base_seed)
+    # fresh seed path for forced regeneration
+    seed_suffix = token_hex(8)
+    return f"force:{seed_suffix}", deterministic_seed(user_id, f"{template.code}:{seed_suffix}", TESKI_PARAM_SALT)
+
 
+def _build_instance(template: TaskTemplate, user_id: int, seed_value: str, rng_seed: int) -> TaskInstance:
     rnd = random.Random(rng_seed)
     constraint_expr = (template.constraints or {}).get("expr") if template.constraints else None
 
@@ -135,14 +128,33 @@ def instantiate_for_user(session: Session, template_code: str, user_id: int, for
         raise HTTPException(status_code=400, detail="Unable to satisfy template constraints")
 
     rendered_text = _render_text(template.text_template, params)
-
-    instance = TaskInstance(
+    return TaskInstance(
         template_id=template.id,
         user_id=user_id,
         seed=seed_value,
         params=params,
         rendered_text=rendered_text,
     )
+
+
+def instantiate_for_user(session: Session, template_code: str, user_id: int, force_new: bool = False) -> Tuple[TaskInstance, TaskTemplate]:
+    template_stmt = select(TaskTemplate).where(TaskTemplate.code == template_code)
+    template = session.exec(template_stmt).first()
+    if not template:
+        raise HTTPException(status_code=404, detail="Task template not found")
+
+    seed_value, rng_seed = _instance_seed(template, user_id, force_new)
+    if not force_new:
+        instance_stmt = select(TaskInstance).where(
+            TaskInstance.template_id == template.id,
+            TaskInstance.user_id == user_id,
+            TaskInstance.seed == seed_value,
+        )
+        existing = session.exec(instance_stmt).first()
+        if existing:
+            return existing, template
+
+    instance = _build_instance(template, user_id, seed_value, rng_seed)
     session.add(instance)
     try:
         session.commit()
@@ -153,6 +165,94 @@ def instantiate_for_user(session: Session, template_code: str, user_id: int, for
     return instance, template
 
 
+def instantiate_many(
+    session: Session,
+    template_codes: Sequence[str],
+    user_id: int,
+    *,
+    force_new: bool = False,
+    commit: bool = True,
+) -> List[Optional[Tuple[TaskInstance, TaskTemplate]]]:
+    """
+    Instantiate a batch of templates for one user with a single template query
+    and a single flush. Results line up with ``template_codes``; entries are
+    None when the template is missing, its constraints cannot be satisfied or
+    its row fails to insert. A failed insert only drops that entry: the batch
+    is retried one savepoint per row. With ``commit=False`` the caller owns the
+    transaction and nothing is rolled back outside the savepoints.
+    """
+    codes = list(template_codes)
+    if not codes:
+        return []
+    templates = {
+        template.code: template
+        for template in session.exec(select(TaskTemplate).where(TaskTemplate.code.in_(set(codes)))).all()
+    }
+
+    existing: Dict[Tuple[int, str], TaskInstance] = {}
+    if not force_new and templates:
+        seeds = {_instance_seed(template, user_id, False)[0] for template in templates.values()}
+        rows = session.exec(
+            select(TaskInstance).where(
+                TaskInstance.user_id == user_id,
+                TaskInstance.template_id.in_([template.id for template in templates.values()]),
+                TaskInstance.seed.in_(seeds),
+            )
+        ).all()
+        existing = {(row.template_id, row.seed): row for row in rows}
+
+    results: List[Optional[Tuple[TaskInstance, TaskTemplate]]] = []
+    created: List[TaskInstance] = []
+    for code in codes:
+        template = templates.get(code)
+        if template is None:
+            results.append(None)
+            continue
+        seed_value, rng_seed = _instance_seed(template, user_id, force_new)
+        instance = existing.get((template.id, seed_value))
+        if instance is None:
+            try:
+                instance = _build_instance(template, user_id, seed_value, rng_seed)
+            except (HTTPException, ValueError):
+                results.append(None)
+                continue
+            created.append(instance)
+            if not force_new:
+                existing[(template.id, seed_value)] = instance
+        results.append((instance, template))
+
+    failed = _insert_instances(session, created)
+    if failed:
+        results = [None if result is not None and id(result[0]) in failed else result for result in results]
+    if commit:
+        try:
+            session.commit()
+        except SQLAlchemyError as exc:
+            session.rollback()
+            raise HTTPException(status_code=400, detail="Failed to persist task instances") from exc
+    return results
+
+
+def _insert_instances(session: Session, instances: List[TaskInstance]) -> set:
+    """Flush ``instances`` in one savepoint, or one savepoint each if that fails; returns ids of rows that failed."""
+    if not instances:
+        return set()
+    try:
+        with session.begin_nested():
+            session.add_all(instances)
+        return set()
+    except SQLAlchemyError:
+        pass
+    failed = set()
+    for instance in instances:
+        try:
+            with session.begin_nested():
+                session.add(instance)
+        except SQLAlchemyError:
+            failed.add(id(instance))
+    return failed
+
+
 def _grade_numeric(spec: Dict[str, Any], params: Dict[str, Any], submitted: Any) -> bool:
     formula = spec.get("formula")
     if not formula:
@@ -192,7 +292,15 @@ def _compute_mastery(old_value: float, correct: bool) -> float:
     return max(0.0, min(1.0, new_value))
 
 
-def grade_and_update(session: Session, instance_id: int, user_id: int, answer: Any, latency_ms: Optional[int]) -> Tuple[bool, float]:
+def grade_and_update(
+    session: Session,
+    instance_id: int,
+    user_id: int,
+    answer: Any,
+    latency_ms: Optional[int],
+    *,
+    commit: bool = True,
+) -> Tuple[bool, float]:
     instance = session.get(TaskInstance, instance_id)
     if not instance or instance.user_id != user_id:
         raise HTTPException(status_code=404, detail="Task instance not found")
@@ -240,7 +348,10 @@ def grade_and_update(session: Session, instance_id: int, user_id: int, answer: A
         mastery.mastery = updated_value
         mastery.updated_at = now
 
-    session.commit()
+    if commit:
+        session.commit()
+    else:
+        session.flush()
     return bool(correct), float(updated_value)
 
 
@@ -311,12 +422,21 @@ def grade_and_update_with_memory_v1(
     session: Session, instance_id: int, user_id: int, answer: Any, latency_ms: Optional[int]
 ) -> Tuple[bool, float]:
     """Grades a submission, updates mastery, and records memory signals with heuristic error subtypes."""
-    correct, mastery = grade_and_update(session, instance_id, user_id, answer, latency_ms)
+    # The attempt is only flushed: the outbox rows below must commit together with
+    # the attempt and the mistake they describe, via the next helper's commit.
+    correct, mastery = grade_and_update(session, instance_id, user_id, answer, latency_ms, commit=False)
 
     instance, template, skill_id, template_code = _resolve_task_context(session, instance_id)
 
     concept_ref = template.code if template else template_code or "unknown"
     review_grade = 5 if correct else 2
+    record_review_dual_write(
+        session,
+        user_id=user_id,
+        concept=concept_ref,
+        grade=review_grade,
+        task_id=None,
+    )
     if correct:
         mark_mastered(session, user_id=user_id, skill_id=skill_id, template_code=template_code)
         if template_code:
@@ -377,6 +497,13 @@ def grade_and_update_with_memory_v1(
         )
         subtype = inferred or classify_error_subtype(detail)
         detail["reason"] = subtype
+        record_mistake_dual_write(
+            session,
+            user_id=user_id,
+            concept=concept_ref,
+            subtype=subtype,
+            detail=detail,
+        )
         log_mistake(
             session,
             user_id=user_id,
@@ -399,21 +526,8 @@ def grade_and_update_with_memory_v1(
         )
         if template_code:
             mark_review_result(session, user_id=user_id, template_code=template_code, correct=False)
-        record_mistake_dual_write(
-            session,
-            user_id=user_id,
-            concept=concept_ref,
-            subtype=subtype,
-            detail=detail,
-        )
 
-    record_review_dual_write(
-        session,
-        user_id=user_id,
-        concept=concept_ref,
-        grade=review_grade,
-        task_id=None,
-    )
+    session.commit()
 
     return correct, mastery
 
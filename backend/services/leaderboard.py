@@ -4,8 +4,8 @@
 from __future__ import annotations
 
 from collections import defaultdict
-from datetime import datetime, timedelta, date
-from typing import Optional, Dict, Any, Tuple
+from datetime import datetime, timedelta, timezone, date
+from typing import Optional, Dict, Any, Iterable, Tuple
 
 from fastapi import HTTPException, status
 from sqlalchemy import func
@@ -21,6 +21,7 @@ from models import User
 from models_leaderboard import (
     Leaderboard,
     LeaderboardMember,
+    LeaderboardStanding,
     PointsEvent,
     WeeklyScore,
 )
@@ -30,15 +31,9 @@ from utils.crypto import anon_handle
 from utils.time import now_utc, to_week_key, start_end_of_week_iso
 from services.memory_bridge import record_xp_event
 
-
-# >>> LEADERBOARD START UTIL
-def _scalar(first_value):
-    if first_value is None:
-        return None
-    if isinstance(first_value, (tuple, list)):
-        return first_value[0] if first_value else None
-    return first_value
-# >>> LEADERBOARD END UTIL
+# Streaks only look this many local days back, both when folded incrementally
+# and when a board is rebuilt from raw PointsEvent rows.
+STREAK_WINDOW_DAYS = 14
 
 
 def _ensure_join_code(db: Session) -> str:
@@ -63,6 +58,7 @@ def create_leaderboard(db: Session, *, name: str, course_id: Optional[str], crea
     db.flush()
     member = LeaderboardMember(leaderboard_id=board.id, user_id=creator.id, display_consent=bool(creator.display_name))
     db.add(member)
+    db.add(LeaderboardStanding(leaderboard_id=board.id, user_id=creator.id))
     db.commit()
     db.refresh(board)
     return board
@@ -83,6 +79,7 @@ def join_leaderboard(db: Session, *, leaderboard_code: str, user: User) -> Leade
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Already joined")
     membership = LeaderboardMember(leaderboard_id=board.id, user_id=user.id)
     db.add(membership)
+    db.add(LeaderboardStanding(leaderboard_id=board.id, user_id=user.id))
     db.commit()
     db.refresh(membership)
     return membership
@@ -137,6 +134,74 @@ def _ensure_member(db: Session, leaderboard_id: int, user_id: int) -> Leaderboar
     return membership
 
 
+def _local_day(moment: datetime, tzinfo: ZoneInfo) -> date:
+    return moment.astimezone(tzinfo).date()
+
+
+def _standing_row(db: Session, leaderboard_id: int, user_id: int) -> LeaderboardStanding:
+    stmt = select(LeaderboardStanding).where(
+        LeaderboardStanding.leaderboard_id == leaderboard_id,
+        LeaderboardStanding.user_id == user_id,
+    )
+    standing = db.exec(stmt).first()
+    if standing:
+        return standing
+    # Members that predate the standings table: seed the row from raw events
+    # before folding the new award into it.
+    standing = _compute_standings(db, leaderboard_id, DEFAULT_TZ, now_utc(), user_ids=[user_id])[user_id]
+    try:
+        # A savepoint, so losing the insert race keeps the caller's staged work.
+        with db.begin_nested():
+            db.add(standing)
+    except IntegrityError:
+        standing = db.exec(stmt).first()
+        if not standing:
+            raise HTTPException(status_code=500, detail="Unable to upsert standing")
+    return standing
+
+
+def _fold_award(
+    db: Session,
+    standing: LeaderboardStanding,
+    *,
+    points: int,
+    occurred_at: datetime,
+) -> None:
+    """Apply one award to the materialized row without reading any event history."""
+    week = to_week_key(occurred_at)
+    day = _local_day(occurred_at, ZoneInfo(DEFAULT_TZ))
+
+    standing.total_points += points
+    current_week = (standing.week_year, standing.week_number)
+    if week > current_week:
+        standing.week_year, standing.week_number = week
+        standing.weekly_points = points
+    elif week == current_week:
+        standing.weekly_points += points
+
+    last_day = standing.last_active_day
+    if last_day is None or day > last_day:
+        continues = (
+            last_day is not None
+            and day - last_day == timedelta(days=1)
+            and standing.last_day_points > 0
+        )
+        standing.streak_before = standing.streak_before + 1 if continues else 0
+        standing.last_active_day = day
+        standing.last_day_points = points
+    elif day == last_day:
+        standing.last_day_points += points
+    else:
+        # Backdated award: recount the streak window for this member only.
+        fresh = _compute_standings(
+            db, standing.leaderboard_id, DEFAULT_TZ, now_utc(), user_ids=[standing.user_id]
+        )[standing.user_id]
+        standing.last_active_day = fresh.last_active_day
+        standing.last_day_points = fresh.last_day_points
+        standing.streak_before = fresh.streak_before
+    standing.updated_at = now_utc()
+
+
 def award_points(
     db: Session,
     *,
@@ -156,7 +221,9 @@ def award_points(
     else:
         points_value = points
 
-    week = to_week_key(now_utc())
+    now = now_utc()
+    week = to_week_key(now)
+    standing = _standing_row(db, leaderboard_id, user_id)
     score = _weekly_score(db, leaderboard_id, user_id, week)
     score.points += points_value
 
@@ -165,18 +232,19 @@ def award_points(
         user_id=user_id,
         event_type=event_type,
         points=points_value,
+        occurred_at=now,
         meta=meta,
     )
     db.add(event)
     db.add(score)
+    db.flush()
+    _fold_award(db, standing, points=points_value, occurred_at=now)
+    db.add(standing)
+    # staged in the outbox and committed with the award itself
+    record_xp_event(db, user_id=user_id, amount=points_value, reason=event_type)
     db.commit()
     db.refresh(event)
 
-    try:
-        record_xp_event(db, user_id=user_id, amount=points_value, reason=event_type)
-    except Exception:
-        pass
-
     return event
 
 
@@ -194,85 +262,215 @@ def _week_info_from_key(week: Tuple[int, int], tz: str) -> Dict[str, Any]:
     }
 
 
-def _streak_days(db: Session, leaderboard_id: int, user_id: int, tz: str) -> int:
-    tzinfo = ZoneInfo(tz)
-    now = now_utc()
-    window_start = now - timedelta(days=14)
-    events = db.exec(
-        select(PointsEvent).where(
+def _compute_standings(
+    db: Session,
+    leaderboard_id: int,
+    tz: str,
+    now: datetime,
+    *,
+    user_ids: Optional[Iterable[int]] = None,
+) -> Dict[int, LeaderboardStanding]:
+    """
+    Build standings for a whole board (or just ``user_ids``) from the raw tables
+    with three grouped queries. Rows are returned detached; callers decide
+    whether to persist them.
+    """
+    try:
+        tzinfo = ZoneInfo(tz)
+    except ZoneInfoNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid timezone") from exc
+    week_year, week_number = to_week_key(now)
+    member_filter = []
+    if user_ids is not None:
+        ids = list(user_ids)
+        member_filter = [PointsEvent.user_id.in_(ids)]
+        score_filter = [WeeklyScore.user_id.in_(ids)]
+    else:
+        ids = list(
+            db.exec(select(LeaderboardMember.user_id).where(LeaderboardMember.leaderboard_id == leaderboard_id)).all()
+        )
+        score_filter = []
+    standings = {
+        user_id: LeaderboardStanding(
+            leaderboard_id=leaderboard_id,
+            user_id=user_id,
+            week_year=week_year,
+            week_number=week_number,
+        )
+        for user_id in ids
+    }
+
+    lifetime_rows = db.exec(
+        select(PointsEvent.user_id, func.coalesce(func.sum(PointsEvent.points), 0))
+        .where(PointsEvent.leaderboard_id == leaderboard_id, *member_filter)
+        .group_by(PointsEvent.user_id)
+    ).all()
+    for user_id, total in lifetime_rows:
+        if user_id in standings:
+            standings[user_id].total_points = int(total or 0)
+
+    weekly_rows = db.exec(
+        select(WeeklyScore.user_id, WeeklyScore.points).where(
+            WeeklyScore.leaderboard_id == leaderboard_id,
+            WeeklyScore.week_year == week_year,
+            WeeklyScore.week_number == week_number,
+            *score_filter,
+        )
+    ).all()
+    for user_id, weekly in weekly_rows:
+        if user_id in standings:
+            standings[user_id].weekly_points = int(weekly or 0)
+
+    daily: Dict[int, Dict[date, int]] = defaultdict(lambda: defaultdict(int))
+    recent_rows = db.exec(
+        select(PointsEvent.user_id, PointsEvent.occurred_at, PointsEvent.points).where(
             PointsEvent.leaderboard_id == leaderboard_id,
-            PointsEvent.user_id == user_id,
-            PointsEvent.occurred_at >= window_start,
+            PointsEvent.occurred_at >= now - timedelta(days=STREAK_WINDOW_DAYS),
+            *member_filter,
         )
     ).all()
-    totals: Dict[date, int] = defaultdict(int)
-    for event in events:
-        local_date = event.occurred_at.astimezone(tzinfo).date()
-        totals[local_date] += event.points
-    streak = 0
-    cursor = now.astimezone(tzinfo).date()
-    while totals.get(cursor, 0) > 0:
-        streak += 1
-        cursor -= timedelta(days=1)
-    return streak
+    for user_id, occurred_at, points in recent_rows:
+        if occurred_at.tzinfo is None:  # SQLite hands back naive UTC values
+            occurred_at = occurred_at.replace(tzinfo=timezone.utc)
+        daily[user_id][_local_day(occurred_at, tzinfo)] += points
+    for user_id, totals in daily.items():
+        standing = standings.get(user_id)
+        if standing is None:
+            continue
+        last_day = max(totals)
+        streak_before = 0
+        cursor = last_day - timedelta(days=1)
+        while totals.get(cursor, 0) > 0:
+            streak_before += 1
+            cursor -= timedelta(days=1)
+        standing.last_active_day = last_day
+        standing.last_day_points = totals[last_day]
+        standing.streak_before = streak_before
+    return standings
+
+
+def rebuild_standings(db: Session, *, leaderboard_id: int) -> Dict[int, LeaderboardStanding]:
+    """Recompute and persist every materialized standing on a board in one pass."""
+    board = _fetch_leaderboard(db, leaderboard_id)
+    fresh = _compute_standings(db, board.id, DEFAULT_TZ, now_utc())
+    existing = {
+        row.user_id: row
+        for row in db.exec(select(LeaderboardStanding).where(LeaderboardStanding.leaderboard_id == board.id)).all()
+    }
+    for user_id, computed in fresh.items():
+        row = existing.get(user_id)
+        if row is None:
+            db.add(computed)
+            existing[user_id] = computed
+            continue
+        for field in (
+            "week_year",
+            "week_number",
+            "weekly_points",
+            "total_points",
+            "last_active_day",
+            "last_day_points",
+            "streak_before",
+        ):
+            setattr(row, field, getattr(computed, field))
+        row.updated_at = now_utc()
+        db.add(row)
+    db.commit()
+    return existing
+
+
+def backfill_standings(db: Session) -> int:
+    """
+    Rebuild the boards that have members without a materialized standing, such
+    as members who joined before standings were kept. Runs at startup; returns
+    the number of boards rebuilt.
+    """
+    board_ids = db.exec(
+        select(LeaderboardMember.leaderboard_id)
+        .outerjoin(
+            LeaderboardStanding,
+            (LeaderboardStanding.leaderboard_id == LeaderboardMember.leaderboard_id)
+            & (LeaderboardStanding.user_id == LeaderboardMember.user_id),
+        )
+        .where(LeaderboardStanding.id.is_(None))
+        .distinct()
+    ).all()
+    for board_id in board_ids:
+        rebuild_standings(db, leaderboard_id=board_id)
+    return len(board_ids)
 
 
-def _member_summary(
+def _board_standings(
     db: Session,
     board: Leaderboard,
-    member: LeaderboardMember,
+    members: Iterable[LeaderboardMember],
     tz: str,
-    week: Tuple[int, int],
-) -> MemberOut:
-    user = db.get(User, member.user_id)
-    if not user:
-        raise HTTPException(status_code=500, detail="User missing")
+    now: datetime,
+) -> Dict[int, LeaderboardStanding]:
+    """Read-only: stored rows, with any missing member computed from raw events but not persisted."""
+    if tz != DEFAULT_TZ:
+        # Streak days depend on the viewer's timezone; the table is kept in DEFAULT_TZ.
+        return _compute_standings(db, board.id, tz, now)
+    rows = {
+        row.user_id: row
+        for row in db.exec(select(LeaderboardStanding).where(LeaderboardStanding.leaderboard_id == board.id)).all()
+    }
+    missing = [member.user_id for member in members if member.user_id not in rows]
+    if missing:
+        rows.update(_compute_standings(db, board.id, DEFAULT_TZ, now, user_ids=missing))
+    return rows
 
-    year, number = week
-    weekly_points_row = db.exec(
-        select(WeeklyScore.points).where(
-            WeeklyScore.leaderboard_id == board.id,
-            WeeklyScore.user_id == member.user_id,
-            WeeklyScore.week_year == year,
-            WeeklyScore.week_number == number,
-        )
-    ).first()
-    weekly_points_value = _scalar(weekly_points_row)
-    weekly_points = int(weekly_points_value or 0)
 
-    total_points_row = db.exec(
-        select(func.coalesce(func.sum(PointsEvent.points), 0)).where(
-            PointsEvent.leaderboard_id == board.id,
-            PointsEvent.user_id == member.user_id,
-        )
-    ).first()
-    lifetime_value = _scalar(total_points_row)
-    lifetime = int(lifetime_value or 0)
+def _streak_from_standing(standing: LeaderboardStanding, today: date) -> int:
+    if standing.last_active_day != today or standing.last_day_points <= 0:
+        return 0
+    return min(standing.streak_before + 1, STREAK_WINDOW_DAYS)
 
-    handle = anon_handle(user.id, user.email)
-    display_name = user.display_name if member.display_consent and user.display_name else None
-    streak = _streak_days(db, board.id, member.user_id, tz)
 
+def _member_out(
+    user: User,
+    member: LeaderboardMember,
+    standing: Optional[LeaderboardStanding],
+    week: Tuple[int, int],
+    today: date,
+) -> MemberOut:
+    weekly_points = 0
+    total_points = 0
+    streak = 0
+    if standing is not None:
+        if (standing.week_year, standing.week_number) == week:
+            weekly_points = standing.weekly_points
+        total_points = standing.total_points
+        streak = _streak_from_standing(standing, today)
+    display_name = user.display_name if member.display_consent and user.display_name else None
     return MemberOut(
         user_id=user.id,
         display_name=display_name,
-        anon_handle=handle,
+        anon_handle=anon_handle(user.id, user.email),
         display_consent=member.display_consent,
         weekly_points=weekly_points,
-        total_points=lifetime,
+        total_points=total_points,
         streak_days=streak,
     )
 
 
 def get_standings(db: Session, *, leaderboard_id: int, tz: str = DEFAULT_TZ) -> LeaderboardStandings:
     board = _fetch_leaderboard(db, leaderboard_id)
-    members = db.exec(
-        select(LeaderboardMember).where(LeaderboardMember.leaderboard_id == board.id)
+    rows = db.exec(
+        select(LeaderboardMember, User)
+        .join(User, User.id == LeaderboardMember.user_id)
+        .where(LeaderboardMember.leaderboard_id == board.id)
     ).all()
 
-    week_key = to_week_key(now_utc())
+    now = now_utc()
+    week_key = to_week_key(now)
     week_info = _week_info_from_key(week_key, tz)
-    summary_pairs = [(_member_summary(db, board, member, tz, week_key), member.joined_at) for member in members]
+    standings = _board_standings(db, board, [member for member, _ in rows], tz, now)
+    today = _local_day(now, ZoneInfo(tz))
+    summary_pairs = [
+        (_member_out(user, member, standings.get(member.user_id), week_key, today), member.joined_at)
+        for member, user in rows
+    ]
     summary_pairs.sort(
         key=lambda item: (-item[0].weekly_points, -item[0].total_points, item[1])
     )
@@ -296,8 +494,16 @@ def set_member_consent(
     db.add(member)
     db.commit()
     db.refresh(member)
-    week_key = to_week_key(now_utc())
-    return _member_summary(db, board, member, tz, week_key)
+    user = db.get(User, member.user_id)
+    if not user:
+        raise HTTPException(status_code=500, detail="User missing")
+    now = now_utc()
+    if tz == DEFAULT_TZ:
+        standing = _standing_row(db, board.id, user_id)
+        db.commit()
+    else:
+        standing = _compute_standings(db, board.id, tz, now, user_ids=[user_id])[user_id]
+    return _member_out(user, member, standing, to_week_key(now), _local_day(now, ZoneInfo(tz)))
 
 
 def force_new_week(db: Session, *, leaderboard_id: int, tz: str = DEFAULT_TZ) -> Dict[str, Any]:
@@ -142,9 +142,9 @@ def fetch_next_resurfaced_instances(
     session: Session, *, user_id: int, count: int = 3
 ) -> List[Dict[str, Any]]:
     try:
-        from services.dfe_tasks import instantiate_for_user  # type: ignore
+        from services.dfe_tasks import instantiate_many  # type: ignore
     except Exception as exc:  # pragma: no cover - optional dependency
-        raise RuntimeError("instantiate_for_user unavailable; integrate with tasks module.") from exc
+        raise RuntimeError("instantiate_many unavailable; integrate with tasks module.") from exc
 
     now = _now_utc()
     plans_stmt = (
@@ -159,18 +159,24 @@ def fetch_next_resurfaced_instances(
     )
     plans = session.exec(plans_stmt).all()
 
+    servable = [plan for plan in plans if plan.template_code]
+    try:
+        results = instantiate_many(
+            session, [plan.template_code for plan in servable], user_id, force_new=True, commit=False
+        )
+    except Exception:
+        results = [None] * len(servable)
+    result_by_plan = {plan.id: result for plan, result in zip(servable, results)}
+
     payload: List[Dict[str, Any]] = []
     for plan in plans:
-        template_code = plan.template_code
-        if not template_code:
+        result = result_by_plan.get(plan.id)
+        if result is None:
             plan.status = "skipped"
             continue
-        try:
-            instance, _template = instantiate_for_user(session, template_code, user_id, force_new=True)
-            payload.append({"type": "resurface", "template_code": template_code, "instance_id": instance.id})
-            plan.status = "served"
-        except Exception:
-            plan.status = "skipped"
+        instance, _template = result
+        payload.append({"type": "resurface", "template_code": plan.template_code, "instance_id": instance.id})
+        plan.status = "served"
 
     session.commit()
     return payload
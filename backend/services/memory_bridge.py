@@ -1,23 +1,30 @@
 from __future__ import annotations
 
 import json
+import logging
 from contextlib import contextmanager
-from datetime import datetime
-from typing import Any, Optional
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
 from uuid import UUID, uuid4
 
+from sqlalchemy import delete, func
+from sqlalchemy.orm import aliased
 from sqlmodel import Session, select
 
 from models import Task as LegacyTask
 from models import User as LegacyUser
+from models_memory import MemoryOutbox
 from settings import memory_settings
 
+logger = logging.getLogger("teski.memory_bridge")
+
 # The v2 memory stack lives in the sibling "app" package. Import lazily so that
 # the legacy backend can start even when that package isn't present (e.g. in the
 # lightweight Fly image). Dual-write remains disabled if imports fail.
 try:  # pragma: no cover - optional dependency
     from app.db import get_session as get_app_session
     from app.models import (
+        LegacyOutboxReceipt,
         LegacyTaskMap,
         LegacyUserMap,
         MemoryItem,
@@ -32,7 +39,7 @@ except (ModuleNotFoundError, ImportError):  # pragma: no cover
     # If the newer \"app\" package isn't present (e.g., slim Fly image) or is
     # partially installed, fall back to legacy-only behavior.
     get_app_session = None
-    LegacyTaskMap = LegacyUserMap = MemoryItem = Mistake = NewTask = NewUser = None
+    LegacyOutboxReceipt = LegacyTaskMap = LegacyUserMap = MemoryItem = Mistake = NewTask = NewUser = None
     scheduler_review = schedule_from_mistake = award_xp = check_nemesis = None
 
 
@@ -63,6 +70,21 @@ def _coerce_datetime(value: Optional[datetime]) -> datetime:
     return value
 
 
+def _enqueue(legacy_session, *, kind: str, user_id: int, payload: Dict[str, Any]) -> MemoryOutbox:
+    """
+    Stage a dual write in the legacy session. It commits together with the
+    caller's own change; ``relay_memory_outbox`` applies it to the app DB later.
+    """
+    entry = MemoryOutbox(
+        idempotency_key=uuid4().hex,
+        kind=kind,
+        user_id=user_id,
+        payload=payload,
+    )
+    legacy_session.add(entry)
+    return entry
+
+
 def record_mistake_dual_write(
     legacy_session,
     *,
@@ -71,15 +93,13 @@ def record_mistake_dual_write(
     subtype: str,
     detail: Any,
     task_id: Optional[str] = None,
-) -> None:
+) -> Optional[MemoryOutbox]:
     if not _should_dual_write():
-        return
+        return None
 
     legacy_user = legacy_session.get(LegacyUser, user_id)
     if not legacy_user:
-        return
-
-    legacy_task = legacy_session.get(LegacyTask, task_id) if task_id else None
+        return None
 
     payload = detail
     if not isinstance(payload, str):
@@ -88,24 +108,35 @@ def record_mistake_dual_write(
         except TypeError:
             payload = str(payload)
 
-    with _session_scope() as session:
-        try:
-            new_user = _ensure_user(session, legacy_user)
-            new_task = None
-            if legacy_task:
-                new_task = _ensure_task(session, new_user, legacy_task)
-            _upsert_memory_and_mistake(
-                session,
-                user=new_user,
-                concept=(concept or "unknown"),
-                subtype=subtype,
-                raw=payload,
-                task=new_task,
-            )
-            session.commit()
-        except Exception:
-            session.rollback()
-            raise
+    return _enqueue(
+        legacy_session,
+        kind="mistake",
+        user_id=user_id,
+        payload={"concept": concept, "subtype": subtype, "raw": payload, "task_id": task_id},
+    )
+
+
+def _apply_mistake(session: Session, legacy_session, entry: MemoryOutbox) -> None:
+    data = entry.payload or {}
+    legacy_user = legacy_session.get(LegacyUser, entry.user_id)
+    if not legacy_user:
+        return
+    task_id = data.get("task_id")
+    legacy_task = legacy_session.get(LegacyTask, task_id) if task_id else None
+
+    new_user = _ensure_user(session, legacy_user)
+    new_task = None
+    if legacy_task:
+        new_task = _ensure_task(session, new_user, legacy_task)
+    _upsert_memory_and_mistake(
+        session,
+        user=new_user,
+        concept=(data.get("concept") or "unknown"),
+        subtype=data.get("subtype") or "other",
+        raw=data.get("raw") or "",
+        task=new_task,
+        created_at=entry.created_at,
+    )
 
 
 def _ensure_user(session: Session, legacy_user: LegacyUser) -> NewUser:
@@ -167,6 +198,7 @@ def _upsert_memory_and_mistake(
     subtype: str,
     raw: str,
     task: Optional[NewTask],
+    created_at: Optional[datetime] = None,
 ) -> None:
     subtype_enum = subtype or "other"
 
@@ -200,6 +232,7 @@ def _upsert_memory_and_mistake(
             concept=concept,
             subtype=subtype_enum,
             raw=raw,
+            created_at=_coerce_datetime(created_at),
         )
     )
 
@@ -211,46 +244,55 @@ def record_review_dual_write(
     concept: Optional[str],
     grade: int,
     task_id: Optional[str] = None,
-) -> None:
+) -> Optional[MemoryOutbox]:
     if not _should_dual_write():
-        return
+        return None
 
     legacy_user = legacy_session.get(LegacyUser, user_id)
     if not legacy_user:
-        return
+        return None
+
+    return _enqueue(
+        legacy_session,
+        kind="review",
+        user_id=user_id,
+        payload={"concept": concept, "grade": grade, "task_id": task_id},
+    )
+
 
+def _apply_review(session: Session, legacy_session, entry: MemoryOutbox) -> None:
+    data = entry.payload or {}
+    legacy_user = legacy_session.get(LegacyUser, entry.user_id)
+    if not legacy_user:
+        return
+    task_id = data.get("task_id")
     legacy_task = legacy_session.get(LegacyTask, task_id) if task_id else None
+    grade = int(data.get("grade") or 0)
 
-    with _session_scope() as session:
-        try:
-            new_user = _ensure_user(session, legacy_user)
-            new_task = None
-            if legacy_task:
-                new_task = _ensure_task(session, new_user, legacy_task)
-
-            concept_value = concept or (legacy_task.title if legacy_task else "unknown")
-
-            memory = session.exec(
-                select(MemoryItem).where(
-                    MemoryItem.user_id == new_user.id,
-                    MemoryItem.concept == concept_value,
-                )
-            ).first()
-            if memory is None:
-                memory = schedule_from_mistake(
-                    session,
-                    user=new_user,
-                    concept=concept_value,
-                    task_id=getattr(new_task, "id", None),
-                )
-            scheduler_review(session, new_user, memory, grade)
-            award_xp(new_user, reason="review", memory=memory, session=session)
-            if grade >= 4:
-                check_nemesis(new_user, concept_value, session=session)
-            session.commit()
-        except Exception:
-            session.rollback()
-            raise
+    new_user = _ensure_user(session, legacy_user)
+    new_task = None
+    if legacy_task:
+        new_task = _ensure_task(session, new_user, legacy_task)
+
+    concept_value = data.get("concept") or (legacy_task.title if legacy_task else "unknown")
+
+    memory = session.exec(
+        select(MemoryItem).where(
+            MemoryItem.user_id == new_user.id,
+            MemoryItem.concept == concept_value,
+        )
+    ).first()
+    if memory is None:
+        memory = schedule_from_mistake(
+            session,
+            user=new_user,
+            concept=concept_value,
+            task_id=getattr(new_task, "id", None),
+        )
+    scheduler_review(session, new_user, memory, grade)
+    award_xp(new_user, reason="review", memory=memory, session=session)
+    if grade >= 4:
+        check_nemesis(new_user, concept_value, session=session)
 
 
 def record_xp_event(
@@ -259,19 +301,158 @@ def record_xp_event(
     user_id: int,
     amount: int,
     reason: str,
-) -> None:
+) -> Optional[MemoryOutbox]:
     if not _should_dual_write():
-        return
+        return None
 
     legacy_user = legacy_session.get(LegacyUser, user_id)
+    if not legacy_user:
+        return None
+
+    return _enqueue(
+        legacy_session,
+        kind="xp",
+        user_id=user_id,
+        payload={"amount": amount, "reason": reason},
+    )
+
+
+def _apply_xp(session: Session, legacy_session, entry: MemoryOutbox) -> None:
+    data = entry.payload or {}
+    legacy_user = legacy_session.get(LegacyUser, entry.user_id)
     if not legacy_user:
         return
+    new_user = _ensure_user(session, legacy_user)
+    award_xp(
+        new_user,
+        reason=data.get("reason") or "xp",
+        base=int(data.get("amount") or 0),
+        mastery_bonus=0,
+        session=session,
+    )
+
+
+_APPLIERS: Dict[str, Callable[[Session, Any, MemoryOutbox], None]] = {
+    "mistake": _apply_mistake,
+    "review": _apply_review,
+    "xp": _apply_xp,
+}
 
+
+def _apply_entry(legacy_session, entry: MemoryOutbox) -> None:
+    applier = _APPLIERS.get(entry.kind)
+    if applier is None:
+        raise ValueError(f"unknown outbox kind: {entry.kind}")
     with _session_scope() as session:
         try:
-            new_user = _ensure_user(session, legacy_user)
-            award_xp(new_user, reason=reason, base=amount, mastery_bonus=0, session=session)
+            # the receipt commits with the applied change, so a row whose
+            # "done" mark was lost (crash between the two commits) is skipped
+            if session.get(LegacyOutboxReceipt, entry.idempotency_key) is not None:
+                return
+            applier(session, legacy_session, entry)
+            session.add(LegacyOutboxReceipt(idempotency_key=entry.idempotency_key, kind=entry.kind))
             session.commit()
         except Exception:
             session.rollback()
             raise
+
+
+def relay_memory_outbox(
+    legacy_session,
+    *,
+    batch_size: Optional[int] = None,
+    max_attempts: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """
+    Apply up to ``batch_size`` pending outbox rows to the app database.
+
+    Rows are replayed oldest first. A failing row is retried with exponential
+    backoff and marked ``dead`` after ``max_attempts``. A user's later rows wait
+    while an earlier one is pending, in this batch or in backoff, so a user's
+    writes are never reordered.
+    """
+    result = {"applied": 0, "retried": 0, "dead": 0}
+    if get_app_session is None:
+        return result
+    batch_size = batch_size or memory_settings.OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or memory_settings.OUTBOX_MAX_ATTEMPTS
+    now = now or datetime.utcnow()
+
+    backing_off = aliased(MemoryOutbox)
+    earlier_in_backoff = (
+        select(backing_off.id)
+        .where(
+            backing_off.user_id == MemoryOutbox.user_id,
+            backing_off.status == "pending",
+            backing_off.next_attempt_at > now,
+            backing_off.id < MemoryOutbox.id,
+        )
+        .exists()
+    )
+    entries = legacy_session.exec(
+        select(MemoryOutbox)
+        .where(
+            MemoryOutbox.status == "pending",
+            MemoryOutbox.next_attempt_at <= now,
+            ~earlier_in_backoff,
+        )
+        .order_by(MemoryOutbox.id)
+        .limit(batch_size)
+    ).all()
+
+    blocked: set[int] = set()
+    for entry in entries:
+        if entry.user_id in blocked:
+            continue
+        try:
+            _apply_entry(legacy_session, entry)
+        except Exception as exc:
+            blocked.add(entry.user_id)
+            entry.attempts += 1
+            entry.last_error = f"{type(exc).__name__}: {exc}"[:500]
+            if entry.attempts >= max_attempts:
+                entry.status = "dead"
+                result["dead"] += 1
+                logger.error("memory outbox entry %s is dead: %s", entry.idempotency_key, entry.last_error)
+            else:
+                delay = memory_settings.OUTBOX_RETRY_BASE_S * (2 ** (entry.attempts - 1))
+                entry.next_attempt_at = now + timedelta(seconds=delay)
+                result["retried"] += 1
+        else:
+            entry.status = "done"
+            entry.processed_at = now
+            result["applied"] += 1
+        legacy_session.add(entry)
+    if entries:
+        legacy_session.commit()
+    return result
+
+
+def prune_memory_outbox(legacy_session, *, older_than: timedelta, now: Optional[datetime] = None) -> int:
+    """Delete relayed rows processed before ``now - older_than``."""
+    cutoff = (now or datetime.utcnow()) - older_than
+    result = legacy_session.exec(
+        delete(MemoryOutbox).where(
+            MemoryOutbox.status == "done",
+            MemoryOutbox.processed_at < cutoff,
+        )
+    )
+    legacy_session.commit()
+    return int(result.rowcount or 0)
+
+
+def outbox_stats(legacy_session, *, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Row counts per status plus the age of the oldest pending row (relay lag)."""
+    now = now or datetime.utcnow()
+    counts = {"pending": 0, "done": 0, "dead": 0}
+    rows = legacy_session.exec(
+        select(MemoryOutbox.status, func.count()).group_by(MemoryOutbox.status)
+    ).all()
+    for status, count in rows:
+        counts[status] = int(count)
+    oldest = legacy_session.exec(
+        select(func.min(MemoryOutbox.created_at)).where(MemoryOutbox.status == "pending")
+    ).one()
+    lag = max(0.0, (now - oldest).total_seconds()) if oldest else 0.0
+    return {**counts, "oldest_pending_at": oldest, "lag_seconds": lag}
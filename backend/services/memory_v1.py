@@ -1,6 +1,8 @@
 # >>> MEMORY V1 START
 from __future__ import annotations
 
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -21,15 +23,50 @@ def _is_disabled() -> bool:
     return memory_v1_settings.DISABLE_MEMORY_V1
 
 
+PENDING_STATUSES = ("scheduled", "due")
+# user_id -> (pending card count, cached at); adjusted in place by the writers
+# below and recounted after PENDING_COUNT_TTL_S so other processes' writes heal.
+_pending_counts: Dict[int, Tuple[int, float]] = {}
+_pending_lock = threading.Lock()
+
+
 def _count_pending_cards(session: Session, user_id: int) -> int:
+    with _pending_lock:
+        cached = _pending_counts.get(user_id)
+    if cached is not None and time.time() - cached[1] < memory_v1_settings.PENDING_COUNT_TTL_S:
+        return cached[0]
     stmt = select(func.count()).where(
         ReviewCard.user_id == user_id,
-        ReviewCard.status.in_(("scheduled", "due")),
+        ReviewCard.status.in_(PENDING_STATUSES),
     )
     value = session.exec(stmt).one()
     if isinstance(value, tuple):
         value = value[0]
-    return int(value or 0)
+    count = int(value or 0)
+    with _pending_lock:
+        _pending_counts[user_id] = (count, time.time())
+    return count
+
+
+def _adjust_pending(user_id: int, delta: int) -> None:
+    if not delta:
+        return
+    with _pending_lock:
+        cached = _pending_counts.get(user_id)
+        if cached is not None:
+            _pending_counts[user_id] = (max(0, cached[0] + delta), cached[1])
+
+
+def _pending_delta(before: Optional[str], after: Optional[str]) -> int:
+    return int(after in PENDING_STATUSES) - int(before in PENDING_STATUSES)
+
+
+def invalidate_pending_count(user_id: Optional[int] = None) -> None:
+    with _pending_lock:
+        if user_id is None:
+            _pending_counts.clear()
+        else:
+            _pending_counts.pop(user_id, None)
 # <<< MEMCAP END
 
 
@@ -90,12 +127,14 @@ def log_mistake_v1(
     )
     session.add(mistake)
 
+    pending_delta = 0
     if template_code:
         rc_stmt = select(ReviewCard).where(
             ReviewCard.user_id == user_id, ReviewCard.template_code == template_code
         )
         card = session.exec(rc_stmt).first()
         if card is None:
+            pending_delta = 1
             card = ReviewCard(
                 user_id=user_id,
                 skill_id=skill_id,
@@ -108,6 +147,7 @@ def log_mistake_v1(
             )
             session.add(card)
         else:
+            pending_delta = _pending_delta(card.status, "scheduled")
             card.next_review_at = min(card.next_review_at, _now() + timedelta(minutes=20))
             card.status = "scheduled"
             card.updated_at = _now()
@@ -132,6 +172,7 @@ def log_mistake_v1(
         stat.stability = max(0.2, stat.stability * 0.9)
 
     session.commit()
+    _adjust_pending(user_id, pending_delta)
     session.refresh(mistake)
     return mistake
 
@@ -150,6 +191,7 @@ def mark_review_result(
     card.easiness, next_interval = sm2_update(card.easiness, card.last_interval_days, correct)
     card.last_interval_days = next_interval
     card.next_review_at = _now() + timedelta(days=next_interval)
+    pending_delta = _pending_delta(card.status, "completed" if correct else "scheduled")
     card.status = "completed" if correct else "scheduled"
     previous_result = card.last_result
     card.last_result = bool(correct)
@@ -178,6 +220,7 @@ def mark_review_result(
     # <<< BADGE END
 
     session.commit()
+    _adjust_pending(user_id, pending_delta)
     session.refresh(card)
     return card
 
@@ -192,46 +235,56 @@ def build_reviews(
         return 0
     # <<< MEMCAP END
     now = _now()
-    due_cards = session.exec(
-        select(ReviewCard).where(
-            ReviewCard.user_id == user_id,
-            ReviewCard.next_review_at <= now,
-        )
-    ).all()
-    if due_cards:
+    if next_due_cards(session, user_id=user_id, limit=1, now=now):
         return 0
 
-    candidates = session.exec(select(ReviewCard).where(ReviewCard.user_id == user_id)).all()
+    # Only the max_new soonest cards are read, via the (user_id, next_review_at) index.
+    candidates = next_due_cards(session, user_id=user_id, limit=max_new)
     if not candidates:
         return 0
 
-    candidates.sort(key=lambda card: card.next_review_at)
     horizon = now + timedelta(minutes=horizon_minutes)
     updated = 0
-    for card in candidates[:max_new]:
+    pending_delta = 0
+    for card in candidates:
+        pending_delta += _pending_delta(card.status, "scheduled")
         card.next_review_at = min(card.next_review_at, horizon)
         card.status = "scheduled"
         card.updated_at = now
         updated += 1
 
     session.commit()
+    _adjust_pending(user_id, pending_delta)
     return updated
 
 
-def _instantiate_for_user(
-    session: Session, template_code: str, user_id: int, force_new: bool = True
-):
+def next_due_cards(
+    session: Session,
+    *,
+    user_id: int,
+    limit: int,
+    now: Optional[datetime] = None,
+) -> List[ReviewCard]:
+    """Return up to ``limit`` cards in due order; with ``now``, only cards already due."""
+    if limit <= 0:
+        return []
+    stmt = select(ReviewCard).where(ReviewCard.user_id == user_id)
+    if now is not None:
+        stmt = stmt.where(ReviewCard.next_review_at <= now)
+    stmt = stmt.order_by(ReviewCard.next_review_at.asc(), ReviewCard.id.asc()).limit(limit)
+    return list(session.exec(stmt).all())
+
+
+def _instantiate_many_for_user(
+    session: Session, template_codes: List[str], user_id: int
+) -> List[Optional[Any]]:
     try:
-        from services.dfe_tasks import instantiate_for_user  # type: ignore
+        from services.dfe_tasks import instantiate_many  # type: ignore
     except Exception as exc:  # pragma: no cover
-        raise RuntimeError("instantiate_for_user unavailable; integrate with tasks module.") from exc
+        raise RuntimeError("instantiate_many unavailable; integrate with tasks module.") from exc
 
-    result = instantiate_for_user(session, template_code, user_id, force_new=force_new)
-    if isinstance(result, tuple):
-        instance = result[0]
-    else:
-        instance = result
-    return instance
+    results = instantiate_many(session, template_codes, user_id, force_new=True, commit=False)
+    return [result[0] if result else None for result in results]
 
 
 def fetch_due_reviews(
@@ -258,37 +311,38 @@ def fetch_due_reviews(
         return []
     # <<< MEMCAP END
     now = _now()
-    stmt = (
-        select(ReviewCard)
-        .where(
-            ReviewCard.user_id == user_id,
-            ReviewCard.next_review_at <= now,
+    cards = next_due_cards(session, user_id=user_id, limit=take, now=now)
+
+    servable = [card for card in cards if card.template_code]
+    try:
+        instances = _instantiate_many_for_user(
+            session, [card.template_code for card in servable], user_id
         )
-        .order_by(ReviewCard.next_review_at.asc())
-    )
-    cards = session.exec(stmt).all()
+    except Exception:
+        instances = [None] * len(servable)
+    instance_by_card = {card.id: instance for card, instance in zip(servable, instances)}
 
     items: List[Dict[str, Any]] = []
-    for card in cards[:take]:
-        if not card.template_code:
+    pending_delta = 0
+    for card in cards:
+        instance = instance_by_card.get(card.id)
+        if instance is None:
+            pending_delta += _pending_delta(card.status, "skipped")
             card.status = "skipped"
             card.updated_at = now
             continue
-        try:
-            instance = _instantiate_for_user(session, card.template_code, user_id, force_new=True)
-            items.append(
-                {
-                    "type": "review",
-                    "review_card_id": card.id,
-                    "template_code": card.template_code,
-                    "instance_id": getattr(instance, "id", None),
-                }
-            )
-            card.status = "served"
-            card.updated_at = now
-        except Exception:
-            card.status = "skipped"
-            card.updated_at = now
+        items.append(
+            {
+                "type": "review",
+                "review_card_id": card.id,
+                "template_code": card.template_code,
+                "instance_id": getattr(instance, "id", None),
+            }
+        )
+        pending_delta += _pending_delta(card.status, "served")
+        card.status = "served"
+        card.updated_at = now
     session.commit()
+    _adjust_pending(user_id, pending_delta)
     return items
 # <<< MEMORY V1 END
@@ -1,6 +1,10 @@
 from __future__ import annotations
+import logging
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, insert, or_
 from sqlmodel import Session, select
 from models import Task, Reminder
 from services.scoring import score, script_hint  # you already have these
@@ -14,6 +18,13 @@ COOLDOWNS = {
     "intervention": timedelta(hours=2),
 }
 
+# Tasks further out than this are skipped while still in the "calm" tier
+REMINDER_HORIZON = timedelta(days=7)
+# Rows per IN (...) lookup of last reminders
+SWEEP_CHUNK_SIZE = 500
+
+logger = logging.getLogger("teski.reminders")
+
 def last_reminder_for_task(session: Session, task_id: str) -> Optional[Reminder]:
     return session.exec(
         select(Reminder)
@@ -44,48 +55,160 @@ def build_message(title: str, escalation: str, hours_to_due: float) -> str:
         return f"{hrs}h to go on ‘{title}’. Quick win time—kick it off."
     return f"Upcoming: ‘{title}’ in ~{hrs}h. Plan one small step today."
 
-def maybe_create_reminder_for_task(session, task, persona):
-    now = datetime.now(DEFAULT_TIMEZONE)
-    # Ensure task.due_iso is offset-aware
-    if task.due_iso.tzinfo is None:
-        task.due_iso = task.due_iso.replace(tzinfo=DEFAULT_TIMEZONE)
-    else:
-        task.due_iso = task.due_iso.astimezone(DEFAULT_TIMEZONE)
-    prio, esc = score(now, task.due_iso, task.status)
+def _local(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=DEFAULT_TIMEZONE)
+    return dt.astimezone(DEFAULT_TIMEZONE)
+
+
+def _wall(dt: datetime) -> datetime:
+    """Naive local wall time, the form datetimes are stored in on SQLite."""
+    return _local(dt).replace(tzinfo=None)
+
+
+def next_check_at(now: datetime, due: datetime, last_at: Optional[datetime]) -> datetime:
+    """
+    Earliest time a reminder can be due for a task, given its deadline and the
+    time of its latest reminder. Escalation only rises as the deadline nears and
+    cooldowns only shrink, so the first tier whose cooldown fits inside it wins.
+    """
+    now, due = _local(now), _local(due)
+    tiers = (
+        (due - REMINDER_HORIZON, due - timedelta(hours=72), "calm"),
+        (due - timedelta(hours=72), due - timedelta(hours=24), "snark"),
+        (due - timedelta(hours=24), due, "disappointed"),
+        (due, None, "intervention"),
+    )
+    for start, end, escalation in tiers:
+        candidate = max(now, start)
+        if last_at is not None:
+            candidate = max(candidate, _local(last_at) + COOLDOWNS[escalation])
+        if end is None or candidate < end:
+            return candidate
+    return now  # pragma: no cover - the last tier is open-ended
+
+
+def _evaluate(task: Task, now: datetime, last_at: Optional[datetime]) -> Optional[Tuple[str, float]]:
+    """Escalation and hours-to-due when ``task`` should be reminded at ``now``."""
+    due = _local(task.due_iso)
+    prio, esc = score(now, due, task.status)
 
     # Skip very-distant tasks (priority 1 + > 7 days)
-    if prio == 1 and (task.due_iso - now) > timedelta(days=7):
+    if prio == 1 and (due - now) > REMINDER_HORIZON:
         return None
-
-    last = last_reminder_for_task(session, task.id)
-    if not due_for_reminder(now, last, esc):
+    if last_at is not None and (now - _local(last_at)) < COOLDOWNS.get(esc, timedelta(hours=6)):
         return None
+    return esc, (due - now).total_seconds() / 3600.0
+
 
-    h2d = (task.due_iso - now).total_seconds() / 3600.0
+def _reminder_row(task: Task, persona: str, now: datetime, esc: str, h2d: float) -> Dict[str, object]:
     hints = script_hint(task.title, esc, h2d)
     msg = build_message(task.title, esc, h2d)
+    return {
+        "task_id": task.id,
+        "escalation": esc,
+        "persona": persona,
+        "created_at": now,
+        "script_hints": msg if hints is None else f"{msg} || {hints}",
+    }
 
-    rem = Reminder(
-        task_id=task.id,
-        escalation=esc,
-        persona=persona,
-        created_at=now,
-        script_hints=msg if hints is None else f"{msg} || {hints}"
-    )
+
+def maybe_create_reminder_for_task(session, task, persona):
+    now = datetime.now(DEFAULT_TIMEZONE)
+    last = last_reminder_for_task(session, task.id)
+    last_at = last.created_at if last else None
+    decision = _evaluate(task, now, last_at)
+    if decision is None:
+        task.next_reminder_at = _wall(next_check_at(now, task.due_iso, last_at))
+        session.add(task)
+        session.commit()
+        return None
+
+    rem = Reminder(**_reminder_row(task, persona, now, *decision))
+    task.next_reminder_at = _wall(next_check_at(now, task.due_iso, now))
     session.add(rem)
+    session.add(task)
     session.commit()
     session.refresh(rem)
     return rem
 
+
+@dataclass
+class SweepStats:
+    checked: int = 0
+    created: int = 0
+    rescheduled: int = 0
+    duration_ms: float = 0.0
+
+
+def _last_reminder_times(session: Session, task_ids: List[str]) -> Dict[str, datetime]:
+    latest: Dict[str, datetime] = {}
+    for offset in range(0, len(task_ids), SWEEP_CHUNK_SIZE):
+        chunk = task_ids[offset : offset + SWEEP_CHUNK_SIZE]
+        rows = session.exec(
+            select(Reminder.task_id, func.max(Reminder.created_at))
+            .where(Reminder.task_id.in_(chunk))
+            .group_by(Reminder.task_id)
+        ).all()
+        latest.update({task_id: created_at for task_id, created_at in rows})
+    return latest
+
+
+def _due_tasks(session: Session, now: datetime) -> Iterable[Task]:
+    return session.exec(
+        select(Task).where(
+            Task.status != "done",
+            or_(Task.next_reminder_at.is_(None), Task.next_reminder_at <= _wall(now)),
+        )
+    ).all()
+
+
+def sweep_reminders(session: Session, persona: str = "teacher", now: Optional[datetime] = None) -> SweepStats:
+    """
+    Create reminders for tasks whose ``next_reminder_at`` has passed.
+
+    Only those tasks are loaded (via the ``next_reminder_at`` index); new reminders
+    go in with one multi-row INSERT and every checked task gets its next check
+    time, all in a single commit.
+    """
+    started = time.perf_counter()
+    now = _local(now or datetime.now(DEFAULT_TIMEZONE))
+    stats = SweepStats()
+
+    tasks = list(_due_tasks(session, now))
+    last_times = _last_reminder_times(session, [t.id for t in tasks])
+    rows: List[Dict[str, object]] = []
+    for task in tasks:
+        stats.checked += 1
+        last_at = last_times.get(task.id)
+        decision = _evaluate(task, now, last_at)
+        if decision is not None:
+            rows.append(_reminder_row(task, persona, now, *decision))
+            last_at = now
+        task.next_reminder_at = _wall(next_check_at(now, task.due_iso, last_at))
+        session.add(task)
+    if rows:
+        session.exec(insert(Reminder), params=rows)
+    if tasks:
+        session.commit()
+
+    stats.created = len(rows)
+    stats.rescheduled = len(tasks)
+    stats.duration_ms = round((time.perf_counter() - started) * 1000.0, 2)
+    logger.info(
+        "reminder sweep: checked=%s created=%s rescheduled=%s duration_ms=%s",
+        stats.checked,
+        stats.created,
+        stats.rescheduled,
+        stats.duration_ms,
+    )
+    return stats
+
+
 def run_sweep(session: Session, persona: str = "teacher") -> tuple[int, int]:
     """
-    Iterate all non-done tasks and create reminders where due.
+    Create reminders for every open task whose next check time has passed.
     Returns: (checked_count, created_count)
     """
-    tasks = session.exec(select(Task).where(Task.status != "done")).all()
-    checked, created = 0, 0
-    for t in tasks:
-        checked += 1
-        if maybe_create_reminder_for_task(session, t, persona):
-            created += 1
-    return checked, created
+    stats = sweep_reminders(session, persona=persona)
+    return stats.checked, stats.created
@@ -1,5 +1,7 @@
 # Minimal curated topic map for MVP – expand as needed.
 # Keys = canonical topic id, values = curated, trusted links.
+from services.keyword_automaton import KeywordAutomaton
+
 TOPIC_MAP = {
     "linear_algebra.eigenvalues": {
         "keywords": ["eigenvalue","eigenvalues","eigenvectors","diagonalization","la hw","linear algebra"],
@@ -1321,10 +1323,18 @@ TOPIC_MAP = {
     }
 }
 
+# Raw keywords -> first topic (in TOPIC_MAP order) that lists them, so
+# resolve_topic can answer with one scan of the text.
+_RESOLVE_AUTOMATON = KeywordAutomaton(kw for meta in TOPIC_MAP.values() for kw in meta["keywords"])
+_RESOLVE_RANK: dict[int, int] = {}
+for _rank, _meta in enumerate(TOPIC_MAP.values()):
+    for _kw in _meta["keywords"]:
+        _RESOLVE_RANK.setdefault(_RESOLVE_AUTOMATON.pattern_id(_kw), _rank)
+_RESOLVE_TOPICS = list(TOPIC_MAP)
+
 def resolve_topic(title: str, notes: str | None = None) -> str | None:
     text = f"{title} {notes or ''}".lower()
-    for topic, meta in TOPIC_MAP.items():
-        for kw in meta["keywords"]:
-            if kw in text:
-                return topic
-    return None
\ No newline at end of file
+    ranks = [_RESOLVE_RANK[pid] for _, pid in _RESOLVE_AUTOMATON.iter_matches(text)]
+    if not ranks:
+        return None
+    return _RESOLVE_TOPICS[min(ranks)]
@@ -3,6 +3,7 @@ from __future__ import annotations
 import re
 from collections import defaultdict
 from typing import List, Dict, Tuple
+from services.keyword_automaton import KeywordAutomaton
 from services.topic_map import TOPIC_MAP  # your big dict
 
 _WORD = re.compile(r"[A-Za-zÀ-ÖØ-öø-ÿ0-9']+")
@@ -10,19 +11,62 @@ _WORD = re.compile(r"[A-Za-zÀ-ÖØ-öø-ÿ0-9']+")
 def _norm(s: str) -> str:
     return " ".join(_WORD.findall((s or "").lower()))
 
-def _keyword_hits(text: str, keywords: List[str]) -> int:
-    """Counts hits. Single tokens use word-boundary; phrases use substring on normalized text."""
-    score = 0
-    for kw in keywords:
-        kw_norm = _norm(kw)
-        if " " in kw_norm:  # phrase
-            if kw_norm in text:
-                score += 2  # phrases are stronger signals
-        else:
-            # whole-word match
-            if re.search(rf"\b{re.escape(kw_norm)}\b", text):
-                score += 1
-    return score
+def _is_word(ch: str) -> bool:
+    # Same notion of a word character as ``\b`` in a str regex.
+    return ch.isalnum() or ch == "_"
+
+class _TopicIndex:
+    """
+    All TOPIC_MAP keywords compiled into one automaton over normalized text.
+    Phrases (normalized keywords containing a space) score 2 on a substring hit,
+    single words score 1 on a whole-word hit; each listed keyword counts once.
+    """
+
+    def __init__(self, topic_map: Dict[str, Dict]):
+        entries: List[Tuple[str, str]] = []
+        self.word_fallback: List[Tuple[str, int]] = []
+        self.keyword_topics: List[str] = []
+        for topic_id, spec in topic_map.items():
+            kws = spec.get("keywords", [])
+            if kws:
+                self.keyword_topics.append(topic_id)
+            for kw in kws:
+                kw_norm = _norm(kw)
+                if kw_norm:
+                    entries.append((topic_id, kw_norm))
+                else:
+                    # an empty pattern behaves like re.search(r"\b\b", text)
+                    self.word_fallback.append((topic_id, 1))
+        self.automaton = KeywordAutomaton(kw_norm for _, kw_norm in entries)
+        self.weights: Dict[int, List[Tuple[str, int]]] = defaultdict(list)
+        for topic_id, kw_norm in entries:
+            pid = self.automaton.pattern_id(kw_norm)
+            self.weights[pid].append((topic_id, 2 if " " in kw_norm else 1))
+
+    def _is_hit(self, text: str, end: int, pattern: str) -> bool:
+        if " " in pattern:
+            return True
+        start = end - len(pattern) + 1
+        before = start > 0 and _is_word(text[start - 1])
+        after = end + 1 < len(text) and _is_word(text[end + 1])
+        return before != _is_word(pattern[0]) and after != _is_word(pattern[-1])
+
+    def scores(self, text: str) -> Dict[str, int]:
+        patterns = self.automaton.patterns
+        hit: set[int] = set()
+        for end, pid in self.automaton.iter_matches(text):
+            if pid not in hit and self._is_hit(text, end, patterns[pid]):
+                hit.add(pid)
+        scores: Dict[str, int] = defaultdict(int)
+        for pid in hit:
+            for topic_id, points in self.weights[pid]:
+                scores[topic_id] += points
+        if self.word_fallback and any(_is_word(ch) for ch in text):
+            for topic_id, points in self.word_fallback:
+                scores[topic_id] += points
+        return scores
+
+_INDEX = _TopicIndex(TOPIC_MAP)
 
 def match_topics(title: str, notes: str = "", max_topics: int = 4, min_score: int = 1) -> List[Tuple[str,int]]:
     """
@@ -30,14 +74,9 @@ def match_topics(title: str, notes: str = "", max_topics: int = 4, min_score: in
     Can return multiple topics for things like 'history presentation' etc.
     """
     text = _norm(f"{title}\n{notes}")
-    scores: Dict[str,int] = {}
-    for topic_id, spec in TOPIC_MAP.items():
-        kws = spec.get("keywords", [])
-        if not kws: 
-            continue
-        hits = _keyword_hits(text, kws)
-        if hits >= min_score:
-            scores[topic_id] = hits
+    found = _INDEX.scores(text)
+    scores = {tid: found.get(tid, 0) for tid in _INDEX.keyword_topics}
+    scores = {tid: hits for tid, hits in scores.items() if hits >= min_score}
     ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
     return ranked[:max_topics]
 
@@ -19,6 +19,12 @@ EWMA_ALPHA = float(getenv("TESKI_EWMA_ALPHA", "0.15"))
 class MemorySettings:
     DECAY_HALF_LIFE_DAYS: float = float(getenv("TESKI_MEMORY_HALFLIFE_DAYS", "7.0"))
     MEMORY_V2_DUAL_WRITE: bool = getenv("TESKI_MEMORY_V2_DUAL_WRITE", "false").lower() == "true"
+    # outbox relay for dual writes (see services/memory_bridge.py)
+    OUTBOX_RELAY_INTERVAL_S: float = float(getenv("TESKI_MEMORY_OUTBOX_INTERVAL", "5"))
+    OUTBOX_BATCH_SIZE: int = int(getenv("TESKI_MEMORY_OUTBOX_BATCH", "100"))
+    OUTBOX_MAX_ATTEMPTS: int = int(getenv("TESKI_MEMORY_OUTBOX_MAX_ATTEMPTS", "8"))
+    OUTBOX_RETRY_BASE_S: float = float(getenv("TESKI_MEMORY_OUTBOX_RETRY_BASE", "10"))
+    OUTBOX_RETENTION_H: float = float(getenv("TESKI_MEMORY_OUTBOX_RETENTION_H", "72"))
 
 
 memory_settings = MemorySettings()
@@ -30,6 +36,8 @@ class MemoryV1Settings:
     MAX_WARMUP_ITEMS: int = int(getenv("TESKI_WARMUP_MAX", "2"))
     DAILY_REVIEW_CAP: int = int(getenv("TESKI_SRS_DAILY_CAP", "6"))
     QUEUE_BACKOFF_THRESHOLD: int = int(getenv("TESKI_SRS_QUEUE_BACKOFF", "20"))
+    # per-process pending-card counts are recounted after this many seconds
+    PENDING_COUNT_TTL_S: float = float(getenv("TESKI_SRS_PENDING_TTL", "300"))
     DISABLE_MEMORY_V1: bool = getenv("TESKI_MEMORY_DISABLE", "false").lower() == "true"
 
 
@@ -2,13 +2,16 @@
 from __future__ import annotations
 
 import math
+from functools import lru_cache
 from typing import Any, Dict
 
 _ALLOWED_NAMES = {name: getattr(math, name) for name in dir(math) if not name.startswith("_")}
 _ALLOWED_NAMES.update({"abs": abs, "min": min, "max": max, "round": round})
 
 
+@lru_cache(maxsize=2048)
 def _compile_expr(expr: str):
+    """Compile once per distinct expression; code objects are immutable and shareable."""
     try:
         return compile(expr, "<formula>", "eval")
     except SyntaxError as exc:
@@ -0,0 +1,111 @@
+"""Backfill the ExerciseAttempt ledger from historical AnalyticsEvent rows.
+
+Events are copied newest first, one committed chunk at a time. Each pass only
+reads events older than the oldest ledger row, so the script can be rerun after
+an interruption and never duplicates attempts written live by ``/ex/submit``.
+A chunk never splits a timestamp: every event sharing one is committed together.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.challenge.engine import get_candidate
+from app.db import get_session as get_app_session
+from app.models import AnalyticsEvent, ExerciseAttempt
+
+CHUNK_SIZE = 1000
+ATTEMPT_KINDS = ("exercise_correct", "exercise_incorrect")
+
+
+def _oldest_attempt_ts(session: Session):
+    value = session.exec(select(func.min(ExerciseAttempt.ts))).one()
+    if isinstance(value, tuple):
+        value = value[0]
+    return value
+
+
+def _attempt_from_event(event: AnalyticsEvent) -> ExerciseAttempt:
+    payload = event.payload if isinstance(event.payload, dict) else {}
+    exercise_id = str(payload.get("exercise_id") or "")
+    candidate = get_candidate(exercise_id) if exercise_id else None
+    return ExerciseAttempt(
+        user_id=event.user_id,
+        exercise_id=exercise_id,
+        skill_key=candidate.skill_key if candidate else "",
+        correct=event.kind == "exercise_correct",
+        difficulty=candidate.difficulty if candidate else 1,
+        ts=event.ts,
+    )
+
+
+def _attempt_events():
+    return select(AnalyticsEvent).where(
+        AnalyticsEvent.kind.in_(ATTEMPT_KINDS),
+        AnalyticsEvent.user_id.is_not(None),
+    )
+
+
+def _copy_timestamp_group(session: Session, ts, page_size: int) -> int:
+    """Copy every event at ``ts``, paging by id, and commit them as one group."""
+    written = 0
+    last_id = None
+    while True:
+        stmt = _attempt_events().where(AnalyticsEvent.ts == ts)
+        if last_id is not None:
+            stmt = stmt.where(AnalyticsEvent.id > last_id)
+        page = list(session.exec(stmt.order_by(AnalyticsEvent.id).limit(page_size)).all())
+        session.add_all([_attempt_from_event(event) for event in page])
+        session.flush()
+        written += len(page)
+        if len(page) < page_size:
+            break
+        last_id = page[-1].id
+    # One commit: the next pass reads strictly older events, so a partly
+    # copied group would lose the rest of it.
+    session.commit()
+    return written
+
+
+def backfill(session: Session, chunk_size: int = CHUNK_SIZE) -> int:
+    written = 0
+    while True:
+        cutoff = _oldest_attempt_ts(session)
+        stmt = _attempt_events()
+        if cutoff is not None:
+            stmt = stmt.where(AnalyticsEvent.ts < cutoff)
+        events = list(session.exec(stmt.order_by(AnalyticsEvent.ts.desc()).limit(chunk_size)).all())
+        if not events:
+            return written
+        if len(events) == chunk_size:
+            if events[0].ts == events[-1].ts:
+                # The whole chunk shares one timestamp and more events may too.
+                written += _copy_timestamp_group(session, events[0].ts, chunk_size)
+                continue
+            # Leave the oldest timestamp group for the next pass so rows that
+            # share it with events beyond the limit are not skipped.
+            boundary = events[-1].ts
+            events = [event for event in events if event.ts != boundary]
+        attempts = [_attempt_from_event(event) for event in events]
+        session.add_all(attempts)
+        session.commit()
+        written += len(attempts)
+
+
+def main() -> None:
+    session_gen = get_app_session()
+    session = next(session_gen)
+    try:
+        written = backfill(session)
+        print(f"backfilled {written} exercise attempts")
+    finally:
+        session.close()
+        try:
+            session_gen.close()
+        except RuntimeError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlmodel import Session, create_engine, select
+
+from app.analytics.models import AnalyticsDailyAgg, AnalyticsRollupState
+from app.analytics.utils import ROLLUP_STATE_NAME, rollup_events_incremental
+from app.models import AnalyticsEvent, User, app_metadata
+
+
+def setup_db():
+    engine = create_engine("sqlite://", echo=False)
+    app_metadata.create_all(engine)
+    return engine
+
+
+def test_incremental_rollup_folds_only_new_events():
+    engine = setup_db()
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        user = User(id=uuid4(), timezone="UTC")
+        session.add(user)
+        session.flush()
+        first = now - timedelta(hours=2)
+        session.add(AnalyticsEvent(user_id=user.id, kind="exercise_correct", payload={}, ts=first))
+        session.add(AnalyticsEvent(user_id=user.id, kind="memory.review_shown", payload={"minutes": 2}, ts=first))
+        session.commit()
+
+        result = rollup_events_incremental(session, chunk_size=1, until=now - timedelta(hours=1))
+        assert result["events_folded"] == 2
+
+        session.add(AnalyticsEvent(user_id=user.id, kind="exercise_correct", payload={}, ts=now - timedelta(minutes=30)))
+        session.commit()
+        result = rollup_events_incremental(session, until=now)
+        assert result["events_folded"] == 1
+
+        rows = session.exec(select(AnalyticsDailyAgg).where(AnalyticsDailyAgg.user_id == user.id)).all()
+        counts = {}
+        reviews = sessions = 0
+        minutes = 0.0
+        for row in rows:
+            for kind, value in row.counts.items():
+                counts[kind] = counts.get(kind, 0) + value
+            reviews += row.reviews
+            sessions += row.sessions
+            minutes += row.minutes_active
+        assert counts == {"exercise_correct": 2, "memory.review_shown": 1}
+        assert (reviews, sessions, minutes) == (2, 1, 2.0)
+
+        state = session.get(AnalyticsRollupState, ROLLUP_STATE_NAME)
+        assert state.watermark == now
+        assert state.events_folded == 3
+        assert rollup_events_incremental(session, until=now)["events_folded"] == 0
+
+
+def test_kpis_aggregate_in_sql_and_cache_until_invalidated():
+    from datetime import date
+
+    from app.analytics import kpis as kpis_module
+
+    engine = setup_db()
+    today = date.today()
+    with Session(engine) as session:
+        users = [User(id=uuid4(), timezone="UTC") for _ in range(3)]
+        session.add_all(users)
+        session.flush()
+        a, b, c = users
+        rows = [
+            (a, today, 1, 2, 10.0),
+            (b, today, 0, 0, 0.0),
+            (a, today - timedelta(days=10), 1, 0, 5.0),
+            (b, today - timedelta(days=10), 1, 0, 5.0),
+            (c, today - timedelta(days=3), 2, 4, 20.0),
+        ]
+        for user, day, sessions, reviews, minutes in rows:
+            session.add(
+                AnalyticsDailyAgg(
+                    user_id=user.id,
+                    day=day,
+                    counts={},
+                    sessions=sessions,
+                    reviews=reviews,
+                    minutes_active=minutes,
+                )
+            )
+        session.commit()
+
+        kpis_module.invalidate_kpi_cache()
+        result = kpis_module.kpis(session)
+        assert result["dau"] == 1
+        assert result["wau"] == 3
+        assert result["retention7_pct"] == 100.0
+        assert result["avg_session_minutes"] == 10.0
+        assert result["reviews_per_user_7d"] == 2.0
+
+        session.add(AnalyticsDailyAgg(user_id=c.id, day=today, counts={}, sessions=1, reviews=0, minutes_active=1.0))
+        session.commit()
+        assert kpis_module.kpis(session)["dau"] == 1
+        kpis_module.invalidate_kpi_cache()
+        assert kpis_module.kpis(session)["dau"] == 2
+
+
+def test_purge_deletes_in_batches_and_archives(tmp_path, monkeypatch):
+    import gzip
+    import json
+
+    from app.analytics import jobs
+
+    engine = setup_db()
+    monkeypatch.setattr(jobs, "get_engine", lambda: engine)
+    old = datetime.utcnow() - timedelta(days=jobs.RETENTION_DAYS_RAW + 5)
+    with Session(engine) as session:
+        for idx in range(5):
+            session.add(AnalyticsEvent(kind="old", payload={"i": idx}, ts=old + timedelta(minutes=idx)))
+        session.add(AnalyticsEvent(kind="fresh", payload={}, ts=datetime.utcnow()))
+        session.commit()
+
+    seen = []
+    result = jobs.purge_old_raw_events(batch_size=2, archive_dir=tmp_path, vacuum="incremental", progress=seen.append)
+    assert result["deleted_events"] == 5
+    assert result["batches"] == 3
+    assert seen == [2, 4, 5]
+    assert result["space_reclaim"] in {"incremental_vacuum", "incremental_unavailable"}
+
+    archive = next(tmp_path.glob("*.jsonl.gz"))
+    with gzip.open(archive, "rt", encoding="utf-8") as fh:
+        archived = [json.loads(line) for line in fh]
+    assert [row["payload"]["i"] for row in archived] == [0, 1, 2, 3, 4]
+
+    with Session(engine) as session:
+        remaining = session.exec(select(AnalyticsEvent)).all()
+    assert [ev.kind for ev in remaining] == ["fresh"]
@@ -0,0 +1,67 @@
+import time
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import func
+from sqlmodel import Session, create_engine, select
+
+from app.analytics.writer import BufferedEventWriter
+from app.models import AnalyticsEvent, app_metadata
+
+
+def setup_db():
+    engine = create_engine("sqlite://", echo=False)
+    app_metadata.create_all(engine)
+    return engine
+
+
+def _row(kind: str = "exercise_shown") -> dict:
+    return {"id": uuid4(), "user_id": None, "kind": kind, "payload": {"n": 1}, "ts": datetime.utcnow()}
+
+
+def _count(engine) -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(AnalyticsEvent)).one()
+
+
+def test_writer_batches_and_flushes_on_stop():
+    engine = setup_db()
+    writer = BufferedEventWriter(batch_size=3, flush_interval_ms=60_000, engine_factory=lambda: engine)
+    for _ in range(7):
+        assert writer.submit(_row())
+    writer.stop()
+
+    stats = writer.stats()
+    assert _count(engine) == 7
+    assert stats["flushed"] == 7
+    assert stats["batches"] == 3
+    assert stats["dropped"] == 0
+    assert stats["queued"] == 0
+
+
+def test_writer_drops_when_queue_is_full():
+    engine = setup_db()
+    writer = BufferedEventWriter(max_queue=2, enqueue_timeout_ms=0, engine_factory=lambda: engine)
+    results = [writer.submit(_row()) for _ in range(4)]
+    assert results == [True, True, False, False]
+    assert writer.stats()["dropped"] == 2
+
+    writer.stop()
+    assert _count(engine) == 2
+
+
+def test_background_thread_flushes_on_interval():
+    engine = setup_db()
+    writer = BufferedEventWriter(batch_size=100, flush_interval_ms=20, engine_factory=lambda: engine)
+    writer.start()
+    try:
+        writer.submit(_row("exercise_correct"))
+        deadline = time.monotonic() + 2
+        while writer.stats()["flushed"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.stats()["flushed"] == 1
+    finally:
+        writer.stop()
+    with Session(engine) as session:
+        kinds = session.exec(select(AnalyticsEvent.kind)).all()
+    assert kinds == ["exercise_correct"]
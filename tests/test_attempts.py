@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlmodel import Session, create_engine, select
+
+from app.attempts import (
+    correct_streak,
+    current_correct_streak,
+    recent_attempts,
+    record_attempt,
+    today_attempt_counts,
+)
+from app.models import AnalyticsEvent, ExerciseAttempt, User, app_metadata
+from scripts.backfill_exercise_attempts import backfill
+
+
+def setup_db():
+    engine = create_engine("sqlite://", echo=False)
+    app_metadata.create_all(engine)
+    return engine
+
+
+def test_today_counts_and_streak_read_the_ledger():
+    engine = setup_db()
+    with Session(engine) as session:
+        user = User(id=uuid4(), timezone="UTC")
+        session.add(user)
+        session.flush()
+        now = datetime.utcnow()
+        record_attempt(session, user.id, exercise_id="a", skill_key="x", correct=False, difficulty=1, ts=now - timedelta(minutes=3))
+        record_attempt(session, user.id, exercise_id="b", skill_key="x", correct=True, difficulty=2, ts=now - timedelta(minutes=2))
+        record_attempt(session, user.id, exercise_id="c", skill_key="x", correct=True, difficulty=3, ts=now - timedelta(minutes=1))
+        record_attempt(session, user.id, exercise_id="d", skill_key="x", correct=True, difficulty=3, ts=now - timedelta(days=2))
+        session.commit()
+
+        assert today_attempt_counts(session, user) == (2, 1)
+        attempts = recent_attempts(session, user.id, 10)
+        assert [a.exercise_id for a in attempts] == ["c", "b", "a", "d"]
+        assert correct_streak(attempts) == 2
+        assert current_correct_streak(session, user.id) == 2
+
+
+def test_submit_streak_counts_at_most_25_attempts():
+    engine = setup_db()
+    with Session(engine) as session:
+        user = User(id=uuid4(), timezone="UTC")
+        session.add(user)
+        session.flush()
+        now = datetime.utcnow()
+        for idx in range(30):
+            record_attempt(session, user.id, exercise_id=f"e{idx}", skill_key="x", correct=True, difficulty=1, ts=now - timedelta(minutes=idx))
+        session.commit()
+
+        assert current_correct_streak(session, user.id) == 25
+
+
+def test_backfill_copies_events_once():
+    engine = setup_db()
+    with Session(engine) as session:
+        user = User(id=uuid4(), timezone="UTC")
+        session.add(user)
+        session.flush()
+        base = datetime.utcnow() - timedelta(days=1)
+        for idx in range(5):
+            kind = "exercise_correct" if idx % 2 == 0 else "exercise_incorrect"
+            session.add(
+                AnalyticsEvent(
+                    user_id=user.id,
+                    kind=kind,
+                    payload={"exercise_id": "ex_mock_mcq_intro"},
+                    ts=base + timedelta(minutes=idx),
+                )
+            )
+        session.add(AnalyticsEvent(user_id=user.id, kind="exercise_shown", payload={}, ts=base))
+        session.commit()
+
+        assert backfill(session, chunk_size=2) == 5
+        assert backfill(session, chunk_size=2) == 0
+        rows = session.exec(select(ExerciseAttempt).order_by(ExerciseAttempt.ts)).all()
+        assert [row.correct for row in rows] == [True, False, True, False, True]
+        assert all(row.skill_key == "circuits" for row in rows)
+
+
+def test_backfill_copies_a_timestamp_group_larger_than_a_chunk():
+    engine = setup_db()
+    with Session(engine) as session:
+        user = User(id=uuid4(), timezone="UTC")
+        session.add(user)
+        session.flush()
+        shared = datetime.utcnow() - timedelta(days=1)
+        for idx in range(5):
+            session.add(AnalyticsEvent(user_id=user.id, kind="exercise_correct", payload={}, ts=shared))
+        session.add(AnalyticsEvent(user_id=user.id, kind="exercise_incorrect", payload={}, ts=shared - timedelta(minutes=1)))
+        session.commit()
+
+        assert backfill(session, chunk_size=2) == 6
+        assert backfill(session, chunk_size=2) == 0
+        assert len(session.exec(select(ExerciseAttempt)).all()) == 6
@@ -49,3 +49,75 @@ def test_allocate_by_band_prefers_requested_buckets():
     assert len(planned) <= sum(targets.values())
     ids = [p.exercise_id for p in planned]
     assert len(ids) == len(set(ids))
+
+
+def test_candidate_index_groups_by_skill_and_concept_sorted_by_difficulty():
+    from app.challenge.engine import _build_candidate_index
+    from app.exercises import Exercise
+
+    exercises = [
+        Exercise(id="hard", concept="Ohm", type="numeric", question="?", difficulty=4, keywords=["Circuits"]),
+        Exercise(id="easy", concept="ohm ", type="numeric", question="?", difficulty=1, keywords=["circuits"]),
+        Exercise(id="other", concept="Flux", type="numeric", question="?", difficulty=2, keywords=["magnetism"]),
+    ]
+    index = _build_candidate_index(exercises)
+    assert [c.id for c in index.by_skill["circuits"]] == ["easy", "hard"]
+    assert [c.id for c in index.by_concept["ohm"]] == ["easy", "hard"]
+    assert index.concept_skill["flux"] == "magnetism"
+    assert set(index.by_id) == {"hard", "easy", "other"}
+
+
+def test_invalidate_cache_swaps_candidate_index(monkeypatch):
+    from app import exercises as exercises_module
+    from app.challenge import engine
+    from app.exercises import Exercise
+
+    before = engine._candidate_index()
+    fresh = Exercise(id="fresh", concept="fresh", type="mcq", question="?", keywords=["fresh"])
+    monkeypatch.setattr(engine, "load_exercises", lambda: [fresh])
+    exercises_module.invalidate_cache()
+    after = engine._candidate_index()
+    assert after is not before
+    assert "fresh" in after.by_id
+    monkeypatch.undo()
+    exercises_module.invalidate_cache()
+
+
+def test_planner_context_feeds_session_plan():
+    from uuid import uuid4
+
+    from sqlmodel import Session, create_engine
+
+    from app.challenge.engine import load_planner_context, select_exercises_for_session
+    from app.mastery.models import Skill, UserSkillMastery
+    from app.models import ExerciseAttempt, User, app_metadata
+
+    engine = create_engine("sqlite://", echo=False)
+    app_metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(id=uuid4(), timezone="UTC")
+        weak = Skill(name="circuits", slug="circuits")
+        strong = Skill(name="magnetism", slug="magnetism")
+        session.add_all([user, weak, strong])
+        session.flush()
+        session.add(UserSkillMastery(user_id=user.id, skill_id=weak.id, mastery=10.0))
+        session.add(UserSkillMastery(user_id=user.id, skill_id=strong.id, mastery=90.0))
+        session.add(
+            ExerciseAttempt(
+                user_id=user.id,
+                exercise_id="ex_mock_mcq_intro",
+                skill_key="circuits",
+                correct=True,
+                difficulty=1,
+            )
+        )
+        session.commit()
+
+        context = load_planner_context(session, user.id)
+        assert context.weakest_skill().id == weak.id
+        assert context.correct_streak() == 1
+
+        plan = select_exercises_for_session(session, user.id, length=3, context=context)
+        assert plan.skill.id == weak.id
+        assert plan.mastery == 10.0
+        assert plan.performance.attempts == 1
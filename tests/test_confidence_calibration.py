@@ -0,0 +1,86 @@
+from uuid import uuid4
+
+import pytest
+from sqlmodel import Session, create_engine
+
+from app.deep.calibration import (
+    calibration_bins,
+    calibration_summary,
+    ensure_calibration_aggregates,
+    record_confidence,
+)
+from app.deep.models import ConfidenceCalibration, ConfidenceLog
+
+LOGS = [(5, True), (5, False), (3, True), (1, False), (1, False), (4, True)]
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", echo=False)
+    ConfidenceLog.metadata.create_all(
+        engine, tables=[ConfidenceLog.__table__, ConfidenceCalibration.__table__]
+    )
+    return engine
+
+
+def _log(user_id, topic_id, confidence, correct):
+    return ConfidenceLog(
+        user_id=user_id, item_id="q", topic_id=topic_id, confidence=confidence, correct=correct
+    )
+
+
+def test_summary_matches_raw_log_average(engine):
+    user_id = uuid4()
+    with Session(engine) as session:
+        for confidence, correct in LOGS:
+            record_confidence(session, _log(user_id, "t1", confidence, correct))
+        record_confidence(session, _log(user_id, "other", 5, True))
+        session.commit()
+
+        summary = calibration_summary(session, user_id, "t1")
+        avg_conf = sum(c for c, _ in LOGS) / len(LOGS)
+        accuracy = 100.0 * sum(1 for _, ok in LOGS if ok) / len(LOGS)
+        assert summary == {
+            "avg_confidence": round(avg_conf, 2),
+            "accuracy_pct": round(accuracy, 2),
+            "calibration_error": round(avg_conf * 20 - accuracy, 2),
+        }
+        assert calibration_summary(session, uuid4(), "t1")["accuracy_pct"] == 0.0
+
+
+def test_bins_form_a_reliability_curve(engine):
+    user_id = uuid4()
+    with Session(engine) as session:
+        for confidence, correct in LOGS:
+            record_confidence(session, _log(user_id, "t1", confidence, correct))
+        session.commit()
+        curve = calibration_bins(session, user_id, "t1")
+
+    bins = {b["confidence"]: b for b in curve["bins"]}
+    assert curve["total"] == 6
+    assert bins[5] == {
+        "confidence": 5,
+        "count": 2,
+        "correct": 1,
+        "expected_pct": 100.0,
+        "accuracy_pct": 50.0,
+        "gap_pct": 50.0,
+    }
+    assert bins[2]["count"] == 0 and bins[2]["accuracy_pct"] is None
+    # |100-50|*2 + |60-100|*1 + |20-0|*2 + |80-100|*1, over 6 answers
+    assert curve["expected_calibration_error"] == round((100 + 40 + 40 + 20) / 6, 2)
+
+
+def test_backfill_from_existing_logs(engine):
+    user_id = uuid4()
+    with Session(engine) as session:
+        for confidence, correct in LOGS:
+            session.add(_log(user_id, "t1", confidence, correct))
+        session.commit()
+        assert calibration_summary(session, user_id, "t1")["avg_confidence"] == 0.0
+
+        assert ensure_calibration_aggregates(session) == 5
+        assert ensure_calibration_aggregates(session) is None
+        expected = sum(c for c, _ in LOGS) / len(LOGS)
+        assert calibration_summary(session, user_id, "t1")["avg_confidence"] == round(expected, 2)
+        assert calibration_bins(session, user_id, "t1")["total"] == 6
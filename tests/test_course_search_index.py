@@ -0,0 +1,87 @@
+import asyncio
+
+from app.exam_scraper import search_index
+from app.exam_scraper.scraper import search_courses
+from app.exam_scraper.search_index import CourseSearchIndex, get_search_index
+
+
+def _exam(code: str, name: str, date: str = "2024-01-01") -> dict:
+    return {
+        "course_code": code,
+        "course_name": name,
+        "department": "TestDept",
+        "date": date,
+        "pdf_url": f"https://example.com/{code}-{date}.pdf",
+    }
+
+
+def _sisu(code: str, name: str) -> dict:
+    return {"code": code, "name_en": name, "name_fi": name, "credits": 5.0}
+
+
+SISU = [
+    _sisu("BM20A1401", "Statistics I"),
+    _sisu("BM20A1500", "Applied Statistics"),
+    _sisu("BM20A", "Mathematical Statistics"),
+    _sisu("CT60A2411", "Object-Oriented Programming"),
+    _sisu("BH30A1801", "Nuclear Reactor Physics"),
+    _sisu("KA00A0000", "Thermodynamics"),
+    _sisu("KA00A0001", "Thermostatics"),
+]
+EXAMS = [
+    _exam("BM20A1401", "Statistics I", "2023-05-10"),
+    _exam("BM20A1401", "Statistics I", "2024-03-15"),
+    _exam("ZZ99A0001", "Archive-only Stats Course"),
+]
+
+
+def _codes(results: list[dict]) -> list[str]:
+    return [r["course_code"] for r in results]
+
+
+def test_ranks_exact_code_then_prefix_then_name_then_substring():
+    index = CourseSearchIndex(EXAMS, SISU)
+
+    assert _codes(index.search("bm20a")) == ["BM20A", "BM20A1401", "BM20A1500"]
+    # word prefixes beat substrings; courses with exams lead within a tier
+    assert _codes(index.search("stat")) == ["ZZ99A0001", "BM20A1401", "BM20A1500", "BM20A", "KA00A0001"]
+    assert _codes(index.search("ented prog")) == ["CT60A2411"]
+    assert _codes(index.search("reactor ph")) == ["BH30A1801"]
+
+
+def test_fuzzy_matches_fill_in_for_typos():
+    index = CourseSearchIndex(EXAMS, SISU)
+
+    assert _codes(index.search("thermodinamics")) == ["KA00A0000"]
+    assert _codes(index.search("nucler reactr")) == ["BH30A1801"]
+    assert index.search("xylophone") == []
+
+
+def test_search_courses_keeps_result_shape():
+    results = search_courses(EXAMS, "statistics i", sisu_rows=SISU)
+
+    first = results[0]
+    assert first["course_code"] == "BM20A1401"
+    assert first["has_exams"] is True
+    assert first["exam_count"] == 2
+    assert first["date"] == "2024-03-15"
+    assert len(first["exam_pdf_urls"]) == 2
+    # callers get copies, not the index's own rows
+    first["exam_pdf_urls"].clear()
+    assert len(search_courses(EXAMS, "statistics i", sisu_rows=SISU)[0]["exam_pdf_urls"]) == 2
+
+
+def test_previous_index_serves_while_rebuild_runs():
+    async def scenario():
+        first = await get_search_index(EXAMS, SISU)
+        assert await get_search_index(EXAMS, SISU) is first
+
+        refreshed = [*SISU, _sisu("LM10A1000", "Statistical Learning")]
+        # the new snapshot is indexed in the background; until then the old index answers
+        assert await get_search_index(EXAMS, refreshed) is first
+        rebuilt = await search_index.start_search_index_build(EXAMS, refreshed)
+        assert rebuilt is not first
+        assert await get_search_index(EXAMS, refreshed) is rebuilt
+        assert "LM10A1000" in _codes(rebuilt.search("statistical"))
+
+    asyncio.run(scenario())
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.exam_scraper import index_store
+from app.exam_scraper.index_store import IndexStore
+
+
+class _Upstream:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.release = asyncio.Event()
+
+    async def load(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return [{"course_code": f"C{self.calls}"}]
+
+
+def test_cold_start_coalesces_and_persists(tmp_path):
+    async def scenario():
+        upstream = _Upstream()
+        store = IndexStore("exams", upstream.load, ttl_s=60, directory=tmp_path)
+        waiters = [asyncio.ensure_future(store.get()) for _ in range(5)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        results = await asyncio.gather(*waiters)
+        assert upstream.calls == 1
+        assert all(rows == [{"course_code": "C1"}] for rows in results)
+
+        # a restarted process serves the snapshot without touching upstream
+        restarted = IndexStore("exams", upstream.load, ttl_s=60, directory=tmp_path)
+        assert await restarted.get() == [{"course_code": "C1"}]
+        assert upstream.calls == 1
+
+    asyncio.run(scenario())
+    assert (tmp_path / "exams.json").exists()
+
+
+def test_stale_rows_are_served_while_one_refresh_runs(tmp_path, monkeypatch):
+    async def scenario():
+        upstream = _Upstream()
+        upstream.release.set()
+        store = IndexStore("exams", upstream.load, ttl_s=60, directory=tmp_path)
+        assert await store.get() == [{"course_code": "C1"}]
+
+        store._fetched_at -= 120  # expire the TTL
+        upstream.release.clear()
+        stale = await asyncio.gather(*(store.get() for _ in range(5)))
+        assert all(rows == [{"course_code": "C1"}] for rows in stale)
+        assert store.stats()["refreshing"] is True
+
+        upstream.release.set()
+        await store._refresh
+        assert upstream.calls == 2
+        assert await store.get() == [{"course_code": "C2"}]
+
+        # a failed refresh keeps the old snapshot and backs off
+        store._fetched_at -= 120
+        upstream.fail = True
+        assert await store.get() == [{"course_code": "C2"}]
+        with pytest.raises(RuntimeError):
+            await store._refresh
+        assert store.stats()["last_error"] == "RuntimeError: upstream down"
+        assert await store.get() == [{"course_code": "C2"}]
+        assert upstream.calls == 3
+
+        # once the backoff has passed, a stale read starts a new refresh
+        await asyncio.sleep(0.3)
+        upstream.fail = False
+        assert await store.get() == [{"course_code": "C2"}]
+        await store._refresh
+        assert upstream.calls == 4
+        assert await store.get() == [{"course_code": "C4"}]
+        assert store.stats()["last_error"] is None
+
+    monkeypatch.setattr(index_store, "RETRY_AFTER_S", 0.2)
+    asyncio.run(scenario())
@@ -81,3 +81,74 @@ def test_grade_short_answer_accepts_synonyms():
     ok, info = grade({"text": "Too long answer mentioning temperature and skipping mass entirely."}, exercise)
     assert ok is False
     assert "missing" in info or "forbidden" in info
+
+
+def _write_exercise(directory, ex_id: str, question: str = "What is 2 + 2?") -> None:
+    (directory / f"{ex_id}.md").write_text(
+        f"---\nid: {ex_id}\nconcept: basics\ntype: mcq\nquestion: {question}\n---\nbody\n",
+        encoding="utf-8",
+    )
+
+
+def test_catalogue_snapshot_reparses_only_changed_files(tmp_path, monkeypatch):
+    from app import exercises
+
+    monkeypatch.delenv("EXERCISE_CATALOGUE_CACHE", raising=False)
+    monkeypatch.setattr(exercises, "_EXERCISE_CACHE", None)
+    monkeypatch.setattr(exercises, "_CATALOGUE_ENTRIES", {})
+    # keep derived indexes (which load the default content dir) out of this test
+    monkeypatch.setattr(exercises, "_INVALIDATION_HOOKS", [])
+    _write_exercise(tmp_path, "a")
+    _write_exercise(tmp_path, "b")
+    assert [ex.id for ex in exercises.load_exercises(tmp_path)] == ["a", "b"]
+    assert (tmp_path / exercises.CATALOGUE_FILENAME).exists()
+
+    parsed: list[str] = []
+    original = exercises._extract_front_matter
+
+    def _tracking(text: str):
+        parsed.append(text)
+        return original(text)
+
+    monkeypatch.setattr(exercises, "_extract_front_matter", _tracking)
+    # Simulate a restart: in-memory state is gone, the snapshot on disk remains.
+    monkeypatch.setattr(exercises, "_EXERCISE_CACHE", None)
+    monkeypatch.setattr(exercises, "_CATALOGUE_ENTRIES", {})
+    assert [ex.id for ex in exercises.load_exercises(tmp_path)] == ["a", "b"]
+    assert parsed == []
+
+    _write_exercise(tmp_path, "b", question="What is 30 + 3?")
+    _write_exercise(tmp_path, "c")
+    exercises.invalidate_cache()
+    loaded = exercises.load_exercises(tmp_path)
+    assert [ex.id for ex in loaded] == ["a", "b", "c"]
+    assert loaded[1].question == "What is 30 + 3?"
+    assert len(parsed) == 2
+
+    (tmp_path / "a.md").unlink()
+    exercises.invalidate_cache()
+    assert [ex.id for ex in exercises.load_exercises(tmp_path)] == ["b", "c"]
+
+
+def test_loader_uses_process_pool_for_large_reparses(tmp_path, monkeypatch):
+    from app import exercises
+
+    monkeypatch.setenv("EXERCISE_CATALOGUE_CACHE", "off")
+    monkeypatch.setattr(exercises, "_EXERCISE_CACHE", None)
+    monkeypatch.setattr(exercises, "_CATALOGUE_ENTRIES", {})
+    monkeypatch.setattr(exercises, "PARALLEL_PARSE_THRESHOLD", 2)
+    pools: list[int] = []
+
+    class _RecordingPool(exercises.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(1)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(exercises, "ProcessPoolExecutor", _RecordingPool)
+    for idx in range(5):
+        _write_exercise(tmp_path, f"ex_{idx}")
+
+    loaded = exercises.load_exercises(tmp_path)
+    assert [ex.id for ex in loaded] == [f"ex_{idx}" for idx in range(5)]
+    assert pools == [1]
+    assert not (tmp_path / exercises.CATALOGUE_FILENAME).exists()
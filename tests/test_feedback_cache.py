@@ -0,0 +1,77 @@
+import asyncio
+from uuid import uuid4
+
+from sqlalchemy import func
+from sqlmodel import Session, create_engine, select
+
+from app.feedback import cache as feedback_cache
+from app.feedback import router as feedback_router
+from app.feedback.costs import get_cost_stats
+from app.feedback.models import FeedbackCache, FeedbackEvent
+from app.feedback.schemas import FeedbackGenerateIn
+from app.models import User, app_metadata
+
+
+def setup_db():
+    engine = create_engine("sqlite://", echo=False)
+    app_metadata.create_all(engine)
+    return engine
+
+
+def test_cache_key_ignores_volatile_summary_fields():
+    base = {"counts": {"reviews": 4}, "accuracy": 0.75}
+    noisy = {"counts": {"reviews": 4, "generated_at": "2025-01-01T10:00:00Z"}, "accuracy": 0.7500000001, "ts": 1}
+    key = feedback_router.make_cache_key("u", "Coach", None, "en", base, 3)
+    assert feedback_router.make_cache_key("u", "Coach", None, "en", noisy, 3) == key
+    assert feedback_router.make_cache_key("u", "Coach", None, "en", {**base, "accuracy": 0.8}, 3) != key
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = feedback_cache.FeedbackMemoryCache(max_entries=2)
+    entry = feedback_cache.CachedFeedback("text", "mini:haiku4_5", 1, 1)
+    cache.put("a", entry)
+    cache.put("b", entry)
+    assert cache.get("a") is entry
+    cache.put("c", entry)
+    assert cache.get("b") is None
+    assert cache.get("a") is entry and cache.get("c") is entry
+
+
+def test_concurrent_identical_requests_share_one_llm_call(monkeypatch):
+    engine = setup_db()
+    monkeypatch.setattr(feedback_cache, "_cache", feedback_cache.FeedbackMemoryCache(16))
+    calls = []
+
+    async def fake_llm(model, prompt, language):
+        calls.append(model)
+        await asyncio.sleep(0.01)
+        return "Keep going."
+
+    monkeypatch.setattr(feedback_router, "call_llm", fake_llm)
+    monkeypatch.setattr(feedback_router, "count_tokens_estimate", lambda text, model: 4)
+
+    with Session(engine) as session:
+        user = User(id=uuid4(), is_pro=True)
+        session.add(user)
+        session.commit()
+        payload = FeedbackGenerateIn(user_id=str(user.id), summary_json={"counts": {"reviews": 3}})
+
+        async def burst():
+            return await asyncio.gather(
+                *(feedback_router.generate_feedback(payload, session) for _ in range(5))
+            )
+
+        results = asyncio.run(burst())
+        assert len(calls) == 1
+        assert sorted(r.cached for r in results) == [False, True, True, True, True]
+
+        again = asyncio.run(feedback_router.generate_feedback(payload, session))
+        assert again.cached is True and len(calls) == 1
+
+        assert session.exec(select(func.count()).select_from(FeedbackCache)).one() == 1
+        assert session.exec(select(func.count()).select_from(FeedbackEvent)).one() == 6
+        stats = get_cost_stats(session)
+        assert stats["cache_misses"] == 5
+        assert stats["cache_coalesced"] == 4
+        assert stats["cache_memory_hits"] == 1
+        assert stats["cache_db_hits"] == 0
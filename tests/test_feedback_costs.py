@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, create_engine, select
+
+from app.feedback import costs
+from app.feedback.models import FeedbackCostLedger, FeedbackEvent
+from app.models import app_metadata
+
+
+def setup_db():
+    engine = create_engine("sqlite://", echo=False)
+    app_metadata.create_all(engine)
+    return engine
+
+
+def _event(model: str, cost: float, *, cached: bool = False, at: datetime | None = None) -> FeedbackEvent:
+    return FeedbackEvent(
+        user_id="u1",
+        model_used=model,
+        tokens_in=100,
+        tokens_out=50,
+        cost_eur=cost,
+        cached_hit=cached,
+        created_at=at or datetime.utcnow(),
+    )
+
+
+def test_ledger_tracks_monthly_spend_and_stats():
+    engine = setup_db()
+    with Session(engine) as session:
+        costs.record_feedback_event(session, _event("pro:sonnet3_7", 0.25))
+        costs.record_feedback_event(session, _event("mini:haiku4_5", 0.05))
+        costs.record_feedback_event(session, _event("mini:haiku4_5", 0.0, cached=True))
+        costs.record_feedback_event(session, _event("mini:haiku4_5", 1.0, at=datetime.utcnow() - timedelta(days=70)))
+        session.commit()
+
+        assert costs.get_monthly_spend(session) == pytest.approx(0.30)
+        per_model = session.get(FeedbackCostLedger, (costs._month_key(datetime.utcnow()), "mini:haiku4_5"))
+        assert per_model.events == 2 and per_model.cached_hits == 1
+
+        stats = costs.get_cost_stats(session)
+        assert stats["cost_total_eur"] == pytest.approx(1.30)
+        assert stats["cost_last_30d_eur"] == pytest.approx(0.30)
+        assert stats["events_total"] == 4
+        assert stats["cache_hit_rate"] == pytest.approx(0.25)
+
+
+def test_reconcile_reports_and_fixes_drift():
+    engine = setup_db()
+    with Session(engine) as session:
+        costs.record_feedback_event(session, _event("pro:sonnet3_7", 0.40))
+        session.commit()
+        # a raw row written without going through the ledger
+        session.add(_event("pro:sonnet3_7", 0.10))
+        session.commit()
+
+        result = costs.reconcile_cost_ledger(session)
+        assert result["rows_fixed"] == 4
+        assert result["max_drift_eur"] == pytest.approx(0.10)
+        assert costs.get_monthly_spend(session) == pytest.approx(0.50)
+        assert costs.reconcile_cost_ledger(session)["rows_fixed"] == 0
+
+
+def test_ensure_cost_ledger_backfills_empty_ledger():
+    engine = setup_db()
+    with Session(engine) as session:
+        session.add(_event("mini:haiku4_5", 0.02))
+        session.add(_event("mini:haiku4_5", 0.03))
+        session.commit()
+        assert costs.get_monthly_spend(session) == 0.0
+
+        assert costs.ensure_cost_ledger(session)["rows_fixed"] == 4
+        assert costs.get_monthly_spend(session) == pytest.approx(0.05)
+        assert costs.ensure_cost_ledger(session) is None
+        assert len(session.exec(select(FeedbackCostLedger)).all()) == 4
+
+
+def test_reconcile_reads_events_and_ledger_in_one_statement():
+    engine = setup_db()
+    with Session(engine) as session:
+        costs.record_feedback_event(session, _event("mini:haiku4_5", 0.02))
+        session.commit()
+        # a ledger-only row (e.g. events deleted by hand) must be corrected downwards
+        costs._bump_ledger(
+            session,
+            [
+                {
+                    "period": "2020-01",
+                    "model_used": costs.LEDGER_ALL_MODELS,
+                    "cost_eur": 1.0,
+                    "events": 1,
+                    "cached_hits": 0,
+                    "tokens_in": 0,
+                    "tokens_out": 0,
+                    "updated_at": datetime.utcnow(),
+                }
+            ],
+        )
+        session.commit()
+
+        selects = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _record(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith("SELECT"):
+                selects.append(statement)
+
+        result = costs.reconcile_cost_ledger(session)
+        assert len(selects) == 1
+        assert result["rows_fixed"] == 1
+        assert session.get(FeedbackCostLedger, ("2020-01", "*")).cost_eur == pytest.approx(0.0)
+        assert costs.get_monthly_spend(session) == pytest.approx(0.02)
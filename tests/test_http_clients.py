@@ -0,0 +1,73 @@
+import asyncio
+import dataclasses
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core import http as http_clients
+from app.exam_scraper import scraper
+from app.feedback import clients as feedback_clients
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def _send(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send(b"%PDF-1.4 stub", "application/pdf")
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send(json.dumps({"text": "Nice work."}).encode(), "application/json")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_reuse_pooled_connections(stub_server, monkeypatch):
+    base = f"http://127.0.0.1:{stub_server.server_address[1]}"
+    monkeypatch.setattr(
+        feedback_clients, "settings", dataclasses.replace(feedback_clients.settings, local_llm_base_url=base)
+    )
+    monkeypatch.setattr(feedback_clients, "count_tokens_estimate", lambda text, model: 3)
+
+    async def scenario():
+        for _ in range(3):
+            assert await scraper.download_pdf(f"{base}/exam.pdf") == b"%PDF-1.4 stub"
+            text, _ = await feedback_clients.call_local_llama("llama", "hi")
+            assert text == "Nice work."
+        stats = http_clients.http_client_stats()
+        await http_clients.close_http_clients()
+        return stats
+
+    stats = asyncio.run(scenario())
+    # one keep-alive connection per client, not one per request
+    assert stub_server.connections == 2
+    assert stats["exam_archive"]["requests"] == 3
+    assert stats["exam_archive"]["connections"] == 1
+    assert stats["exam_archive"]["idle"] == 1
+    assert stats["local_llm"]["requests"] == 3
+    assert http_clients.http_client_stats() == {}
@@ -0,0 +1,93 @@
+import pytest
+
+from app.integrations import ics_parser
+from app.integrations.ics_parser import IcsParseError, iter_due_events, parse_ics_calendar, parse_ics_text
+
+
+def _calendar(*events, extra=""):
+    body = "".join(f"BEGIN:VEVENT\r\n{event.strip()}\r\nEND:VEVENT\r\n" for event in events)
+    return f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Moodle//EN\r\n{extra}{body}END:VCALENDAR\r\n"
+
+
+# Each case must give exactly what the ics.Calendar implementation gives.
+CORPUS = {
+    "utc": _calendar(
+        "UID:1@moodle\nSUMMARY:Essay is due\nDTSTART:20301101T100000Z\nDTEND:20301101T120000Z",
+        "UID:2@moodle\nSUMMARY:Lecture\nDESCRIPTION:No work here\nDTSTART:20301102T100000Z",
+    ),
+    "tzid_and_floating": _calendar(
+        "UID:3@moodle\nSUMMARY:Quiz closes\nDTSTART;TZID=Europe/Helsinki:20300315T235900",
+        'UID:4@moodle\nSUMMARY:Submit lab\nDTSTART;TZID="America/New_York":20300701T090000\nDTEND;TZID="America/New_York":20300701T100000',
+        "UID:5@moodle\nSUMMARY:Project deadline\nDTSTART:20300401T080000",
+    ),
+    "all_day_and_duration": _calendar(
+        "UID:6@moodle\nSUMMARY:Report due\nDTSTART;VALUE=DATE:20300501",
+        "UID:7@moodle\nSUMMARY:Report due (2)\nDTSTART;VALUE=DATE:20300501\nDTEND;VALUE=DATE:20300503",
+        "UID:8@moodle\nSUMMARY:Exam submission window\nDTSTART:20300601T090000Z\nDURATION:P1DT2H30M",
+        "UID:9@moodle\nSUMMARY:Weekly DL\nDTSTART:20300601T090000Z\nDURATION:P1W",
+    ),
+    "folding_and_escapes": _calendar(
+        "UID:10@moodle\nSUMMARY:[CS-E4100] Assignment 3\\, part 2\\; final\nDTSTART:20300901T100000Z\n"
+        "DESCRIPTION:Remember: the work is\n due at noon.\\nCourse MS-A0011 ta\n\tkes late work\\\\.",
+        "UID:11@moodle\nSUMMARY:Reading\nDESCRIPTION;ALTREP=\"https://moodle.test/a:b\":Hand-in deadline\nDTSTART:20300902T100000Z",
+    ),
+    "nested_alarm_is_ignored": _calendar(
+        "UID:12@moodle\nSUMMARY:Seminar\nDTSTART:20301001T100000Z\n"
+        "BEGIN:VALARM\nACTION:DISPLAY\nDESCRIPTION:Submission reminder\nTRIGGER:-PT15M\nEND:VALARM",
+        "UID:13@moodle\nSUMMARY:Thesis submission\nDTSTART:20301002T100000Z\n"
+        "BEGIN:VALARM\nACTION:DISPLAY\nDESCRIPTION:Other\nTRIGGER:-PT15M\nEND:VALARM",
+    ),
+    "vtimezone_fallback": _calendar(
+        "UID:14@moodle\nSUMMARY:Essay due\nDTSTART;TZID=Custom Zone:20301101T100000",
+        extra=(
+            "BEGIN:VTIMEZONE\r\nTZID:Custom Zone\r\nBEGIN:STANDARD\r\nDTSTART:19700101T000000\r\n"
+            "TZOFFSETFROM:+0300\r\nTZOFFSETTO:+0300\r\nEND:STANDARD\r\nEND:VTIMEZONE\r\n"
+        ),
+    ),
+    "no_due_events": _calendar("UID:15@moodle\nSUMMARY:Office hours\nDTSTART:20301101T100000Z"),
+}
+
+
+def _by_id(events):
+    return sorted(events, key=lambda event: event["id"])
+
+
+@pytest.mark.parametrize("name", sorted(CORPUS))
+def test_fast_path_matches_ics_calendar(name):
+    text = CORPUS[name].replace("\r\n", "\n").replace("\n", "\r\n")
+    expected = _by_id(parse_ics_calendar(text))
+    assert _by_id(parse_ics_text(text)) == expected
+    if name != "vtimezone_fallback":
+        assert _by_id(iter_due_events(text.splitlines())) == expected
+
+
+def test_streaming_yields_aware_due_times_without_the_fallback():
+    text = CORPUS["tzid_and_floating"]
+    events = {event["id"]: event for event in iter_due_events(text.splitlines())}
+    assert events["3@moodle"]["due_iso"] == "2030-03-15T23:59:00+02:00"
+    assert events["4@moodle"]["due_iso"] == "2030-07-01T10:00:00-04:00"
+    assert events["5@moodle"]["due_iso"] == "2030-04-01T08:00:00+00:00"
+
+
+def test_keyword_filter_runs_before_datetime_parsing(monkeypatch):
+    monkeypatch.setattr(ics_parser, "_parse_datetime", lambda *a: pytest.fail("parsed a non-due event"))
+    text = _calendar("UID:1\nSUMMARY:Lecture\nDTSTART:not-a-date")
+    assert list(iter_due_events(text.splitlines())) == []
+
+
+def test_missing_uid_gets_a_stable_id():
+    text = _calendar("SUMMARY:Essay due\nDTSTART:20301101T100000Z")
+    (first,) = parse_ics_text(text)
+    (second,) = parse_ics_text(text)
+    assert first["id"].startswith("ics_") and first["id"] == second["id"]
+
+
+def test_rejects_text_without_a_calendar():
+    with pytest.raises(IcsParseError):
+        parse_ics_text("SUMMARY:Essay due\n")
+
+
+def test_invalid_event_still_raises_like_ics():
+    text = _calendar("UID:1\nSUMMARY:Essay due\nDTSTART:20301101T100000Z\nDTEND:20301101T110000Z\nDURATION:PT1H")
+    with pytest.raises(ValueError):
+        parse_ics_text(text)
@@ -0,0 +1,127 @@
+# >>> LEADERBOARD STANDINGS START TESTS
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert
+from sqlmodel import SQLModel, Session, create_engine, delete, select
+
+from backend.main import app  # noqa: F401 puts backend modules on the path
+from core.leaderboard_constants import DEFAULT_EVENT_POINTS
+from models import User
+from models_leaderboard import (
+    Leaderboard,
+    LeaderboardMember,
+    LeaderboardStanding,
+    PointsEvent,
+    WeeklyScore,
+)
+from services import leaderboard as leaderboard_service
+from utils import time as time_utils
+
+POINTS = DEFAULT_EVENT_POINTS["task_completed"]
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(
+        engine,
+        tables=[
+            User.__table__,
+            Leaderboard.__table__,
+            LeaderboardMember.__table__,
+            PointsEvent.__table__,
+            WeeklyScore.__table__,
+            LeaderboardStanding.__table__,
+        ],
+    )
+    yield engine
+    engine.dispose()
+
+
+def _set_time(monkeypatch: pytest.MonkeyPatch, dt: datetime) -> None:
+    monkeypatch.setattr(leaderboard_service, "now_utc", lambda: dt)
+    monkeypatch.setattr(time_utils, "now_utc", lambda: dt)
+
+
+def _board_with_member(session: Session):
+    creator = User(email="creator@example.com")
+    member = User(email="member@example.com")
+    session.add(creator)
+    session.add(member)
+    session.commit()
+    board = leaderboard_service.create_leaderboard(session, name="Standings", course_id=None, creator=creator)
+    leaderboard_service.join_leaderboard(session, leaderboard_code=board.join_code, user=member)
+    return board, member
+
+
+def _award_on_two_days(session: Session, monkeypatch, board, member) -> datetime:
+    base_day = datetime(2025, 1, 6, 8, tzinfo=timezone.utc)
+    for offset in (0, 1):
+        _set_time(monkeypatch, base_day + timedelta(days=offset))
+        leaderboard_service.award_points(
+            session, leaderboard_id=board.id, user_id=member.id, event_type="task_completed"
+        )
+    return base_day + timedelta(days=1)
+
+
+def test_awards_fold_into_materialized_standing(engine, monkeypatch):
+    with Session(engine) as session:
+        board, member = _board_with_member(session)
+        _award_on_two_days(session, monkeypatch, board, member)
+
+        standing = session.exec(
+            select(LeaderboardStanding).where(
+                LeaderboardStanding.leaderboard_id == board.id,
+                LeaderboardStanding.user_id == member.id,
+            )
+        ).one()
+        assert standing.total_points == 2 * POINTS
+        assert standing.streak_before == 1
+
+
+def test_standings_read_computes_missing_rows_without_writing(engine, monkeypatch):
+    with Session(engine) as session:
+        board, member = _board_with_member(session)
+        _award_on_two_days(session, monkeypatch, board, member)
+        session.exec(delete(LeaderboardStanding))
+        session.commit()
+
+        standings = leaderboard_service.get_standings(session, leaderboard_id=board.id)
+        member_row = next(row for row in standings.members if row.user_id == member.id)
+        assert member_row.total_points == 2 * POINTS
+        assert member_row.weekly_points == 2 * POINTS
+        assert member_row.streak_days == 2
+        assert not session.new and not session.dirty
+        assert session.exec(select(LeaderboardStanding)).all() == []
+
+        assert leaderboard_service.backfill_standings(session) == 1
+        assert len(session.exec(select(LeaderboardStanding)).all()) == 2
+        assert leaderboard_service.backfill_standings(session) == 0
+
+
+def test_standing_insert_race_keeps_callers_staged_work(engine, monkeypatch):
+    with Session(engine) as session:
+        board, member = _board_with_member(session)
+        session.exec(delete(LeaderboardStanding))
+        session.commit()
+        compute = leaderboard_service._compute_standings
+
+        def compute_then_lose_race(db, leaderboard_id, tz, now, **kwargs):
+            # Another writer inserts the same standing between our read and insert.
+            db.execute(insert(LeaderboardStanding).values(leaderboard_id=leaderboard_id, user_id=member.id))
+            return compute(db, leaderboard_id, tz, now, **kwargs)
+
+        monkeypatch.setattr(leaderboard_service, "_compute_standings", compute_then_lose_race)
+        staged = User(email="staged@example.com")
+        session.add(staged)
+
+        standing = leaderboard_service._standing_row(session, board.id, member.id)
+
+        assert standing.id is not None
+        assert staged in session
+        session.commit()
+        assert session.exec(select(User).where(User.email == "staged@example.com")).one()
+# <<< LEADERBOARD STANDINGS END TESTS
@@ -0,0 +1,113 @@
+# >>> MEMORY OUTBOX START
+from datetime import datetime, timedelta
+
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from backend.main import app  # noqa: F401 puts backend modules on the path
+from backend.services import memory_bridge
+
+from app.models import LegacyOutboxReceipt, Mistake, XPEvent, app_metadata
+
+
+def _dual_write_engines(monkeypatch):
+    legacy_engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(
+        legacy_engine,
+        tables=[memory_bridge.LegacyUser.__table__, memory_bridge.MemoryOutbox.__table__],
+    )
+    app_engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+    app_metadata.create_all(app_engine)
+
+    def app_session():
+        with Session(app_engine) as session:
+            yield session
+
+    monkeypatch.setattr(memory_bridge, "get_app_session", app_session)
+    monkeypatch.setattr(memory_bridge.memory_settings, "MEMORY_V2_DUAL_WRITE", True)
+    return legacy_engine, app_engine
+
+
+def _legacy_user(session, email):
+    user = memory_bridge.LegacyUser(email=email, display_name="Outbox")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+def test_dual_writes_go_through_outbox_and_relay(monkeypatch):
+    legacy_engine, app_engine = _dual_write_engines(monkeypatch)
+
+    with Session(legacy_engine) as session:
+        user = _legacy_user(session, "outbox@example.com")
+
+        memory_bridge.record_mistake_dual_write(
+            session, user_id=user.id, concept="units", subtype="unit", detail={"latency_ms": 10}
+        )
+        memory_bridge.record_xp_event(session, user_id=user.id, amount=5, reason="mastery_bonus")
+        session.commit()
+
+        # nothing reaches the app database until the relay runs
+        with Session(app_engine) as app_db:
+            assert app_db.exec(select(Mistake)).all() == []
+        assert memory_bridge.outbox_stats(session)["pending"] == 2
+
+        assert memory_bridge.relay_memory_outbox(session) == {"applied": 2, "retried": 0, "dead": 0}
+        stats = memory_bridge.outbox_stats(session)
+        assert stats["pending"] == 0 and stats["done"] == 2 and stats["lag_seconds"] == 0.0
+
+        memory_bridge.record_xp_event(session, user_id=user.id, amount=1, reason="flaky")
+        session.commit()
+
+        def boom(*_args):
+            raise RuntimeError("app db unavailable")
+
+        monkeypatch.setitem(memory_bridge._APPLIERS, "xp", boom)
+        assert memory_bridge.relay_memory_outbox(session)["retried"] == 1
+        entry = session.exec(
+            select(memory_bridge.MemoryOutbox).where(memory_bridge.MemoryOutbox.status == "pending")
+        ).one()
+        assert entry.attempts == 1
+        assert entry.next_attempt_at > datetime.utcnow()
+
+        monkeypatch.setitem(memory_bridge._APPLIERS, "xp", memory_bridge._apply_xp)
+        later = datetime.utcnow() + timedelta(hours=1)
+        assert memory_bridge.relay_memory_outbox(session, now=later)["applied"] == 1
+
+    with Session(app_engine) as app_db:
+        assert len(app_db.exec(select(Mistake)).all()) == 1
+        assert len(app_db.exec(select(XPEvent)).all()) == 2
+        assert len(app_db.exec(select(LegacyOutboxReceipt)).all()) == 3
+
+
+def test_relay_holds_a_users_later_rows_while_an_earlier_one_backs_off(monkeypatch):
+    legacy_engine, app_engine = _dual_write_engines(monkeypatch)
+
+    with Session(legacy_engine) as session:
+        user = _legacy_user(session, "ordered@example.com")
+        other = _legacy_user(session, "other@example.com")
+        memory_bridge.record_xp_event(session, user_id=user.id, amount=1, reason="first")
+        session.commit()
+
+        def boom(*_args):
+            raise RuntimeError("app db unavailable")
+
+        monkeypatch.setitem(memory_bridge._APPLIERS, "xp", boom)
+        assert memory_bridge.relay_memory_outbox(session)["retried"] == 1
+        monkeypatch.setitem(memory_bridge._APPLIERS, "xp", memory_bridge._apply_xp)
+
+        memory_bridge.record_xp_event(session, user_id=user.id, amount=2, reason="second")
+        memory_bridge.record_xp_event(session, user_id=other.id, amount=3, reason="other")
+        session.commit()
+
+        # the user's second row waits behind the first; other users are not held up
+        assert memory_bridge.relay_memory_outbox(session) == {"applied": 1, "retried": 0, "dead": 0}
+        with Session(app_engine) as app_db:
+            assert [event.reason for event in app_db.exec(select(XPEvent)).all()] == ["other"]
+
+        later = datetime.utcnow() + timedelta(hours=1)
+        assert memory_bridge.relay_memory_outbox(session, now=later)["applied"] == 2
+
+    with Session(app_engine) as app_db:
+        assert {event.reason for event in app_db.exec(select(XPEvent)).all()} == {"other", "first", "second"}
+# <<< MEMORY OUTBOX END
@@ -1,7 +1,12 @@
 # >>> MEMORY V1 START
+from datetime import timedelta
+
 from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, Session, create_engine
 
-from backend.main import app
+from backend.main import app  # puts backend modules on the path
+from models_memory import ReviewCard
+from services import memory_v1
 
 
 def test_memory_v1_routes_exist():
@@ -14,4 +19,38 @@ def test_memory_v1_routes_exist():
 
     response = client.get("/api/v1/memory/review/next?count=2")
     assert response.status_code in (200, 401, 403)
+
+
+def test_due_queue_serves_soonest_cards_and_tracks_pending_count(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine, tables=[ReviewCard.__table__])
+    monkeypatch.setattr(
+        memory_v1,
+        "_instantiate_many_for_user",
+        lambda session, template_codes, user_id: [object() for _ in template_codes],
+    )
+    memory_v1.invalidate_pending_count()
+    with Session(engine) as session:
+        now = memory_v1._now()
+        for idx in range(12):
+            session.add(
+                ReviewCard(
+                    user_id=7,
+                    template_code=f"tpl_{idx}",
+                    next_review_at=now + timedelta(hours=idx - 4),
+                )
+            )
+        session.commit()
+
+        assert memory_v1._count_pending_cards(session, 7) == 12
+        due = memory_v1.next_due_cards(session, user_id=7, limit=10, now=now)
+        assert [card.template_code for card in due] == ["tpl_0", "tpl_1", "tpl_2", "tpl_3", "tpl_4"]
+
+        items = memory_v1.fetch_due_reviews(session, user_id=7, count=2)
+        assert [item["template_code"] for item in items] == ["tpl_0", "tpl_1"]
+        assert memory_v1._count_pending_cards(session, 7) == 10
+
+        memory_v1.invalidate_pending_count(7)
+        assert memory_v1._count_pending_cards(session, 7) == 10
+    memory_v1.invalidate_pending_count()
 # <<< MEMORY V1 END
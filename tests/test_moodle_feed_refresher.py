@@ -0,0 +1,151 @@
+import asyncio
+from datetime import timedelta
+from uuid import uuid4
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, event
+from sqlmodel import Session, select
+
+import app.integrations.feed_refresher as feed_refresher
+from app.integrations.feed_refresher import FeedFetch, MoodleFeedRefresher, fetch_feed
+from app.integrations.models import MoodleFeed, MoodleFeedItem
+from app.learner.models import LearnerProfile  # noqa: F401 - registers the table
+from app.models import _utcnow, app_metadata
+from app.tasks.models import Task
+
+ICS = """BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//Moodle//EN
+BEGIN:VEVENT
+UID:{uid}-1
+SUMMARY:Essay due
+DTSTART:20301101T100000Z
+DTEND:20301101T120000Z
+END:VEVENT
+BEGIN:VEVENT
+UID:{uid}-2
+SUMMARY:Lab report deadline
+DTSTART:20301105T100000Z
+DTEND:20301105T120000Z
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'feeds.db'}")
+    app_metadata.create_all(engine)
+    return engine
+
+
+def _add_feeds(engine, count):
+    with Session(engine) as session:
+        feeds = [MoodleFeed(user_id=uuid4(), ics_url=f"https://moodle.test/{i}.ics") for i in range(count)]
+        session.add_all(feeds)
+        session.commit()
+        return [feed.id for feed in feeds]
+
+
+class _FakeServer:
+    """Serves one ICS body per URL and answers 304 when the ETag matches."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = []
+
+    async def __call__(self, url, *, etag=None, last_modified=None):
+        self.requests.append((url, etag))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            tag = f'"{url}"'
+            if etag == tag:
+                return FeedFetch(not_modified=True, etag=tag)
+            return FeedFetch(not_modified=False, text=ICS.format(uid=url), etag=tag, content_hash=url)
+        finally:
+            self.in_flight -= 1
+
+
+def test_refresh_is_bounded_batched_and_conditional(engine):
+    feed_ids = _add_feeds(engine, 6)
+    server = _FakeServer()
+    refresher = MoodleFeedRefresher(
+        interval_s=3600, batch_size=4, concurrency=2, engine_factory=lambda: engine, fetcher=server
+    )
+
+    first = asyncio.run(refresher.refresh_once())
+    assert [r.status for r in first] == ["synced"] * 4
+    assert server.peak == 2
+    second = asyncio.run(refresher.refresh_once())
+    assert sorted(r.feed_id for r in second) == feed_ids[4:]
+    assert asyncio.run(refresher.refresh_once()) == []
+
+    with Session(engine) as session:
+        assert len(session.exec(select(Task)).all()) == 12
+        assert len(session.exec(select(MoodleFeedItem)).all()) == 12
+        feed = session.get(MoodleFeed, feed_ids[0])
+        assert feed.etag == f'"{feed.ics_url}"'
+        feed.last_fetch_at = _utcnow() - timedelta(hours=2)
+        session.add(feed)
+        session.commit()
+
+    (again,) = asyncio.run(refresher.refresh_once())
+    assert again.status == "not_modified"
+    assert server.requests[-1][1] == f'"https://moodle.test/0.ics"'
+    assert refresher.stats()["synced"] == 6
+
+
+def test_feed_is_applied_in_one_transaction_and_unchanged_body_is_not_parsed(engine, monkeypatch):
+    (feed_id,) = _add_feeds(engine, 1)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    refresher = MoodleFeedRefresher(engine_factory=lambda: engine, fetcher=_FakeServer())
+    fetch = FeedFetch(not_modified=False, text=ICS.format(uid="x"), content_hash="abc")
+
+    result = refresher._apply(engine, feed_id, fetch)
+    assert (result.status, result.created) == ("synced", 2)
+    assert len(commits) == 1
+
+    monkeypatch.setattr(feed_refresher, "parse_ics_text", lambda text: pytest.fail("parsed unchanged feed"))
+    assert refresher._apply(engine, feed_id, fetch).status == "unchanged"
+
+
+def test_fetch_errors_are_recorded_on_the_feed(engine):
+    (feed_id,) = _add_feeds(engine, 1)
+
+    async def broken(url, **_):
+        raise feed_refresher.FeedFetchError("403 Forbidden")
+
+    refresher = MoodleFeedRefresher(engine_factory=lambda: engine, fetcher=broken)
+    (result,) = asyncio.run(refresher.refresh_once())
+    assert result.status == "error"
+    with Session(engine) as session:
+        feed = session.get(MoodleFeed, feed_id)
+        assert feed.last_error == "403 Forbidden" and feed.last_fetch_at is not None
+    assert asyncio.run(refresher.refresh_once()) == []
+
+
+def test_fetch_feed_sends_validators(monkeypatch):
+    seen = {}
+
+    def handler(request):
+        seen.update(request.headers)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text="BEGIN:VCALENDAR", headers={"ETag": '"v1"'})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(feed_refresher, "get_http_client", lambda *a, **k: client)
+            full = await fetch_feed("https://moodle.test/a.ics")
+            cached = await fetch_feed("https://moodle.test/a.ics", etag=full.etag, last_modified="Mon")
+            return full, cached
+
+    full, cached = asyncio.run(scenario())
+    assert not full.not_modified and full.etag == '"v1"' and len(full.content_hash) == 64
+    assert cached.not_modified and cached.etag == '"v1"'
+    assert seen["if-modified-since"] == "Mon"
@@ -0,0 +1,68 @@
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.prefs.cache import get_prefs_cache, invalidate_prefs, load_prefs
+from app.prefs.models import UserPrefs
+from app.prefs.router import set_prefs
+from app.prefs.schemas import PrefsIn
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine, tables=[UserPrefs.__table__])
+    invalidate_prefs()
+    yield engine
+    invalidate_prefs()
+
+
+def _count_selects(engine):
+    selects = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    return selects
+
+
+def test_snapshot_is_cached_until_prefs_write(engine):
+    user_id = uuid4()
+    selects = _count_selects(engine)
+    with Session(engine) as session:
+        session.add(UserPrefs(user_id=user_id, allow_concept_maps=True))
+        session.commit()
+
+        prefs = load_prefs(session, user_id)
+        prefs.require("allow_concept_maps", "off")
+        with pytest.raises(HTTPException) as exc:
+            prefs.require("store_concept_maps", "Saving concept maps is disabled")
+        assert exc.value.status_code == 403
+        assert load_prefs(session, user_id) is prefs
+        assert len(selects) == 1
+
+        set_prefs(PrefsIn(user_id=user_id, store_concept_maps=True), session=session)
+        assert load_prefs(session, user_id).allows("store_concept_maps")
+    assert get_prefs_cache().stats()["invalidations"] >= 1
+
+
+def test_missing_row_and_anonymous_user_get_defaults(engine):
+    with Session(engine) as session:
+        assert not load_prefs(session, uuid4()).allows("allow_llm_feedback")
+        assert not load_prefs(session, None).allows("allow_llm_feedback")
+
+
+def test_load_racing_an_invalidation_is_not_cached(engine):
+    user_id = uuid4()
+    cache = get_prefs_cache()
+    with Session(engine) as session:
+        generation = cache.generation()
+        stale = load_prefs(session, user_id)
+        invalidate_prefs(user_id)
+        cache.put(stale, generation)
+        assert cache.get(user_id) is None
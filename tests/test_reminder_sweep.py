@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from backend.main import app  # noqa: F401 puts backend modules on the path
+from backend.models import Reminder, Task
+from backend.services import reminder_engine
+from backend.settings import DEFAULT_TIMEZONE
+
+
+def test_sweep_only_touches_tasks_whose_check_time_passed():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine, tables=[Task.__table__, Reminder.__table__])
+    now = datetime.now(DEFAULT_TIMEZONE)
+
+    with Session(engine) as session:
+        session.add(Task(id="soon", source="mock", title="Lab report", due_iso=now + timedelta(hours=10)))
+        session.add(Task(id="later", source="mock", title="Essay", due_iso=now + timedelta(days=20)))
+        session.add(Task(id="done", source="mock", title="Quiz", due_iso=now, status="done"))
+        session.commit()
+
+        first = reminder_engine.sweep_reminders(session, now=now)
+        assert (first.checked, first.created) == (2, 1)
+        assert first.duration_ms >= 0
+
+        # "soon" is cooling down and "later" is outside the horizon: nothing to check
+        second = reminder_engine.sweep_reminders(session, now=now + timedelta(minutes=15))
+        assert (second.checked, second.created) == (0, 0)
+
+        # the 4h "disappointed" cooldown has elapsed
+        third = reminder_engine.sweep_reminders(session, now=now + timedelta(hours=4, minutes=1))
+        assert (third.checked, third.created) == (1, 1)
+
+        later = session.get(Task, "later")
+        assert later.next_reminder_at is not None
+        later.due_iso = now + timedelta(hours=2)
+        assert later.next_reminder_at is None
+        session.commit()
+
+        fourth = reminder_engine.sweep_reminders(session, now=now + timedelta(hours=4, minutes=16))
+        assert (fourth.checked, fourth.created) == (1, 1)
+        escalations = session.exec(
+            select(Reminder.escalation).where(Reminder.task_id == "later")
+        ).all()
+        assert [str(getattr(e, "value", e)) for e in escalations] == ["intervention"]
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.deep.stt import SttBusy, SttTimeout, SttWorkerPool
+
+
+class _FakeModel:
+    """Decodes b"a b c" into one segment per word, `delay` seconds each."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def transcribe(self, audio, **options):
+        words = audio.read().decode().split()
+
+        def segments():
+            for word in words:
+                self.gate.wait()
+                time.sleep(self.delay)
+                yield SimpleNamespace(text=f" {word} ")
+
+        return segments(), SimpleNamespace(duration=float(len(words)))
+
+
+def _pool(model, **kwargs):
+    loads = []
+
+    def factory(workers):
+        loads.append(workers)
+        return model
+
+    pool = SttWorkerPool(model_factory=factory, **kwargs)
+    pool.start()
+    return pool, loads
+
+
+def test_model_loads_once_and_reports_realtime_factor():
+    pool, loads = _pool(_FakeModel(), workers=2)
+
+    async def scenario():
+        return await asyncio.gather(*(pool.transcribe(b"hello there world") for _ in range(6)))
+
+    try:
+        assert asyncio.run(scenario()) == ["hello there world"] * 6
+        stats = pool.stats()
+    finally:
+        pool.stop()
+    assert loads == [2]
+    assert stats["completed"] == 6
+    assert stats["audio_s"] == 18.0
+    assert stats["realtime_factor"] is not None and stats["realtime_factor"] < 1
+    assert stats["model_loaded"] is True
+
+
+def test_streams_segments_as_they_decode():
+    pool, _ = _pool(_FakeModel())
+
+    async def scenario():
+        return [segment async for segment in pool.stream(b"one two three")]
+
+    try:
+        assert asyncio.run(scenario()) == ["one", "two", "three"]
+    finally:
+        pool.stop()
+
+
+def test_bounded_queue_and_timeouts():
+    model = _FakeModel(delay=0.05)
+    model.gate.clear()
+    pool, _ = _pool(model, max_queue=1)
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.transcribe(b"slow words here", timeout_s=0.2))
+        await asyncio.sleep(0.1)  # the worker picks it up and blocks on the gate
+        queued = pool.submit(b"waiting")
+        with pytest.raises(SttBusy):
+            pool.submit(b"overflow")
+        with pytest.raises(SttTimeout):
+            await running
+        model.gate.set()
+        return await asyncio.wrap_future(queued.future)
+
+    try:
+        assert asyncio.run(scenario()) == "waiting"
+        stats = pool.stats()
+    finally:
+        pool.stop()
+    assert stats["rejected"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["queued"] == 0
+
+
+def test_failed_model_load_is_retried_after_backoff():
+    attempts = []
+
+    def factory(workers):
+        attempts.append(workers)
+        if len(attempts) == 1:
+            raise OSError("model download interrupted")
+        return _FakeModel()
+
+    pool = SttWorkerPool(model_factory=factory, load_retry_s=0.2)
+    pool.start()
+
+    async def scenario():
+        await asyncio.sleep(0.05)  # the worker's warm-up load fails
+        with pytest.raises(OSError):
+            await pool.transcribe(b"too early")
+        assert pool.stats()["model_error"] is not None
+        await asyncio.sleep(0.25)
+        return await pool.transcribe(b"hello again")
+
+    try:
+        assert asyncio.run(scenario()) == "hello again"
+        stats = pool.stats()
+    finally:
+        pool.stop()
+    assert len(attempts) == 2
+    assert stats["model_loaded"] is True and stats["model_error"] is None
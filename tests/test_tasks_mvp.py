@@ -2,19 +2,47 @@
 from __future__ import annotations
 
 from fastapi.testclient import TestClient
-from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel import SQLModel, Session, create_engine, select
 
-import backend.models  # noqa: F401 ensure base tables registered
-import backend.models_dfe  # noqa: F401 ensure DFE tables registered
-from backend.db import get_session
-from backend.main import app
-from backend.models import User
+from backend.main import app  # puts backend modules on the path
+from db import get_session
+from models import User
+from models_dfe import SkillNode, TaskInstance, TaskTemplate
+from services import dfe_tasks
 
 
 def _memory_engine():
     return create_engine("sqlite://", connect_args={"check_same_thread": False})
 
 
+def _dfe_engine():
+    engine = _memory_engine()
+    SQLModel.metadata.create_all(
+        engine, tables=[SkillNode.__table__, TaskTemplate.__table__, TaskInstance.__table__]
+    )
+    return engine
+
+
+def _add_templates(session, codes):
+    skill = SkillNode(key="math.add", title="Add", graph_version="v1")
+    session.add(skill)
+    session.commit()
+    session.refresh(skill)
+    for code in codes:
+        session.add(
+            TaskTemplate(
+                code=code,
+                title="Add",
+                skill_id=skill.id,
+                text_template=f"[{code}] Compute {{{{a}}}} + {{{{b}}}}.",
+                parameters={"a": [1, 2, 3], "b": [4, 5, 6]},
+                constraints={"expr": "a < b"},
+                answer_spec={"formula": "a + b"},
+            )
+        )
+    session.commit()
+
+
 def test_template_instantiate_and_grade():
     engine = _memory_engine()
     SQLModel.metadata.create_all(engine)
@@ -72,4 +100,56 @@ def test_template_instantiate_and_grade():
     app.dependency_overrides.clear()
     SQLModel.metadata.drop_all(engine)
     engine.dispose()
+
+
+def test_instantiate_many_compiles_each_template_once():
+    engine = _dfe_engine()
+    with Session(engine) as session:
+        _add_templates(session, ("math.add.01", "math.add.02"))
+
+        dfe_tasks._compiled_template.cache_clear()
+        codes = ["math.add.01", "math.add.02", "missing.code"] * 10
+        results = dfe_tasks.instantiate_many(session, codes, user_id=1, force_new=True)
+
+        assert len(results) == len(codes)
+        assert all(result is None for result in results[2::3])
+        rendered = [result for result in results if result is not None]
+        assert len(rendered) == 20
+        assert all(instance.id is not None for instance, _template in rendered)
+        assert dfe_tasks._compiled_template.cache_info().misses == 2
+
+        again = dfe_tasks.instantiate_many(session, ["math.add.01", "math.add.01"], user_id=1)
+        assert again[0][0].id == again[1][0].id
+    SQLModel.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def test_instantiate_many_skips_only_the_row_that_fails_to_insert(monkeypatch):
+    engine = _dfe_engine()
+    build = dfe_tasks._build_instance
+
+    def build_with_bad_row(template, user_id, seed_value, rng_seed):
+        instance = build(template, user_id, seed_value, rng_seed)
+        if template.code == "math.add.02":
+            instance.rendered_text = None  # violates NOT NULL at flush
+        return instance
+
+    monkeypatch.setattr(dfe_tasks, "_build_instance", build_with_bad_row)
+    with Session(engine) as session:
+        _add_templates(session, ("math.add.01", "math.add.02", "math.add.03"))
+        kept = TaskInstance(template_id=1, user_id=7, seed="staged", params={}, rendered_text="staged")
+        session.add(kept)
+
+        results = dfe_tasks.instantiate_many(
+            session, ["math.add.01", "math.add.02", "math.add.03"], user_id=1, force_new=True, commit=False
+        )
+
+        assert results[1] is None
+        assert all(result[0].id is not None for result in (results[0], results[2]))
+        # The caller's staged row survives; the caller still owns the commit.
+        session.commit()
+        rows = session.exec(select(TaskInstance)).all()
+        assert sorted(row.rendered_text.split("]")[0] for row in rows) == ["[math.add.01", "[math.add.03", "staged"]
+    SQLModel.metadata.drop_all(engine)
+    engine.dispose()
 # <<< DFE END
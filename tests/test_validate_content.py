@@ -84,3 +84,38 @@ def test_validate_content_reports_errors(tmp_path, capsys):
     assert code == 1
     assert "duplicate exercise id detected: duplicate_id" in captured.err
     assert "numeric exercise must define answer.value" in captured.err
+
+
+def test_validate_content_parallel_aggregates_parse_errors(tmp_path, capsys):
+    for idx in range(6):
+        tmp_path.joinpath(f"ok_{idx}.md").write_text(
+            dedent(
+                f"""\
+                ---
+                id: ok_{idx}
+                concept: Basics
+                type: numeric
+                question: What is {idx}?
+                answer:
+                  value: {idx}
+                ---
+                """
+            ),
+            encoding="utf-8",
+        )
+    tmp_path.joinpath("bad_type.md").write_text(
+        "---\nid: bad_type\nconcept: Basics\ntype: essay\nquestion: Why?\n---\n",
+        encoding="utf-8",
+    )
+    tmp_path.joinpath("missing_key.md").write_text(
+        "---\nid: missing_key\nconcept: Basics\ntype: mcq\n---\n",
+        encoding="utf-8",
+    )
+
+    code = main(["--content", str(tmp_path), "--workers", "2", "--chunk-size", "2"])
+    captured = capsys.readouterr()
+    assert code == 1
+    assert "Unsupported exercise type: essay" in captured.err
+    assert "missing required key 'question'" in captured.err
+    assert "Validation failed with 2 error(s)." in captured.err
+    assert captured.err.index("bad_type.md") < captured.err.index("missing_key.md")
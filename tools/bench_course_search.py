@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+"""Benchmark exam-pipeline course search at realistic catalogue sizes.
+
+Usage: python -m tools.bench_course_search [--courses N] [--typed N] [--p99-ms MS]
+
+Builds a synthetic Sisu catalogue plus exam archive, replays search-as-you-type
+sessions (every prefix of course names and codes, plus misspelled words) and
+reports p50/p99 latency for the previous linear scan and the search index.
+Exits non-zero when the index misses the p99 target or returns fewer
+substring matches than the linear scan.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from app.exam_scraper.search_index import CourseSearchIndex  # noqa: E402
+
+_BASE_WORDS = """
+analysis algebra calculus statistics physics chemistry mechanics dynamics energy power systems
+control signal circuits electronics materials structures design engineering programming software
+data databases networks security management economics finance accounting marketing strategy
+leadership sustainability environment water process reactor nuclear thermal heat transfer fluid
+flow optimization numerical methods modelling simulation machine learning intelligence vision
+robotics automation production logistics supply chain quality project innovation business law
+communication writing research seminar thesis laboratory practical fundamentals introduction
+advanced applied theory mathematics probability discrete linear differential equations geometry
+chemical biology separation membrane catalysis polymer wood paper pulp bioenergy solar wind grid
+electric machines drives converters measurement instrumentation welding steel manufacturing
+""".split()
+_PREFIXES = ["", "", "", "bio", "micro", "nano", "geo", "hydro", "thermo", "electro", "socio", "eco"]
+_SUFFIXES = ["", "", "s", "al", "ing"]
+
+
+def legacy_search_courses(rows: list[dict], query: str, sisu_rows: list[dict] | None = None) -> list[dict]:
+    """The previous implementation: lowercase substring scan over every row per call."""
+    q = query.strip().lower()
+    if not q:
+        return []
+    exam_by_code: dict[str, list[dict]] = {}
+    for row in rows:
+        code = (row.get("course_code") or "").strip()
+        if code:
+            exam_by_code.setdefault(code, []).append(row)
+    results: list[dict] = []
+    seen_codes: set[str] = set()
+    for sisu in sisu_rows or []:
+        code = (sisu.get("code") or "").strip()
+        name_en = sisu.get("name_en") or ""
+        name_fi = sisu.get("name_fi") or ""
+        if not code or not (q in code.lower() or q in name_en.lower() or q in name_fi.lower()):
+            continue
+        if code in seen_codes:
+            continue
+        seen_codes.add(code)
+        exams = exam_by_code.get(code, [])
+        results.append({
+            "course_code": code,
+            "course_name": exams[0]["course_name"] if exams else (name_en or name_fi),
+            "has_exams": bool(exams),
+        })
+    for code, exams in exam_by_code.items():
+        if code in seen_codes:
+            continue
+        first = exams[0]
+        if not (q in code.lower() or q in first.get("course_name", "").lower()):
+            continue
+        seen_codes.add(code)
+        results.append({"course_code": code, "course_name": first["course_name"], "has_exams": True})
+    results.sort(key=lambda r: (not r["has_exams"], r["course_name"].lower()))
+    return results[:20]
+
+
+def build_catalogue(courses: int, seed: int = 7) -> Tuple[List[dict], List[dict]]:
+    rng = random.Random(seed)
+    vocabulary = sorted({p + w + x for p in _PREFIXES for w in _BASE_WORDS for x in _SUFFIXES})
+    rng.shuffle(vocabulary)
+    # Zipf-like word frequencies: a few words ("introduction") appear everywhere.
+    weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(vocabulary))]
+
+    def name() -> str:
+        words = rng.choices(vocabulary, weights=weights, k=rng.randint(2, 6))
+        return " ".join(words).capitalize() + rng.choice(["", "", " I", " II", " (5 cr)"])
+
+    def code() -> str:
+        return f"{rng.choice(['BH', 'BL', 'BM', 'CS', 'CT', 'KA', 'LM'])}{rng.randint(10, 99)}A{rng.randint(0, 9999):04d}"
+
+    sisu_rows = [{"code": code(), "name_en": name(), "name_fi": name(), "credits": 5.0} for _ in range(courses)]
+    exam_rows = []
+    for _ in range(courses // 4):
+        course = rng.choice(sisu_rows) if rng.random() < 0.8 else {"code": code(), "name_en": name()}
+        exam_rows.append({
+            "course_code": course["code"],
+            "course_name": course["name_en"],
+            "department": "Dept",
+            "date": f"20{rng.randint(15, 25)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+            "pdf_url": f"https://exams.example/{course['code']}.pdf",
+        })
+    return exam_rows, sisu_rows
+
+
+def typed_queries(sisu_rows: List[dict], sessions: int, seed: int = 11) -> List[str]:
+    """Every keystroke of ``sessions`` users typing a name, a code or a typo."""
+    rng = random.Random(seed)
+    queries: List[str] = []
+    for _ in range(sessions):
+        course = rng.choice(sisu_rows)
+        kind = rng.random()
+        if kind < 0.5:
+            target = course["name_en"].lower()[:14]
+        elif kind < 0.8:
+            target = course["code"]
+        else:
+            word = max(course["name_en"].lower().split(), key=len)
+            cut = rng.randrange(1, len(word) - 1) if len(word) > 3 else 1
+            target = word[:cut] + word[cut + 1:]  # one dropped letter
+        queries.extend(target[:n] for n in range(1, len(target) + 1))
+    return queries
+
+
+def _latencies(fn: Callable[[str], list], queries: List[str]) -> List[float]:
+    out = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        out.append((time.perf_counter() - start) * 1000)
+    return out
+
+
+def _summary(label: str, samples: List[float]) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"{label:8s} p50 {statistics.median(ordered):8.3f} ms   p99 {p99:8.3f} ms   max {ordered[-1]:8.3f} ms"
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark course search-as-you-type latency.")
+    parser.add_argument("--courses", type=int, default=30000, help="Sisu catalogue size (default: %(default)s)")
+    parser.add_argument("--typed", type=int, default=200, help="Typing sessions to replay (default: %(default)s)")
+    parser.add_argument("--p99-ms", type=float, default=5.0, help="p99 target for the index (default: %(default)s)")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the index")
+    args = parser.parse_args(argv)
+
+    exam_rows, sisu_rows = build_catalogue(args.courses)
+    queries = typed_queries(sisu_rows, args.typed)
+
+    start = time.perf_counter()
+    index = CourseSearchIndex(exam_rows, sisu_rows)
+    build_s = time.perf_counter() - start
+    print(f"{len(index)} courses, {len(exam_rows)} exam rows, {len(queries)} keystrokes; index built in {build_s:.2f} s")
+
+    indexed = _latencies(index.search, queries)
+    print(_summary("index", indexed))
+
+    failures = 0
+    if not args.skip_legacy:
+        legacy = _latencies(lambda q: legacy_search_courses(exam_rows, q, sisu_rows), queries[::10])
+        print(_summary("legacy", legacy))
+        for q in queries[::10]:
+            expected = {r["course_code"] for r in legacy_search_courses(exam_rows, q, sisu_rows)}
+            got = {r["course_code"] for r in index.search(q, limit=len(index))}
+            if not expected <= got:
+                failures += 1
+        if failures:
+            print(f"{failures} queries lost substring matches the linear scan found")
+
+    p99 = sorted(indexed)[min(len(indexed) - 1, int(len(indexed) * 0.99))]
+    if p99 > args.p99_ms:
+        print(f"index p99 {p99:.3f} ms exceeds target {args.p99_ms} ms")
+        return 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+"""Benchmark the streaming ICS parser against the ics.Calendar implementation.
+
+Usage: python -m tools.bench_ics_parser [--events N] [--due-ratio R] [--min-speedup X]
+
+Builds a synthetic Moodle export (UTC, TZID and all-day events, folded and
+escaped descriptions, reminders), parses it with both implementations and
+reports wall time and events/s. Exits non-zero when the outputs differ or the
+streaming parser is less than ``--min-speedup`` times faster.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from app.integrations.ics_parser import iter_due_events, parse_ics_calendar, parse_ics_text  # noqa: E402
+
+_COURSES = ["CS-E4100", "MS-A0011", "PHYS-A1130", "ELEC-C7310", "TU-C1030", "KE-31.1100"]
+_DUE_TITLES = ["Assignment {n} is due", "Quiz {n} closes", "Project deadline {n}", "Lab report submission {n}"]
+_OTHER_TITLES = ["Lecture {n}", "Exercise session {n}", "Office hours", "Guest talk {n}", "Course meeting"]
+_ZONES = ["Europe/Helsinki", "Europe/Stockholm", "UTC"]
+
+
+def _fold(line: str) -> str:
+    """RFC 5545 folding: 75-octet lines, continuations start with a space."""
+    if len(line) <= 75:
+        return line + "\r\n"
+    parts = [line[:75]] + [" " + line[i : i + 74] for i in range(75, len(line), 74)]
+    return "\r\n".join(parts) + "\r\n"
+
+
+def build_feed(events: int, due_ratio: float = 0.3, seed: int = 5) -> str:
+    rng = random.Random(seed)
+    out = ["BEGIN:VCALENDAR\r\n", "VERSION:2.0\r\n", "PRODID:-//Moodle//NONSGML v4.1//EN\r\n"]
+    for n in range(events):
+        course = rng.choice(_COURSES)
+        due = rng.random() < due_ratio
+        title = rng.choice(_DUE_TITLES if due else _OTHER_TITLES).format(n=n)
+        day = f"2030{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+        desc = (
+            f"<p>Course {course}\\, week {n % 14}\\; please read the instructions carefully "
+            f"before starting.</p>\\n" + "Materials are on the course page. " * rng.randint(1, 6)
+        )
+        out.append("BEGIN:VEVENT\r\n")
+        out.append(f"UID:{n}@moodle.example\r\n")
+        out.append(_fold(f"SUMMARY:[{course}] {title}"))
+        out.append(_fold(f"DESCRIPTION:{desc}"))
+        out.append("CLASS:PUBLIC\r\n")
+        out.append(f"DTSTAMP:{day}T080000Z\r\n")
+        kind = rng.random()
+        if kind < 0.6:
+            out.append(f"DTSTART:{day}T{rng.randint(8, 20):02d}0000Z\r\n")
+            out.append(f"DTEND:{day}T{rng.randint(21, 23):02d}0000Z\r\n")
+        elif kind < 0.9:
+            zone = rng.choice(_ZONES)
+            out.append(f"DTSTART;TZID={zone}:{day}T235900\r\n")
+        else:
+            out.append(f"DTSTART;VALUE=DATE:{day}\r\n")
+        out.append(f"CATEGORIES:{course}\r\n")
+        if rng.random() < 0.2:
+            out.append("BEGIN:VALARM\r\nACTION:DISPLAY\r\nDESCRIPTION:Submission reminder\r\nTRIGGER:-PT1H\r\nEND:VALARM\r\n")
+        out.append("END:VEVENT\r\n")
+    out.append("END:VCALENDAR\r\n")
+    return "".join(out)
+
+
+def _timed(fn: Callable[[], list], repeat: int) -> Tuple[float, list]:
+    best = float("inf")
+    result: list = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ICS due-event parsing throughput.")
+    parser.add_argument("--events", type=int, default=10000, help="VEVENTs in the feed (default: %(default)s)")
+    parser.add_argument("--due-ratio", type=float, default=0.3, help="Share of due-like events (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of runs per parser (default: %(default)s)")
+    parser.add_argument("--min-speedup", type=float, default=5.0, help="Required speedup (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    text = build_feed(args.events, args.due_ratio)
+    print(f"{args.events} events, {len(text) / 1e6:.1f} MB, due ratio {args.due_ratio}")
+
+    stream_s, streamed = _timed(lambda: list(iter_due_events(text.splitlines())), args.repeat)
+    fast_s, fast = _timed(lambda: parse_ics_text(text), args.repeat)
+    legacy_s, legacy = _timed(lambda: parse_ics_calendar(text), 1)
+    for label, seconds in (("stream", stream_s), ("parse", fast_s), ("ics", legacy_s)):
+        print(f"{label:7s} {seconds * 1000:9.1f} ms   {args.events / seconds:10.0f} events/s")
+    speedup = legacy_s / fast_s
+    print(f"speedup {speedup:.1f}x, {len(fast)} due events")
+
+    def key(event: dict) -> str:
+        return event["id"]
+
+    if sorted(fast, key=key) != sorted(legacy, key=key) or sorted(streamed, key=key) != sorted(legacy, key=key):
+        print("streaming parser output differs from ics.Calendar")
+        return 1
+    if speedup < args.min_speedup:
+        print(f"speedup {speedup:.1f}x below target {args.min_speedup}x")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+"""Compare the per-keyword regex topic matcher with the compiled automaton.
+
+Usage: python -m tools.bench_topic_matcher [--rounds N]
+
+Every topic's keywords are turned into sample task titles, so the benchmark
+covers the full TOPIC_MAP and also checks that both matchers agree.
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from services.topic_map import TOPIC_MAP, resolve_topic  # noqa: E402
+from services.topic_matcher import _norm, match_topics  # noqa: E402
+
+
+def legacy_match_topics(title: str, notes: str = "", max_topics: int = 4, min_score: int = 1) -> List[Tuple[str, int]]:
+    """The previous implementation: one regex per keyword per topic per call."""
+    text = _norm(f"{title}\n{notes}")
+    scores: Dict[str, int] = {}
+    for topic_id, spec in TOPIC_MAP.items():
+        kws = spec.get("keywords", [])
+        if not kws:
+            continue
+        hits = 0
+        for kw in kws:
+            kw_norm = _norm(kw)
+            if " " in kw_norm:
+                if kw_norm in text:
+                    hits += 2
+            elif re.search(rf"\b{re.escape(kw_norm)}\b", text):
+                hits += 1
+        if hits >= min_score:
+            scores[topic_id] = hits
+    ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+    return ranked[:max_topics]
+
+
+def legacy_resolve_topic(title: str, notes: str | None = None) -> str | None:
+    text = f"{title} {notes or ''}".lower()
+    for topic, meta in TOPIC_MAP.items():
+        for kw in meta["keywords"]:
+            if kw in text:
+                return topic
+    return None
+
+
+def sample_texts() -> List[Tuple[str, str]]:
+    samples: List[Tuple[str, str]] = [("Weekly groceries", ""), ("", "")]
+    for spec in TOPIC_MAP.values():
+        kws = spec.get("keywords", [])
+        samples.append((f"HW: {' '.join(kws[:2])}", ", ".join(kws[2:5])))
+        samples.append((f"Read about {kws[-1]}s before Friday" if kws else "Read", "chapter 3 notes"))
+    return samples
+
+
+def _time(fn, samples, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for title, notes in samples:
+            fn(title, notes)
+    return time.perf_counter() - start
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark topic matching over the full TOPIC_MAP.")
+    parser.add_argument("--rounds", type=int, default=20, help="Passes over the sample texts (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    samples = sample_texts()
+    mismatches = [
+        s for s in samples
+        if legacy_match_topics(*s) != match_topics(*s) or legacy_resolve_topic(*s) != resolve_topic(*s)
+    ]
+    calls = len(samples) * args.rounds
+    print(f"{len(TOPIC_MAP)} topics, {len(samples)} sample texts, {calls} calls per matcher")
+    for label, legacy, current in (
+        ("match_topics", legacy_match_topics, match_topics),
+        ("resolve_topic", legacy_resolve_topic, resolve_topic),
+    ):
+        old = _time(legacy, samples, args.rounds)
+        new = _time(current, samples, args.rounds)
+        print(
+            f"{label:14s} legacy {old * 1e6 / calls:9.1f} us/call   "
+            f"automaton {new * 1e6 / calls:9.1f} us/call   speedup {old / new:5.1f}x"
+        )
+    if mismatches:
+        print(f"{len(mismatches)} sample(s) scored differently, e.g. {mismatches[0]!r}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
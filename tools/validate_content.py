@@ -37,6 +37,18 @@ def _validate_exercise(ex: exercises.Exercise) -> List[str]:
 def main(argv: List[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description="Validate exercise content front matter.")
     parser.add_argument("--content", default="content", help="Content directory to scan (default: %(default)s)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Parser processes; 1 parses in-process (default: one per CPU for large catalogues)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=exercises.PARALLEL_PARSE_CHUNK_SIZE,
+        help="Files handed to a worker at a time (default: %(default)s)",
+    )
     args = parser.parse_args(argv)
 
     content_path = Path(args.content)
@@ -44,15 +56,17 @@ def main(argv: List[str] | None = None) -> int:
         print(f"Content directory not found: {content_path}", file=sys.stderr)
         return 1
 
-    exercises._EXERCISE_CACHE = None
-    try:
-        loaded = exercises.load_exercises(content_path)
-    except Exception as exc:  # pragma: no cover - exercised via tests
-        print(f"Failed to load exercises: {exc}", file=sys.stderr)
-        return 1
+    # Parse every file and report all problems at once instead of stopping at the
+    # first broken front matter block.
+    results = exercises.parse_exercise_files(
+        content_path.glob("*.md"),
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+    )
+    errors: List[str] = [result.error for result in results if result.error]
+    loaded = [result.exercise for result in results if result.exercise is not None]
 
     seen_ids = set()
-    errors: List[str] = []
     for ex in loaded:
         if ex.id in seen_ids:
             errors.append(f"duplicate exercise id detected: {ex.id}")